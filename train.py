@@ -1,60 +1,109 @@
-import pandas as pd
-import numpy as np
+import argparse
+import os
+
 import joblib
+import numpy as np
 from sklearn.preprocessing import StandardScaler
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Dropout
 
-# ======================
-# 1. Load your dataset
-# ======================
-df = pd.read_csv("rainfall_dataset.csv")
+from weatherapp.ai.dataset import (
+    fit_scalers,
+    make_streaming_tf_dataset,
+    make_tf_dataset,
+    sliding_windows,
+    split_indexes,
+)
+from weatherapp.ai.scaling import AffineScaler
+from weatherapp.ai.training import build_model
 
 FEATURE_COLS = ["temp", "humidity", "pressure", "wind_speed", "rain_mm"]
 TARGET_COLS = ["rain_mm", "duration_min"]
+PAST_STEPS = 6
+VALIDATION_SPLIT = 0.2
 
-X = df[FEATURE_COLS].values
-y = df[TARGET_COLS].values
+parser = argparse.ArgumentParser(description="Train the LSTM rain model")
+parser.add_argument("--data", default="rainfall_dataset.csv", help="CSV or Parquet training data")
+parser.add_argument("--from-db", action="store_true",
+                    help="train on weather_reports with the predictor's serving features")
+parser.add_argument("--sensor", type=int, action="append", help="limit --from-db to these sensors")
+parser.add_argument("--cache-dir", help="training cache for --from-db (default: TRAINING_CACHE_DIR)")
+parser.add_argument("--no-sync", action="store_true", help="with --from-db, train on the cache as-is")
+parser.add_argument("--horizon", type=int, default=6, help="with --from-db, reports per target window")
+parser.add_argument("--stream", action="store_true",
+                    help="read the data in chunks instead of loading it into memory")
+parser.add_argument("--chunk-rows", type=int, default=100000)
+parser.add_argument("--epochs", type=int, default=20)
+parser.add_argument("--batch-size", type=int, default=32)
+args = parser.parse_args()
 
 # ======================
-# 2. Scale data
+# 1-3. Load, scale and window the dataset
 # ======================
-scaler_X = StandardScaler()
-scaler_Y = StandardScaler()
+# Windows are strided views over the scaled data (weatherapp/ai/dataset.py) and
+# are gathered one batch at a time, so peak memory stays close to the size of
+# the dataset itself. With --stream only one chunk is in memory at a time.
+if args.from_db:
+    # Serving features and targets straight from the production schema, via the
+    # incremental memory-mapped cache (weatherapp/ai/training.py)
+    import django
 
-X_scaled = scaler_X.fit_transform(X)
-y_scaled = scaler_Y.fit_transform(y)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "weatheralert.settings")
+    django.setup()
+    from weatherapp.ai.training import SERVING_FEATURES, TARGETS, ReportCache, build_training_set
 
-# ======================
-# 3. Sequence the data (LSTM needs time steps)
-# ======================
-PAST_STEPS = 6
+    FEATURE_COLS, TARGET_COLS = list(SERVING_FEATURES), list(TARGETS)
+    cache = ReportCache(args.cache_dir)
+    if not args.no_sync:
+        cache.sync(args.sensor)
+    training_set = build_training_set(cache, args.sensor, horizon=args.horizon, sequence_length=PAST_STEPS)
 
-X_seq = []
-y_seq = []
-for i in range(PAST_STEPS, len(X_scaled)):
-    X_seq.append(X_scaled[i-PAST_STEPS:i])
-    y_seq.append(y_scaled[i])
+    finite_rows = np.isfinite(training_set.features).all(axis=1) & np.isfinite(training_set.targets).all(axis=1)
+    scaler_X = StandardScaler().fit(training_set.features[finite_rows])
+    scaler_Y = StandardScaler().fit(training_set.targets[finite_rows])
+    X_scaled = scaler_X.transform(training_set.features).astype(np.float32)
+    y_scaled = scaler_Y.transform(training_set.targets).astype(np.float32)
 
-X_seq, y_seq = np.array(X_seq), np.array(y_seq)
+    X_seq, y_seq = sliding_windows(X_scaled, y_scaled, PAST_STEPS)
+    train_pos, val_pos = training_set.split_by_time(VALIDATION_SPLIT)
+    train_data = make_tf_dataset(X_seq, y_seq, training_set.window_starts[train_pos], args.batch_size, shuffle=True, seed=0)
+    val_data = make_tf_dataset(X_seq, y_seq, training_set.window_starts[val_pos], args.batch_size)
+elif args.stream:
+    scaler_X, scaler_Y, row_count = fit_scalers(args.data, FEATURE_COLS, TARGET_COLS, args.chunk_rows)
+    window_count = max(row_count - PAST_STEPS, 0)
+    train_idx, val_idx = split_indexes(window_count, VALIDATION_SPLIT)
+    stream_args = (args.data, FEATURE_COLS, TARGET_COLS, PAST_STEPS, scaler_X, scaler_Y)
+    train_data = make_streaming_tf_dataset(
+        *stream_args, window_range=(0, len(train_idx)),
+        batch_size=args.batch_size, chunk_rows=args.chunk_rows,
+    )
+    val_data = make_streaming_tf_dataset(
+        *stream_args, window_range=(len(train_idx), window_count),
+        batch_size=args.batch_size, chunk_rows=args.chunk_rows,
+    )
+else:
+    import pandas as pd
+
+    df = pd.read_csv(args.data) if not args.data.endswith((".parquet", ".pq")) else pd.read_parquet(args.data)
+    scaler_X = StandardScaler()
+    scaler_Y = StandardScaler()
+    X_scaled = scaler_X.fit_transform(df[FEATURE_COLS].values).astype(np.float32)
+    y_scaled = scaler_Y.fit_transform(df[TARGET_COLS].values).astype(np.float32)
+    del df
+
+    X_seq, y_seq = sliding_windows(X_scaled, y_scaled, PAST_STEPS)
+    train_idx, val_idx = split_indexes(len(X_seq), VALIDATION_SPLIT)
+    # Keras shuffles the training windows each epoch by default; keep doing so
+    train_data = make_tf_dataset(X_seq, y_seq, train_idx, args.batch_size, shuffle=True, seed=0)
+    val_data = make_tf_dataset(X_seq, y_seq, val_idx, args.batch_size)
 
 # ======================
 # 4. Build the model
 # ======================
-model = Sequential([
-    LSTM(64, input_shape=(PAST_STEPS, len(FEATURE_COLS)), return_sequences=True),
-    Dropout(0.2),
-    LSTM(32),
-    Dense(len(TARGET_COLS))
-])
-
-# Use full loss name for compatibility
-model.compile(optimizer="adam", loss="mean_squared_error")
+model = build_model(PAST_STEPS, len(FEATURE_COLS), len(TARGET_COLS))
 
 # ======================
 # 5. Train
 # ======================
-history = model.fit(X_seq, y_seq, epochs=20, batch_size=32, validation_split=0.2)
+history = model.fit(train_data, epochs=args.epochs, validation_data=val_data)
 
 # ======================
 # 6. Save model + scalers
@@ -62,5 +111,8 @@ history = model.fit(X_seq, y_seq, epochs=20, batch_size=32, validation_split=0.2
 model.save("rain_model.h5")
 joblib.dump(scaler_X, "scaler_X.pkl")
 joblib.dump(scaler_Y, "scaler_y.pkl")
+# sklearn-free copies for the serving process (weatherapp/ai/scaling.py)
+AffineScaler.from_sklearn(scaler_X).save("scaler_X.npz")
+AffineScaler.from_sklearn(scaler_Y).save("scaler_y.npz")
 
 print("✅ Model and scalers saved successfully!")
@@ -2,7 +2,6 @@
 import os
 import logging
 from celery import Celery
-from celery.schedules import crontab
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'weatherapp.settings')
@@ -19,13 +18,28 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks()
 
-# ❗ New: Define a periodic task schedule
-# This will run the 'predict_rain_task' every 10 minutes.
-app.conf.beat_schedule = {
-    'run-prediction-every-10-minutes': {
+app.conf.beat_schedule = {}
+
+# Periodic rain prediction. Celery beat only drives the prediction pipeline when
+# PREDICTION_SCHEDULER is 'celery'; otherwise the standalone predictor process
+# runs it, so the two never compete on different schedules.
+if os.environ.get('PREDICTION_SCHEDULER', 'loop') == 'celery':
+    app.conf.beat_schedule['run-prediction-every-interval'] = {
         'task': 'weatherapp.tasks.predict_rain_task',
-        'schedule': crontab(minute='*/10'),
-    },
+        'schedule': float(os.environ.get('PREDICTION_INTERVAL_SECONDS') or '3600'),
+    }
+
+# SMS outbox drain: retries whose backoff has elapsed, and anything queued while
+# no worker was running
+app.conf.beat_schedule['drain-sms-outbox'] = {
+    'task': 'weatherapp.tasks.drain_sms_outbox_task',
+    'schedule': float(os.environ.get('SMS_OUTBOX_DRAIN_SECONDS') or '30'),
+}
+
+# Email outbox drain: retries of OTP / password reset / flood alert emails
+app.conf.beat_schedule['drain-email-outbox'] = {
+    'task': 'weatherapp.tasks.drain_email_outbox_task',
+    'schedule': float(os.environ.get('EMAIL_OUTBOX_DRAIN_SECONDS') or '30'),
 }
 
 @app.task(bind=True)
@@ -217,6 +217,13 @@ EMAIL_USE_TLS = (os.environ.get('EMAIL_USE_TLS') or 'True') == 'True'
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER') or ''
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD') or ''
 DEFAULT_FROM_EMAIL = f'WeatherAlert <{EMAIL_HOST_USER}>' if EMAIL_HOST_USER else 'WeatherAlert <noreply@weatherapp.com>'
+# Durable email outbox (weatherapp/email_outbox.py): views queue, Celery sends over one
+# SMTP connection per drain and retries with backoff up to EMAIL_OUTBOX_MAX_ATTEMPTS times
+EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('EMAIL_OUTBOX_BATCH_SIZE') or '50')
+EMAIL_OUTBOX_LEASE_SECONDS = int(os.environ.get('EMAIL_OUTBOX_LEASE_SECONDS') or '300')
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('EMAIL_OUTBOX_MAX_ATTEMPTS') or '5')
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = int(os.environ.get('EMAIL_OUTBOX_RETRY_BASE_SECONDS') or '30')
+EMAIL_OUTBOX_RETRY_MAX_SECONDS = int(os.environ.get('EMAIL_OUTBOX_RETRY_MAX_SECONDS') or '1800')
 
 LOGIN_URL = 'login'
 LOGOUT_REDIRECT_URL = '/'
@@ -252,6 +259,12 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Manila'  # Set to your desired timezone
+# OTP SMS get their own queue (served by the otp_worker process in the Procfile) so a
+# user never waits behind an outbox drain; set to 'celery' to run them on the main worker
+OTP_TASK_QUEUE = os.environ.get('OTP_TASK_QUEUE') or 'otp'
+CELERY_TASK_ROUTES = {
+    'weatherapp.tasks.send_otp_sms_task': {'queue': OTP_TASK_QUEUE},
+}
 
 # CELERY BEAT SCHEDULE
 # This is where you configure the periodic tasks.
@@ -270,10 +283,78 @@ CELERY_BEAT_SCHEDULE = {
     },
 }
 
+# AI rain prediction pipeline
+# PREDICTION_SCHEDULER selects the process that drives the pipeline:
+#   'loop'   - the standalone predictor process (Procfile `predictor`)
+#   'celery' - Celery beat running weatherapp.tasks.predict_rain_task
+PREDICTION_SCHEDULER = os.environ.get('PREDICTION_SCHEDULER', 'loop')
+PREDICTION_INTERVAL_SECONDS = int(os.environ.get('PREDICTION_INTERVAL_SECONDS') or '3600')
+# PREDICTION_TRIGGER 'event' also runs a cycle shortly after fresh sensor data is
+# ingested; bursts are coalesced and cycles are at least MIN_SPACING apart. The
+# interval schedule above stays active as a fallback when no data arrives.
+PREDICTION_TRIGGER = os.environ.get('PREDICTION_TRIGGER', 'interval')
+PREDICTION_TRIGGER_DEBOUNCE_SECONDS = int(os.environ.get('PREDICTION_TRIGGER_DEBOUNCE_SECONDS') or '15')
+PREDICTION_MIN_SPACING_SECONDS = int(os.environ.get('PREDICTION_MIN_SPACING_SECONDS') or '300')
+
+# Versioned rain model registry (weatherapp/ai/registry.py). The predictor polls it
+# and hot-swaps newly activated versions; 0 disables polling.
+MODEL_REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR') or str(BASE_DIR / 'model_registry')
+MODEL_REGISTRY_POLL_SECONDS = int(os.environ.get('MODEL_REGISTRY_POLL_SECONDS') or '60')
+# Memory-mapped training data cache built from weather_reports (weatherapp/ai/training.py)
+TRAINING_CACHE_DIR = os.environ.get('TRAINING_CACHE_DIR') or str(BASE_DIR / 'training_cache')
+# Local inference server (weatherapp/ai/server.py) started by the prediction service;
+# web workers and tasks reach it at PREDICTION_SERVER_URL. Port 0 disables it.
+PREDICTION_SERVER_HOST = os.environ.get('PREDICTION_SERVER_HOST', '127.0.0.1')
+PREDICTION_SERVER_PORT = int(os.environ.get('PREDICTION_SERVER_PORT') or '8765')
+PREDICTION_SERVER_URL = os.environ.get('PREDICTION_SERVER_URL') or f'http://127.0.0.1:{PREDICTION_SERVER_PORT or 8765}'
+PREDICTION_SERVER_MAX_BATCH = int(os.environ.get('PREDICTION_SERVER_MAX_BATCH') or '64')
+PREDICTION_SERVER_BATCH_WAIT_MS = float(os.environ.get('PREDICTION_SERVER_BATCH_WAIT_MS') or '5')
+# The server is only reachable from processes on the same host. Heroku dynos do not
+# share a loopback, so the web dyno cannot reach the `predictor` dyno: point
+# PREDICTION_SERVER_URL at a reachable host, or let views predict in-process when the
+# server is unreachable (loads the model into every web process; see MEMORY_OPTIMIZATION.md).
+# With neither, what-if forecasts answer 503.
+PREDICTION_INPROCESS_FALLBACK = (os.environ.get('PREDICTION_INPROCESS_FALLBACK') or 'False') == 'True'
+
 # SMS Configuration
 SMS_API_URL = os.environ.get('SMS_API_URL')
 SMS_API_KEY = os.environ.get('SMS_API_KEY')
 SMS_DEVICE_ID = os.environ.get('SMS_DEVICE_ID')
+# Alert fan-out (weatherapp/sms_fanout.py): concurrent sends, capped by the gateway's
+# rate limit (messages per second, 0 = unlimited)
+SMS_FANOUT_CONCURRENCY = int(os.environ.get('SMS_FANOUT_CONCURRENCY') or '8')
+SMS_RATE_LIMIT_PER_SECOND = float(os.environ.get('SMS_RATE_LIMIT_PER_SECOND') or '0')
+SMS_RATE_LIMIT_BURST = int(os.environ.get('SMS_RATE_LIMIT_BURST') or '0')
+# Shared gateway client (weatherapp/sms_client.py): pooled keep-alive connections, TLS
+# verified against SMS_CA_BUNDLE (certifi when unset), transport retries on refused/throttled requests
+SMS_POOL_SIZE = int(os.environ.get('SMS_POOL_SIZE') or SMS_FANOUT_CONCURRENCY)
+SMS_HTTP_TIMEOUT = float(os.environ.get('SMS_HTTP_TIMEOUT') or '10')
+SMS_HTTP_RETRIES = int(os.environ.get('SMS_HTTP_RETRIES') or '2')
+SMS_CA_BUNDLE = os.environ.get('SMS_CA_BUNDLE') or None
+# Durable outbox (weatherapp/sms_outbox.py) drained by Celery; failed sends are retried
+# with exponential backoff and jitter up to SMS_OUTBOX_MAX_ATTEMPTS times
+SMS_OUTBOX_BATCH_SIZE = int(os.environ.get('SMS_OUTBOX_BATCH_SIZE') or '200')
+SMS_OUTBOX_LEASE_SECONDS = int(os.environ.get('SMS_OUTBOX_LEASE_SECONDS') or '300')
+SMS_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('SMS_OUTBOX_MAX_ATTEMPTS') or '6')
+SMS_OUTBOX_RETRY_BASE_SECONDS = int(os.environ.get('SMS_OUTBOX_RETRY_BASE_SECONDS') or '30')
+SMS_OUTBOX_RETRY_MAX_SECONDS = int(os.environ.get('SMS_OUTBOX_RETRY_MAX_SECONDS') or '1800')
+# Repeat flood alerts to the same user at the same (or lower) risk level are suppressed
+# for this long (weatherapp/sms_suppression.py); 0 disables suppression
+SMS_SUPPRESSION_WINDOW_SECONDS = int(os.environ.get('SMS_SUPPRESSION_WINDOW_SECONDS') or '10800')
+
+# Flood alert dispatch from the prediction pipeline (weatherapp/alert_dispatcher.py) is
+# off unless ALERT_DISPATCH_ENABLED is set; only warnings at or above ALERT_MIN_RISK_LEVEL
+# (Low, Moderate or High) are sent. Channels: sms, email and push. Push is skipped
+# unless WEBPUSH_VAPID_PRIVATE_KEY is set and pywebpush is installed.
+ALERT_DISPATCH_ENABLED = (os.environ.get('ALERT_DISPATCH_ENABLED') or 'False') == 'True'
+ALERT_MIN_RISK_LEVEL = os.environ.get('ALERT_MIN_RISK_LEVEL') or 'Moderate'
+ALERT_CHANNELS = [
+    channel.strip() for channel in (os.environ.get('ALERT_CHANNELS') or 'sms').split(',') if channel.strip()
+]
+WEBPUSH_VAPID_PUBLIC_KEY = os.environ.get('WEBPUSH_VAPID_PUBLIC_KEY', '')
+WEBPUSH_VAPID_PRIVATE_KEY = os.environ.get('WEBPUSH_VAPID_PRIVATE_KEY', '')
+WEBPUSH_VAPID_SUBJECT = os.environ.get('WEBPUSH_VAPID_SUBJECT') or f'mailto:{EMAIL_HOST_USER or "noreply@weatherapp.com"}'
+WEBPUSH_CONCURRENCY = int(os.environ.get('WEBPUSH_CONCURRENCY') or '8')
 
 # PhilSys QR Verification Keys
 PSA_PUBLIC_KEY = os.environ.get('PSA_PUBLIC_KEY', '')
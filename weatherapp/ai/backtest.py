@@ -0,0 +1,296 @@
+"""
+Vectorized historical backtest of the rain model.
+
+Loads a date range of ``weather_reports`` into NumPy, builds every 6-step input
+window per sensor as a zero-copy ``sliding_window_view`` and scores them through
+the model in large batches. Each window is compared against what the same sensor
+observed over the following ``horizon`` reports. Windows that span a reporting
+gap are skipped with the same mask training uses (``training.evenly_spaced_windows``),
+so only windows the model is trained and served on are scored:
+
+- rate: predicted ``rate_mm_h`` vs. the mean observed ``rain_rate``
+- amount: predicted ``amount_mm`` vs. the summed observed ``rain_accumulated``
+- intensity: PAGASA class of the predicted vs. the observed rate
+
+Metrics are reported overall, per sensor and per observed intensity class.
+
+Usage::
+
+    python -m weatherapp.ai.backtest --start 2025-01-01 --end 2026-01-01 \\
+        [--sensor 1] [--horizon 6] [--batch-size 4096] [--json]
+"""
+import argparse
+import calendar
+import json
+import logging
+import os
+from datetime import datetime
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from weatherapp.ai.flood_risk import INTENSITY_LABELS, intensity_codes
+from weatherapp.ai.training import evenly_spaced_windows
+
+logger = logging.getLogger(__name__)
+
+SEQUENCE_LENGTH = 6
+FEATURE_COUNT = 5
+# Sensors report every 10 minutes, so 6 reports is the hour after the window
+DEFAULT_HORIZON = 6
+DEFAULT_BATCH_SIZE = 4096
+FETCH_CHUNK_ROWS = 50000
+
+
+class ReportHistory:
+    """
+    Column arrays of weather reports, sorted by sensor and time.
+
+    Attributes:
+        sensor_ids: int array (N,)
+        times: float array (N,) report times in epoch seconds of the naive
+            (Philippine time) timestamp
+        features: float32 array (N, 5) of temperature, humidity, wind_speed,
+            barometric_pressure, hour_of_day (the model's input order)
+        rain_rate: float array (N,) observed mm/h
+        rain_accumulated: float array (N,) observed mm per report
+    """
+
+    def __init__(self, sensor_ids, times, features, rain_rate, rain_accumulated):
+        self.sensor_ids = np.asarray(sensor_ids, dtype=np.int64)
+        self.times = np.asarray(times, dtype=np.float64)
+        self.features = np.ascontiguousarray(features, dtype=np.float32)
+        self.rain_rate = np.asarray(rain_rate, dtype=np.float64)
+        self.rain_accumulated = np.asarray(rain_accumulated, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.sensor_ids)
+
+
+def load_report_history(start, end, sensor_id=None):
+    """
+    Read weather reports in [start, end) into a ReportHistory.
+
+    Rows are streamed with fetchmany so the Python-object overhead stays bounded
+    by FETCH_CHUNK_ROWS; NULL readings become NaN and invalidate their windows.
+    """
+    from django.db import connection
+
+    query = """
+        SELECT sensor_id, temperature, humidity, wind_speed, barometric_pressure,
+               date_time, rain_rate, rain_accumulated
+        FROM weather_reports
+        WHERE date_time >= %s AND date_time < %s
+    """
+    params = [start, end]
+    if sensor_id is not None:
+        query += " AND sensor_id = %s"
+        params.append(sensor_id)
+    query += " ORDER BY sensor_id, date_time"
+
+    chunks = []
+    with connection.cursor() as cursor:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(FETCH_CHUNK_ROWS)
+            if not rows:
+                break
+            chunk = np.array(
+                [
+                    (sid, calendar.timegm(dt.timetuple()), temp, humid, wind, pressure, dt.hour, rate, accumulated)
+                    for sid, temp, humid, wind, pressure, dt, rate, accumulated in rows
+                ],
+                dtype=object,
+            )
+            chunk[chunk == None] = np.nan  # noqa: E711 - elementwise NULL check
+            chunks.append(chunk.astype(np.float64))
+
+    data = np.concatenate(chunks) if chunks else np.empty((0, 9))
+    return ReportHistory(data[:, 0], data[:, 1], data[:, 2:7], data[:, 7], data[:, 8])
+
+
+def build_windows(features, sequence_length=SEQUENCE_LENGTH):
+    """
+    All consecutive windows of ``features`` as a read-only strided view.
+
+    Returns:
+        np.ndarray: Shape (N - sequence_length + 1, sequence_length, F); window i
+        covers rows i .. i + sequence_length - 1. No data is copied.
+    """
+    features = np.asarray(features)
+    if len(features) < sequence_length:
+        return np.empty((0, sequence_length, features.shape[1]), dtype=features.dtype)
+    return sliding_window_view(features, (sequence_length, features.shape[1]))[:, 0]
+
+
+def future_sums(values, horizon):
+    """
+    Sum of ``values[i + 1 : i + 1 + horizon]`` for every row i, via one cumsum.
+
+    Rows without a full horizon after them get NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    cumulative = np.concatenate(([0.0], np.cumsum(values)))
+    sums = np.full(len(values), np.nan)
+    count = len(values) - horizon
+    if count > 0:
+        sums[:count] = cumulative[1 + horizon:] - cumulative[1:count + 1]
+    return sums
+
+
+def backtest_targets(history, sequence_length=SEQUENCE_LENGTH, horizon=DEFAULT_HORIZON):
+    """
+    Valid window indexes and their observed targets.
+
+    A window is valid when it and its horizon belong to a single sensor, span no
+    reporting gap and none of the inputs or observations are missing.
+
+    Returns:
+        tuple: (window_indexes, observed_rate_mm_h, observed_amount_mm, sensor_ids)
+    """
+    window_count = len(history) - sequence_length + 1
+    if window_count <= 0:
+        empty = np.empty(0)
+        return empty.astype(np.int64), empty, empty, empty.astype(np.int64)
+
+    starts = np.arange(window_count)
+    ends = starts + sequence_length - 1
+    last = ends + horizon
+    in_range = last < len(history)
+    # Rows are sorted by sensor, so equal sensor ids at both ends mean one sensor throughout
+    same_sensor = np.zeros(window_count, dtype=bool)
+    same_sensor[in_range] = history.sensor_ids[starts[in_range]] == history.sensor_ids[last[in_range]]
+    evenly_spaced = np.zeros(window_count, dtype=bool)
+    evenly_spaced[in_range] = evenly_spaced_windows(history.times, sequence_length, horizon)
+
+    row_ok = np.isfinite(history.features).all(axis=1).astype(np.int64)
+    complete_inputs = build_windows(row_ok[:, None], sequence_length)[:, :, 0].all(axis=1)
+
+    observed_rate = future_sums(history.rain_rate, horizon)[ends] / horizon
+    observed_amount = future_sums(history.rain_accumulated, horizon)[ends]
+
+    valid = same_sensor & evenly_spaced & complete_inputs & np.isfinite(observed_rate) & np.isfinite(observed_amount)
+    indexes = np.flatnonzero(valid)
+    return indexes, observed_rate[indexes], observed_amount[indexes], history.sensor_ids[ends[indexes]]
+
+
+def score_windows(windows, indexes, batch_size=DEFAULT_BATCH_SIZE, predict_batch=None):
+    """
+    Run the model over ``windows[indexes]`` in batches.
+
+    Only one batch is gathered (copied) from the strided view at a time.
+
+    Returns:
+        tuple: (predicted_amount_mm, predicted_rate_mm_h) arrays aligned with indexes
+    """
+    if predict_batch is None:
+        from weatherapp.ai import predictor
+        predict_batch = predictor.predict_rain_batch
+
+    amounts = np.empty(len(indexes))
+    rates = np.empty(len(indexes))
+    for offset in range(0, len(indexes), batch_size):
+        batch = windows[indexes[offset:offset + batch_size]]
+        output = predict_batch(batch)
+        if output is None:
+            raise RuntimeError("Rain model is not available for backtesting")
+        amount_mm, _, rate_mm_h = output
+        amounts[offset:offset + len(batch)] = amount_mm
+        rates[offset:offset + len(batch)] = rate_mm_h
+    return amounts, rates
+
+
+def error_metrics(predicted_rate, observed_rate, predicted_amount, observed_amount):
+    """MAE / RMSE / bias for rate and amount, plus intensity-class accuracy."""
+    count = len(observed_rate)
+    if count == 0:
+        return {"count": 0}
+    rate_error = predicted_rate - observed_rate
+    amount_error = predicted_amount - observed_amount
+    return {
+        "count": int(count),
+        "rate_mae": float(np.mean(np.abs(rate_error))),
+        "rate_rmse": float(np.sqrt(np.mean(rate_error ** 2))),
+        "rate_bias": float(np.mean(rate_error)),
+        "amount_mae": float(np.mean(np.abs(amount_error))),
+        "amount_rmse": float(np.sqrt(np.mean(amount_error ** 2))),
+        "amount_bias": float(np.mean(amount_error)),
+        "intensity_accuracy": float(np.mean(intensity_codes(predicted_rate) == intensity_codes(observed_rate))),
+    }
+
+
+def summarize(sensor_ids, predicted_rate, observed_rate, predicted_amount, observed_amount):
+    """Overall, per-sensor and per-observed-intensity metrics."""
+    def group(mask):
+        return error_metrics(predicted_rate[mask], observed_rate[mask], predicted_amount[mask], observed_amount[mask])
+
+    observed_class = intensity_codes(observed_rate)
+    return {
+        "overall": group(slice(None)),
+        "by_sensor": {int(sid): group(sensor_ids == sid) for sid in np.unique(sensor_ids)},
+        "by_intensity": {
+            INTENSITY_LABELS[code]: group(observed_class == code) for code in np.unique(observed_class)
+        },
+    }
+
+
+def run_backtest(history, horizon=DEFAULT_HORIZON, batch_size=DEFAULT_BATCH_SIZE, predict_batch=None):
+    """Backtest a loaded ReportHistory and return the metrics summary."""
+    indexes, observed_rate, observed_amount, sensor_ids = backtest_targets(history, horizon=horizon)
+    logger.info("Backtesting %s windows from %s reports", len(indexes), len(history))
+    windows = build_windows(history.features)
+    predicted_amount, predicted_rate = score_windows(windows, indexes, batch_size, predict_batch)
+    return summarize(sensor_ids, predicted_rate, observed_rate, predicted_amount, observed_amount)
+
+
+def format_report(summary):
+    columns = ("count", "rate_mae", "rate_rmse", "rate_bias", "amount_mae", "amount_rmse", "intensity_accuracy")
+    lines = [f"{'group':<24}" + "".join(f"{c:>20}" for c in columns)]
+
+    def row(name, metrics):
+        cells = []
+        for column in columns:
+            value = metrics.get(column)
+            cells.append(f"{'-':>20}" if value is None else f"{value:>20.3f}" if isinstance(value, float) else f"{value:>20}")
+        lines.append(f"{name:<24}" + "".join(cells))
+
+    row("overall", summary["overall"])
+    for sensor_id, metrics in summary["by_sensor"].items():
+        row(f"sensor {sensor_id}", metrics)
+    for label, metrics in summary["by_intensity"].items():
+        row(f"observed {label}", metrics)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import time
+
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "weatheralert.settings")
+    django.setup()
+
+    parser = argparse.ArgumentParser(description="Backtest the rain model against recorded weather reports")
+    parser.add_argument("--start", required=True, type=datetime.fromisoformat)
+    parser.add_argument("--end", required=True, type=datetime.fromisoformat)
+    parser.add_argument("--sensor", type=int)
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON, help="reports after the window to compare with")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--json", action="store_true", help="print the metrics as JSON")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    history = load_report_history(args.start, args.end, args.sensor)
+    loaded = time.perf_counter()
+    summary = run_backtest(history, horizon=args.horizon, batch_size=args.batch_size)
+    scored = time.perf_counter()
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(format_report(summary))
+        print(f"Loaded {len(history)} reports in {loaded - started:.1f}s, scored in {scored - loaded:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
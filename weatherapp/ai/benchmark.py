@@ -0,0 +1,126 @@
+"""
+Latency and memory benchmark for the rain predictor.
+
+Reports p50/p99 latency and resident memory for:
+
+- cold start: importing the predictor, loading + warming up the model, first prediction
+- warm single: ``predict_rain`` on one 6x5 window (traced direct-call path)
+- warm single (keras predict): the same window through ``model.predict`` for comparison
+- batched: ``predict_rain_batch`` on ``--batch-size`` windows (latency per call and per window)
+
+Usage::
+
+    python -m weatherapp.ai.benchmark [--iterations 200] [--batch-size 64]
+
+Cold start is measured once, in this process, so run the script in a fresh
+interpreter (it must be the first thing to import TensorFlow to be meaningful).
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+
+def rss_mb():
+    """Current resident set size in MB (Linux), falling back to the peak RSS."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentiles_ms(samples):
+    samples_ms = np.asarray(samples) * 1000
+    return float(np.percentile(samples_ms, 50)), float(np.percentile(samples_ms, 99))
+
+
+def time_calls(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def sample_windows(count, seed=0):
+    """Plausible random weather windows of shape (count, 6, 5)."""
+    rng = np.random.default_rng(seed)
+    windows = np.empty((count, 6, 5), dtype=np.float32)
+    windows[..., 0] = rng.uniform(22, 34, (count, 6))      # temperature
+    windows[..., 1] = rng.uniform(55, 100, (count, 6))     # humidity
+    windows[..., 2] = rng.uniform(0, 12, (count, 6))       # wind speed
+    windows[..., 3] = rng.uniform(995, 1015, (count, 6))   # barometric pressure
+    windows[..., 4] = rng.integers(0, 24, (count, 1))      # hour of day
+    return windows
+
+
+def run(iterations=200, batch_size=64):
+    results = []
+    rss_before = rss_mb()
+
+    started = time.perf_counter()
+    from weatherapp.ai import predictor
+    predictor._load_model()
+    windows = sample_windows(max(batch_size, 1))
+    predictor.predict_rain(windows[0])
+    cold_seconds = time.perf_counter() - started
+    if predictor.get_model_version() is None:
+        raise SystemExit("Rain model could not be loaded; nothing to benchmark")
+    results.append(("cold start", cold_seconds * 1000, cold_seconds * 1000, rss_mb()))
+
+    single = windows[0]
+    samples = time_calls(lambda: predictor.predict_rain(single), iterations)
+    results.append(("warm single", *percentiles_ms(samples), rss_mb()))
+
+    bundle = predictor._active_bundle
+
+    def keras_predict():
+        scaled = bundle.scaler_X.transform(single).reshape(1, predictor.SEQUENCE_LENGTH, -1)
+        bundle.scaler_y.inverse_transform(bundle.model.predict(scaled, verbose=0, batch_size=1))
+
+    keras_predict()
+    samples = time_calls(keras_predict, iterations)
+    results.append(("warm single (keras predict)", *percentiles_ms(samples), rss_mb()))
+
+    batch = windows[:batch_size]
+    predictor.predict_rain_batch(batch)
+    samples = time_calls(lambda: predictor.predict_rain_batch(batch), max(1, iterations // 4))
+    p50, p99 = percentiles_ms(samples)
+    results.append((f"batched x{batch_size}", p50, p99, rss_mb()))
+    results.append((f"batched x{batch_size} per window", p50 / batch_size, p99 / batch_size, rss_mb()))
+
+    print(f"Model version: {predictor.get_model_version()}  iterations: {iterations}")
+    print(f"{'case':<36}{'p50 ms':>10}{'p99 ms':>10}{'RSS MB':>10}")
+    for name, p50, p99, rss in results:
+        print(f"{name:<36}{p50:>10.2f}{p99:>10.2f}{rss:>10.1f}")
+    print(f"RSS before import: {rss_before:.1f} MB, peak: {peak_rss_mb():.1f} MB")
+    return results
+
+
+def main(argv=None):
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "weatheralert.settings")
+    django.setup()
+
+    parser = argparse.ArgumentParser(description="Benchmark rain prediction latency and memory")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args(argv)
+    run(iterations=args.iterations, batch_size=args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Thin client for the local inference server (server.py).
+
+Web views and Celery tasks use this instead of importing the predictor, so they
+never load TensorFlow or a copy of the model themselves.
+
+This module deliberately does not import TensorFlow.
+"""
+import logging
+
+import numpy as np
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionServerError(Exception):
+    """Raised when the inference server is unreachable or rejects a request."""
+
+
+class PredictionClient:
+    """
+    Args:
+        base_url: Server URL; defaults to ``settings.PREDICTION_SERVER_URL``
+        timeout: Request timeout in seconds
+    """
+
+    def __init__(self, base_url=None, timeout=5.0):
+        if base_url is None:
+            from django.conf import settings
+            base_url = settings.PREDICTION_SERVER_URL
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _request(self, method, path, **kwargs):
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            raise PredictionServerError(f"Prediction server unreachable: {e}") from e
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        if response.status_code != 200:
+            raise PredictionServerError(body.get("error") or f"Prediction server returned {response.status_code}")
+        return body
+
+    def health(self):
+        """Server status and the model version it is serving."""
+        return self._request("GET", "/health")
+
+    def predict(self, windows):
+        """
+        Predict a batch of windows.
+
+        Args:
+            windows: Array-like of shape (N, 6, 5), unscaled
+
+        Returns:
+            list: One ``{amount_mm, duration_min, rate_mm_h, intensity}`` dict per window.
+        """
+        windows = np.asarray(windows, dtype=np.float32)
+        return self._request("POST", "/predict", json={"windows": windows.tolist()})["predictions"]
+
+    def predict_rain(self, input_features):
+        """
+        Same return value as ``predictor.predict_rain`` for a single window.
+
+        Returns:
+            tuple: (amount_mm, duration_min, intensity, rate_mm_h)
+        """
+        prediction = self.predict(np.asarray(input_features, dtype=np.float32)[None])[0]
+        return (
+            prediction["amount_mm"],
+            prediction["duration_min"],
+            prediction["intensity"],
+            prediction["rate_mm_h"],
+        )
+
+
+_client = None
+
+
+def get_client():
+    """Process-wide client, so requests reuse one keep-alive connection."""
+    global _client
+    if _client is None:
+        _client = PredictionClient()
+    return _client
@@ -0,0 +1,203 @@
+"""
+Sliding-window datasets for training the rain model.
+
+The model sees ``past_steps`` consecutive rows of features and predicts the
+targets of the row right after them. Instead of materialising every window
+(``past_steps`` copies of the data), windows are kept as strided views over the
+scaled feature matrix and only gathered one batch at a time:
+
+- ``sliding_windows``: zero-copy (X windows, y) views for in-memory arrays
+- ``window_batches`` / ``make_tf_dataset``: batched generator and ``tf.data``
+  pipeline over those views
+- ``iter_table_chunks`` / ``stream_windows``: CSV or Parquet files read in
+  chunks, with the last ``past_steps`` rows carried across chunk boundaries, for
+  histories too large to load at once
+- ``fit_scalers``: StandardScaler fitted incrementally over the same chunks
+
+TensorFlow and pyarrow are imported lazily, only by the functions that need them.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+DEFAULT_CHUNK_ROWS = 100000
+
+
+def sliding_windows(features, targets, past_steps):
+    """
+    Windows of ``past_steps`` rows and the targets of the row that follows each.
+
+    Window i covers ``features[i : i + past_steps]`` and is paired with
+    ``targets[i + past_steps]``, matching the original train.py loop.
+
+    Returns:
+        tuple: (X, y) with X of shape (N - past_steps, past_steps, F). X is a
+        read-only view of ``features``; y is a view of ``targets``.
+    """
+    features = np.asarray(features)
+    targets = np.asarray(targets)
+    count = len(features) - past_steps
+    if count <= 0:
+        return (
+            np.empty((0, past_steps, features.shape[1]), dtype=features.dtype),
+            targets[:0],
+        )
+    windows = sliding_window_view(features, (past_steps, features.shape[1]))[:count, 0]
+    return windows, targets[past_steps:]
+
+
+def split_indexes(count, validation_split=0.2):
+    """
+    Train / validation window indexes, holding out the *last* windows like Keras'
+    ``validation_split`` so validation never precedes training data in time.
+    """
+    split_at = int(count * (1.0 - validation_split))
+    return np.arange(split_at), np.arange(split_at, count)
+
+
+def window_batches(windows, targets, indexes, batch_size=32, shuffle=False, seed=None):
+    """
+    Yield (X, y) batches gathered from window views.
+
+    Only the current batch is copied into contiguous memory.
+    """
+    indexes = np.asarray(indexes)
+    if shuffle:
+        indexes = np.random.default_rng(seed).permutation(indexes)
+    for offset in range(0, len(indexes), batch_size):
+        batch = indexes[offset:offset + batch_size]
+        yield (
+            np.ascontiguousarray(windows[batch], dtype=np.float32),
+            np.ascontiguousarray(targets[batch], dtype=np.float32),
+        )
+
+
+def make_tf_dataset(windows, targets, indexes, batch_size=32, shuffle=False, seed=None):
+    """
+    ``tf.data.Dataset`` of batches gathered from window views.
+
+    The generator is re-run every epoch, so shuffling (if enabled) changes per epoch.
+    """
+    import tensorflow as tf
+
+    past_steps, feature_count = windows.shape[1], windows.shape[2]
+    target_count = targets.shape[1]
+    epoch = iter(range(1 << 31))
+
+    def generator():
+        epoch_seed = None if seed is None else seed + next(epoch)
+        yield from window_batches(windows, targets, indexes, batch_size, shuffle, epoch_seed)
+
+    dataset = tf.data.Dataset.from_generator(
+        generator,
+        output_signature=(
+            tf.TensorSpec((None, past_steps, feature_count), tf.float32),
+            tf.TensorSpec((None, target_count), tf.float32),
+        ),
+    )
+    return dataset.prefetch(2)
+
+
+def iter_table_chunks(path, columns, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Yield float32 arrays of ``columns`` from a CSV or Parquet file, chunk by chunk.
+
+    Parquet requires pyarrow.
+    """
+    if str(path).endswith((".parquet", ".pq")):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Reading Parquet training data requires pyarrow") from e
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=list(columns)):
+            yield np.column_stack(
+                [batch.column(name).to_numpy(zero_copy_only=False) for name in columns]
+            ).astype(np.float32)
+    else:
+        import pandas as pd
+        for frame in pd.read_csv(path, usecols=list(columns), chunksize=chunk_rows):
+            yield frame[list(columns)].to_numpy(dtype=np.float32)
+
+
+def fit_scalers(path, feature_cols, target_cols, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Fit feature and target StandardScalers incrementally over a file.
+
+    Returns:
+        tuple: (scaler_X, scaler_y, row_count)
+    """
+    from sklearn.preprocessing import StandardScaler
+
+    scaler_X, scaler_y = StandardScaler(), StandardScaler()
+    columns = _columns(feature_cols, target_cols)
+    feature_index, target_index = _column_indexes(columns, feature_cols, target_cols)
+    rows = 0
+    for chunk in iter_table_chunks(path, columns, chunk_rows):
+        scaler_X.partial_fit(chunk[:, feature_index])
+        scaler_y.partial_fit(chunk[:, target_index])
+        rows += len(chunk)
+    return scaler_X, scaler_y, rows
+
+
+def stream_windows(path, feature_cols, target_cols, past_steps, scaler_X, scaler_y,
+                   chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Yield ``(start_index, X_windows, y)`` per chunk of a CSV/Parquet file.
+
+    Features and targets are scaled per chunk. The last ``past_steps`` rows of each
+    chunk are prepended to the next one, so the windows are exactly those of
+    ``sliding_windows`` over the whole file; ``start_index`` is the global index
+    of the first window in the chunk.
+    """
+    columns = _columns(feature_cols, target_cols)
+    feature_index, target_index = _column_indexes(columns, feature_cols, target_cols)
+    carry_X = np.empty((0, len(feature_cols)), dtype=np.float32)
+    carry_y = np.empty((0, len(target_cols)), dtype=np.float32)
+    next_index = 0
+
+    for chunk in iter_table_chunks(path, columns, chunk_rows):
+        X = np.concatenate([carry_X, scaler_X.transform(chunk[:, feature_index]).astype(np.float32)])
+        y = np.concatenate([carry_y, scaler_y.transform(chunk[:, target_index]).astype(np.float32)])
+        windows, window_targets = sliding_windows(X, y, past_steps)
+        if len(windows):
+            yield next_index, windows, window_targets
+            next_index += len(windows)
+        carry_X, carry_y = X[-past_steps:], y[-past_steps:]
+
+
+def make_streaming_tf_dataset(path, feature_cols, target_cols, past_steps, scaler_X, scaler_y,
+                              window_range=None, batch_size=32, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    ``tf.data.Dataset`` streaming windows from a file, optionally limited to the
+    global window indexes in ``window_range`` = (start, stop).
+    """
+    import tensorflow as tf
+
+    start, stop = window_range if window_range is not None else (0, None)
+
+    def generator():
+        for first, windows, targets in stream_windows(
+            path, feature_cols, target_cols, past_steps, scaler_X, scaler_y, chunk_rows
+        ):
+            lo = max(start - first, 0)
+            hi = len(windows) if stop is None else min(stop - first, len(windows))
+            if hi <= lo:
+                continue
+            yield from window_batches(windows, targets, np.arange(lo, hi), batch_size)
+
+    dataset = tf.data.Dataset.from_generator(
+        generator,
+        output_signature=(
+            tf.TensorSpec((None, past_steps, len(feature_cols)), tf.float32),
+            tf.TensorSpec((None, len(target_cols)), tf.float32),
+        ),
+    )
+    return dataset.prefetch(2)
+
+
+def _columns(feature_cols, target_cols):
+    # A column may be both a feature and a target (train.py uses rain_mm for both)
+    return list(dict.fromkeys(list(feature_cols) + list(target_cols)))
+
+
+def _column_indexes(columns, feature_cols, target_cols):
+    return [columns.index(c) for c in feature_cols], [columns.index(c) for c in target_cols]
@@ -0,0 +1,260 @@
+"""
+Vectorized barangay flood-risk assessment.
+
+The barangay risk table is held as NumPy arrays (multipliers, land-type codes and
+precomputed thresholds) so a forecast is assessed against every barangay with a
+handful of vector comparisons. Warning messages are only formatted for the
+barangays that actually get flagged.
+
+This module deliberately does not import TensorFlow so it can be used from the
+web process as well as from the predictor.
+"""
+import logging
+
+import numpy as np
+from django.db import connection
+
+from weatherapp.utils.cache import CACHE_TIMEOUTS, safe_cache_get, safe_cache_set
+
+logger = logging.getLogger(__name__)
+
+# Risk level codes, ordered so that a higher code means a higher priority
+RISK_NONE = 0
+RISK_LOW = 1
+RISK_MODERATE = 2
+RISK_HIGH = 3
+RISK_LEVELS = ("None", "Low", "Moderate", "High")
+RISK_PRIORITY = {"High": RISK_HIGH, "Moderate": RISK_MODERATE, "Low": RISK_LOW}
+
+# PAGASA rainfall intensity classes (mm/h). A rate <= 0.01 is "None"; every
+# other class starts at its lower bound (inclusive).
+INTENSITY_LABELS = ("None", "Light", "Moderate", "Heavy", "Intense", "Torrential")
+INTENSITY_LOWER_BOUNDS = np.array([2.5, 7.6, 15.0, 30.0])
+HIGH_RISK_INTENSITIES = ("Heavy", "Intense", "Torrential")
+HEAVY_RAIN_RATE = 7.6
+
+# Base thresholds, divided by each barangay's risk multiplier
+BASE_RAIN_THRESHOLD = 2.5
+BASE_DURATION_THRESHOLD = 60.0
+MIN_MONITORED_RAIN_RATE = 1.0
+
+# Quantized scenario axes for the precomputed what-if lookup grid
+RAIN_RATE_BUCKETS = np.arange(0.0, 50.5, 0.5)  # mm/h
+DURATION_BUCKETS = np.arange(0.0, 370.0, 10.0)  # minutes
+RISK_GRID_CACHE_KEY = 'barangay_data:risk_lookup_grid'
+
+
+def intensity_codes(rates_mm_h):
+    """
+    Classify rainfall rates into indexes of INTENSITY_LABELS.
+
+    Vectorized counterpart of ``get_rain_intensity``; accepts any array shape.
+    """
+    rates = np.asarray(rates_mm_h, dtype=np.float64)
+    codes = np.digitize(rates, INTENSITY_LOWER_BOUNDS) + 1
+    return np.where(rates <= 0.01, 0, codes)
+
+
+class BarangayRiskTable:
+    """Columnar view of ``BARANGAY_RISK_DATA`` used for vectorized assessment."""
+
+    def __init__(self, names, land_types, multipliers, descriptions):
+        self.names = tuple(names)
+        self.descriptions = tuple(descriptions)
+        self.multipliers = np.asarray(multipliers, dtype=np.float64)
+
+        # Land types are stored as small integer codes into a tuple of labels
+        land_labels, land_codes = np.unique(np.asarray(land_types, dtype=object), return_inverse=True)
+        self.land_types = tuple(land_labels)
+        self.land_codes = land_codes.astype(np.int16)
+        self._area_suffixes = tuple(label.replace('_', ' ').title() for label in self.land_types)
+
+        with np.errstate(divide='ignore'):
+            self.rain_thresholds = BASE_RAIN_THRESHOLD / self.multipliers
+            self.duration_thresholds = BASE_DURATION_THRESHOLD / self.multipliers
+
+    @classmethod
+    def from_mapping(cls, risk_data):
+        """Build a table from the ``{name: {land_type, risk_multiplier, description}}`` mapping."""
+        names = list(risk_data)
+        return cls(
+            names,
+            [risk_data[name]["land_type"] for name in names],
+            [risk_data[name]["risk_multiplier"] for name in names],
+            [risk_data[name]["description"] for name in names],
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    def _risk_codes(self, rain_rate, duration, high):
+        """Core threshold test; inputs broadcast against the barangay axis (last)."""
+        flooding = (rain_rate >= self.rain_thresholds) | (
+            (rain_rate > MIN_MONITORED_RAIN_RATE) & (duration > self.duration_thresholds)
+        )
+        monitored = (rain_rate > MIN_MONITORED_RAIN_RATE) & (self.multipliers > 1.0)
+        codes = np.where(
+            flooding,
+            np.where(high, RISK_HIGH, RISK_MODERATE),
+            np.where(monitored, RISK_LOW, RISK_NONE),
+        )
+        return codes.astype(np.int8)
+
+    def risk_codes(self, rain_rate, duration, intensity_label):
+        """Risk level code (see RISK_LEVELS) for every barangay under one forecast."""
+        high = intensity_label in HIGH_RISK_INTENSITIES or rain_rate >= HEAVY_RAIN_RATE
+        return self._risk_codes(float(rain_rate), float(duration), high)
+
+    def risk_grid(self, rain_rates, durations):
+        """
+        Risk level codes for a matrix of scenarios.
+
+        Args:
+            rain_rates: 1-D array of rain rates (mm/h)
+            durations: 1-D array of durations (minutes)
+
+        Returns:
+            np.ndarray: int8 array of shape (len(rain_rates), len(durations), len(table)).
+            The intensity label is derived from each rain rate, as ``predict_rain`` does.
+        """
+        rates = np.asarray(rain_rates, dtype=np.float64)[:, None, None]
+        durs = np.asarray(durations, dtype=np.float64)[None, :, None]
+        return self._risk_codes(rates, durs, rates >= HEAVY_RAIN_RATE)
+
+    def assess(self, rain_rate_mm_h, duration, intensity_label):
+        """
+        Assess one forecast and build warning dicts for the flagged barangays only.
+
+        Warnings are ordered High, Moderate, Low; barangays keep table order within a level.
+        """
+        codes = self.risk_codes(rain_rate_mm_h, duration, intensity_label)
+        flagged = np.flatnonzero(codes)
+        flagged = flagged[np.argsort(-codes[flagged], kind='stable')]
+        return [self._build_warning(i, int(codes[i]), rain_rate_mm_h, duration, intensity_label) for i in flagged]
+
+    def _build_warning(self, index, code, rain_rate_mm_h, duration, intensity_label):
+        barangay = self.names[index]
+        land_code = self.land_codes[index]
+        land_description = self.descriptions[index]
+
+        if code == RISK_HIGH:
+            message = f"High flood risk in {barangay} due to predicted {intensity_label} rain ({rain_rate_mm_h:.1f}mm/h) over {duration:.0f} minutes. {land_description}."
+        elif code == RISK_MODERATE:
+            message = f"Moderate flood risk in {barangay} due to predicted {intensity_label} rain ({rain_rate_mm_h:.1f}mm/h). {land_description}."
+        else:
+            message = f"Low flood risk in {barangay}. Monitor conditions as {land_description}."
+
+        return {
+            "barangay": barangay, "land_type": self.land_types[land_code],
+            "area": f"{barangay} ({self._area_suffixes[land_code]})",
+            "risk_level": RISK_LEVELS[code], "message": message,
+            "rain_rate": rain_rate_mm_h, "duration": duration, "intensity": intensity_label
+        }
+
+
+class RiskLookupGrid:
+    """
+    Precomputed risk levels over quantized rain-rate and duration buckets.
+
+    Queries are rounded *up* to the next bucket so a lookup never understates the
+    risk of the exact assessment. Queries beyond the last bucket on either axis
+    are assessed exactly instead. Non-finite rates and durations are rejected.
+    """
+
+    def __init__(self, table, rain_rate_buckets=RAIN_RATE_BUCKETS, duration_buckets=DURATION_BUCKETS):
+        self.table = table
+        self.rain_rate_buckets = np.asarray(rain_rate_buckets, dtype=np.float64)
+        self.duration_buckets = np.asarray(duration_buckets, dtype=np.float64)
+        self.levels = table.risk_grid(self.rain_rate_buckets, self.duration_buckets)
+
+    @staticmethod
+    def _bucket_index(buckets, value):
+        index = int(np.searchsorted(buckets, value))
+        return index if index < len(buckets) else None
+
+    def bucket_indexes(self, rain_rate, duration):
+        """
+        Indexes of the buckets used to answer a (rain_rate, duration) query.
+
+        Returns:
+            tuple: ``(rate_index, duration_index)``; an index is None when the
+            query lies beyond the last bucket of that axis.
+
+        Raises:
+            ValueError: rain_rate or duration is NaN or infinite.
+        """
+        if not (np.isfinite(rain_rate) and np.isfinite(duration)):
+            raise ValueError("rain_rate and duration must be finite numbers")
+        return (
+            self._bucket_index(self.rain_rate_buckets, rain_rate),
+            self._bucket_index(self.duration_buckets, duration),
+        )
+
+    def lookup(self, rain_rate, duration):
+        """Risk level codes for every barangay at the given scenario."""
+        rate_index, duration_index = self.bucket_indexes(rain_rate, duration)
+        if rate_index is None or duration_index is None:
+            return self.table.risk_grid([rain_rate], [duration])[0, 0]
+        return self.levels[rate_index, duration_index]
+
+    def flagged(self, rain_rate, duration):
+        """Barangays at risk for the scenario, highest risk first."""
+        codes = self.lookup(rain_rate, duration)
+        flagged = np.flatnonzero(codes)
+        flagged = flagged[np.argsort(-codes[flagged], kind='stable')]
+        return [
+            {
+                "barangay": self.table.names[i],
+                "land_type": self.table.land_types[self.table.land_codes[i]],
+                "risk_level": RISK_LEVELS[codes[i]],
+            }
+            for i in flagged
+        ]
+
+    def to_dict(self):
+        """JSON-serializable dump of the whole grid."""
+        return {
+            "rain_rate_buckets": self.rain_rate_buckets.tolist(),
+            "duration_buckets": self.duration_buckets.tolist(),
+            "barangays": list(self.table.names),
+            "risk_levels": list(RISK_LEVELS),
+            "grid": self.levels.tolist(),
+        }
+
+
+def fetch_barangay_risk_data():
+    """
+    Read the barangay risk table from the database.
+
+    Returns:
+        dict: ``{barangay_name: {land_type, risk_multiplier, description}}``
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT barangay_name, land_description, flood_risk_multiplier, flood_risk_summary
+            FROM bago_city_barangay_risk
+        """)
+        return {
+            name: {
+                "land_type": land_type,
+                "risk_multiplier": float(multiplier),
+                "description": description
+            }
+            for name, land_type, multiplier, description in cursor.fetchall()
+        }
+
+
+def rebuild_risk_lookup_grid():
+    """Rebuild the what-if lookup grid from the database and share it through the cache."""
+    grid = RiskLookupGrid(BarangayRiskTable.from_mapping(fetch_barangay_risk_data()))
+    safe_cache_set(RISK_GRID_CACHE_KEY, grid, CACHE_TIMEOUTS['barangay_data'])
+    logger.info("Rebuilt barangay risk lookup grid for %s barangays", len(grid.table))
+    return grid
+
+
+def get_risk_lookup_grid():
+    """Return the cached what-if lookup grid, building it on a cache miss."""
+    grid = safe_cache_get(RISK_GRID_CACHE_KEY)
+    if grid is None:
+        grid = rebuild_risk_lookup_grid()
+    return grid
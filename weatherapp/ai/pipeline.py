@@ -0,0 +1,333 @@
+"""
+Rain prediction pipeline shared by the standalone predictor loop and Celery.
+
+One PredictionPipeline instance per process runs every cycle through the same
+steps: fetch window -> predict -> persist -> assess -> publish. Schedulers only
+decide *when* a cycle runs:
+
+- IntervalScheduler: the long-running ``python -m weatherapp.ai.predictor`` process
+- EventScheduler: the same process, woken by fresh-ingest triggers (see triggers.py)
+- Celery beat: ``weatherapp.tasks.predict_rain_task`` on the same interval
+
+``settings.PREDICTION_SCHEDULER`` selects which of the two drives the pipeline, and
+a cache-backed run gate makes sure at most one cycle runs per interval even if
+both happen to be active.
+"""
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from weatherapp.ai import predictor, triggers
+from weatherapp.utils.cache import safe_cache_get, safe_cache_set
+
+logger = logging.getLogger(__name__)
+
+RUN_GATE_CACHE_KEY = 'prediction:run_gate'
+# Leeway so a scheduler ticking exactly once per interval is never gated out
+RUN_GATE_SLACK_SECONDS = 60
+
+# Prediction memo: windows are quantized to roughly sensor precision per feature
+# (temperature, humidity, wind speed, pressure, hour) before hashing, so a window
+# that has not really changed maps to the same key. A hit skips the model call and
+# the ai_predictions insert; the flood risk is still assessed and published.
+MEMO_CACHE_PREFIX = 'prediction:memo'
+MEMO_QUANTUM = np.array([0.1, 0.5, 0.1, 0.1, 1.0])
+MEMO_TIMEOUT = 6 * 3600
+
+
+def prediction_memo_key(window, model_version):
+    """Cache key for a prediction: quantized window digest plus model version."""
+    quantized = np.round(np.asarray(window, dtype=np.float64) / MEMO_QUANTUM).astype(np.int64)
+    digest = hashlib.sha1(quantized.tobytes()).hexdigest()
+    return f'{MEMO_CACHE_PREFIX}:{model_version}:{digest}'
+
+
+class PredictionPipeline:
+    """
+    Fetch window, predict, persist, assess and publish one prediction cycle.
+
+    Args:
+        publishers: Optional callables ``publisher(result, flood_warnings)`` run after
+            the flood warnings are stored (e.g. alert dispatch). A failing publisher
+            is logged and does not affect the others.
+    """
+
+    def __init__(self, publishers=None):
+        self.publishers = list(publishers or [])
+
+    # --- Steps ---------------------------------------------------------
+
+    def fetch_window(self):
+        """Latest SEQUENCE_LENGTH x FEATURE_COUNT feature window, or None."""
+        sequence = predictor.get_sequence_data_from_db()
+        if sequence is None:
+            return None
+        return np.array(sequence, dtype=np.float32)
+
+    def predict(self, window):
+        """Run the rain model on a window and return the result dict, or None."""
+        predictor._load_model()
+        amount_mm, duration_min, intensity, rate_mm_h = predictor.predict_rain(window)
+        if amount_mm is None:
+            return None
+        return {
+            'amount_mm': amount_mm,
+            'duration_min': duration_min,
+            'intensity': intensity,
+            'rate_mm_h': rate_mm_h,
+        }
+
+    def persist(self, result):
+        """Store the prediction in ai_predictions (PH time, as the dashboards expect)."""
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO ai_predictions (predicted_rain, duration, intensity, created_at)
+                VALUES (%s, %s, %s, DATE_ADD(CURRENT_TIMESTAMP(), INTERVAL 8 HOUR))
+            """, [result['rate_mm_h'], result['duration_min'], result['intensity']])
+
+    def assess(self, result):
+        """Flood warnings for the prediction, using the current barangay risk table."""
+        # One small query per cycle keeps multipliers edited through update_barangay live
+        predictor.get_all_barangay_risk_data_from_db()
+        return predictor.assess_flood_risk_by_barangay(
+            result['rate_mm_h'], result['duration_min'], result['intensity']
+        )
+
+    def publish(self, result, flood_warnings):
+        """Store the flood warnings and hand the cycle to the registered publishers."""
+        if flood_warnings:
+            logger.warning("Flood warnings issued for %s barangays", len(flood_warnings))
+            for warning in flood_warnings:
+                logger.warning(
+                    "Flood warning %s risk for %s (%s): %s",
+                    warning['risk_level'],
+                    warning['barangay'],
+                    warning['land_type'],
+                    warning['message'],
+                )
+            predictor.replace_flood_warnings(flood_warnings)
+            logger.info("%s flood warnings inserted into the database", len(flood_warnings))
+        else:
+            logger.info("No flood warnings issued for this cycle")
+
+        for publisher in self.publishers:
+            try:
+                publisher(result, flood_warnings)
+            except Exception:
+                logger.exception("Prediction publisher %r failed", publisher)
+
+    # --- Orchestration -------------------------------------------------
+
+    def run_once(self, force=False):
+        """
+        Run one full cycle.
+
+        Args:
+            force: Skip the once-per-interval run gate.
+
+        Returns:
+            dict: The prediction result, or None if the cycle was skipped or failed.
+        """
+        if not force and not acquire_run_gate():
+            logger.info("Prediction already ran within this interval; skipping cycle")
+            return None
+
+        triggers.record_cycle_start()
+        now_pst = datetime.now(predictor.PHILIPPINE_TZ)
+        logger.info("Running prediction cycle at %s PST", now_pst.strftime('%Y-%m-%d %H:%M:%S'))
+
+        try:
+            window = self.fetch_window()
+            if window is None:
+                logger.warning("Prediction cycle aborted due to insufficient weather data")
+                return None
+
+            latest_temp, latest_humidity, wind_speed, barometric_pressure, current_hour = window[-1]
+            logger.debug(
+                "Latest weather entry temp=%.2f°C humidity=%.2f%% wind=%.2f m/s pressure=%.2f hPa hour=%s",
+                latest_temp,
+                latest_humidity,
+                wind_speed,
+                barometric_pressure,
+                int(current_hour),
+            )
+
+            predictor._load_model()
+            memo_key = prediction_memo_key(window, predictor.get_model_version())
+            result = safe_cache_get(memo_key)
+            memo_hit = result is not None
+            if memo_hit:
+                # Same window and model as an earlier cycle: the prediction is already
+                # stored, but the risk assessment still sees the current barangay table
+                logger.info("Input window unchanged since the last prediction; reusing it")
+            else:
+                result = self.predict(window)
+                if result is None:
+                    logger.error("Prediction failed during ML model execution")
+                    return None
+                safe_cache_set(memo_key, result, MEMO_TIMEOUT)
+
+            logger.info(
+                "Prediction results rainfall=%.2f mm duration=%.2f min rate=%.2f mm/h intensity=%s",
+                result['amount_mm'],
+                result['duration_min'],
+                result['rate_mm_h'],
+                result['intensity'],
+            )
+
+            if not memo_hit:
+                self.persist(result)
+                logger.info("Rain prediction results inserted into the database")
+
+            flood_warnings = self.assess(result)
+            self.publish(result, flood_warnings)
+            return result
+
+        except Exception:
+            logger.exception("Unexpected error during prediction cycle")
+            return None
+        finally:
+            # Explicitly close the persistent Django connection so the next cycle
+            # starts fresh, preventing 'Server has gone away'
+            connection.close()
+
+
+def get_interval_seconds():
+    return settings.PREDICTION_INTERVAL_SECONDS
+
+
+def acquire_run_gate():
+    """
+    Claim the current prediction interval across processes.
+
+    Returns True if the caller may run a cycle. If the cache is unavailable the
+    cycle is allowed to run rather than silently stopping predictions.
+    """
+    timeout = max(1, get_interval_seconds() - RUN_GATE_SLACK_SECONDS)
+    try:
+        return cache.add(RUN_GATE_CACHE_KEY, time.time(), timeout)
+    except Exception as e:
+        logger.warning("Cache error acquiring prediction run gate: %s", e)
+        return True
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+    """
+    Process-wide pipeline instance, so the model is loaded (and hot-reloaded) once
+    per process. Flood alerts are published through the alert dispatcher when
+    ``ALERT_DISPATCH_ENABLED`` is set.
+    """
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                publishers = []
+                if settings.ALERT_DISPATCH_ENABLED:
+                    from weatherapp.alert_dispatcher import get_dispatcher
+                    publishers.append(get_dispatcher())
+                _pipeline = PredictionPipeline(publishers=publishers)
+                predictor.start_model_watcher()
+    return _pipeline
+
+
+class IntervalScheduler:
+    """Run the pipeline every ``interval_seconds`` in the current process."""
+
+    def __init__(self, pipeline, interval_seconds=None):
+        self.pipeline = pipeline
+        self.interval_seconds = interval_seconds or get_interval_seconds()
+
+    def run_forever(self):
+        while True:
+            try:
+                self.pipeline.run_once()
+
+                logger.info("Cycle complete. Waiting for %s minutes", self.interval_seconds / 60)
+                time.sleep(self.interval_seconds)
+
+            except KeyboardInterrupt:
+                logger.info("Prediction loop stopped by user")
+                break
+            except Exception:
+                logger.exception("Unexpected error in prediction loop. Retrying in 60 seconds")
+                time.sleep(60)
+
+
+class EventScheduler:
+    """
+    Run the pipeline when fresh sensor data is announced on the trigger channel.
+
+    Triggers that arrive while waiting out the debounce / minimum spacing are
+    coalesced into a single cycle. If nothing is announced for a full interval the
+    pipeline still runs on the interval schedule.
+    """
+
+    # Upper bound on a single blocking poll, so the interval fallback stays on time
+    POLL_SECONDS = 5
+
+    def __init__(self, pipeline, client, interval_seconds=None):
+        self.pipeline = pipeline
+        self.client = client
+        self.interval_seconds = interval_seconds or get_interval_seconds()
+
+    def _drain(self, pubsub):
+        drained = 0
+        while pubsub.get_message(timeout=0) is not None:
+            drained += 1
+        return drained
+
+    def run_forever(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(triggers.TRIGGER_CHANNEL)
+        logger.info("Listening for prediction triggers on %s", triggers.TRIGGER_CHANNEL)
+        next_interval_run = time.monotonic()
+
+        while True:
+            try:
+                remaining = next_interval_run - time.monotonic()
+                if remaining <= 0:
+                    self.pipeline.run_once()
+                    next_interval_run = time.monotonic() + self.interval_seconds
+                    continue
+
+                message = pubsub.get_message(timeout=min(remaining, self.POLL_SECONDS))
+                if message is None:
+                    continue
+
+                delay = triggers.trigger_delay_seconds()
+                logger.info("Prediction triggered by sensor %s; running in %.0fs", message.get('data'), delay)
+                time.sleep(delay)
+                coalesced = self._drain(pubsub)
+                if coalesced:
+                    logger.info("Coalesced %s further prediction triggers", coalesced)
+
+                self.pipeline.run_once(force=True)
+                next_interval_run = time.monotonic() + self.interval_seconds
+
+            except KeyboardInterrupt:
+                logger.info("Prediction loop stopped by user")
+                break
+            except Exception:
+                logger.exception("Unexpected error in prediction event loop. Retrying in 60 seconds")
+                time.sleep(60)
+
+
+def get_scheduler(pipeline):
+    """Scheduler for the standalone predictor process, per settings.PREDICTION_TRIGGER."""
+    if triggers.event_triggers_enabled():
+        client = triggers.get_redis_client()
+        if client is not None:
+            return EventScheduler(pipeline, client)
+        logger.warning("PREDICTION_TRIGGER is 'event' but REDIS_URL is not set; using the interval schedule")
+    return IntervalScheduler(pipeline)
@@ -28,17 +28,19 @@ try:
 except RuntimeError:
     # Threading config must be done before TensorFlow operations
     pass
-import time
 import sys
+import threading
 import django
 from django.conf import settings
-from django.db import connection # Import the connection object
+from django.db import connection, transaction # Import the connection object
 from dotenv import load_dotenv
 import numpy as np
-import joblib
-from datetime import datetime
 import pytz 
 
+from weatherapp.ai.flood_risk import BarangayRiskTable, fetch_barangay_risk_data
+from weatherapp.ai.registry import BUNDLED_VERSION, ModelRegistry, RegistryError, bundled_artifacts
+from weatherapp.ai.scaling import load_scaler
+
 # Load environment variables (needed for Django settings/DB config)
 load_dotenv()
 
@@ -46,16 +48,16 @@ load_dotenv()
 PHILIPPINE_TZ = pytz.timezone('Asia/Manila')
 # ----------------------------
 
-# Define file paths for the model and scalers.
+# Bundled model and scalers, served when the model registry has no active version.
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_FILE = os.path.join(BASE_DIR, "rain_model.h5")
-SCALER_X_FILE = os.path.join(BASE_DIR, "scaler_X.pkl")
-SCALER_Y_FILE = os.path.join(BASE_DIR, "scaler_y.pkl")
+SCALER_X_FILE = os.path.join(BASE_DIR, "scaler_X.npz")
+SCALER_Y_FILE = os.path.join(BASE_DIR, "scaler_y.npz")
 
 # Define the number of time steps (sequence length) the model requires.
 SEQUENCE_LENGTH = 6
-PREDICTION_INTERVAL_SECONDS = 3600 
 BARANGAY_RISK_DATA = {}
+_barangay_risk_table = None
 logger = logging.getLogger(__name__)
 
 # =======================================================
@@ -63,30 +65,21 @@ logger = logging.getLogger(__name__)
 # NOTE: This only runs once during startup, so a single open/close is fine.
 # =======================================================
 def get_all_barangay_risk_data_from_db():
-    global BARANGAY_RISK_DATA
+    global BARANGAY_RISK_DATA, _barangay_risk_table
     logger.info("Fetching barangay risk data from bago_city_barangay_risk table")
     try:
-        # Use connection.cursor() for a fresh cursor inside a block
-        with connection.cursor() as cursor:
-            query = """
-            SELECT barangay_name, land_description, flood_risk_multiplier, flood_risk_summary
-            FROM bago_city_barangay_risk
-            """
-            cursor.execute(query)
-            data = cursor.fetchall()
-            
-            if not data:
-                logger.warning("No risk data found in the database. Using fallback values.")
-                return {}
-
-            for name, land_type, multiplier, description in data:
-                BARANGAY_RISK_DATA[name] = {
-                    "land_type": land_type,
-                    "risk_multiplier": float(multiplier),
-                    "description": description
-                }
-            logger.info("Loaded risk data for %s barangays", len(BARANGAY_RISK_DATA))
-            return BARANGAY_RISK_DATA
+        data = fetch_barangay_risk_data()
+
+        if not data:
+            logger.warning("No risk data found in the database. Using fallback values.")
+            return {}
+
+        BARANGAY_RISK_DATA.clear()
+        BARANGAY_RISK_DATA.update(data)
+        # Rebuild the vectorized table on the next assessment
+        _barangay_risk_table = None
+        logger.info("Loaded risk data for %s barangays", len(BARANGAY_RISK_DATA))
+        return BARANGAY_RISK_DATA
 
     except Exception as e:
         logger.exception("Error reading database for barangay risk data")
@@ -138,14 +131,21 @@ def get_sequence_data_from_db():
         return None
 
 # =======================================================
-# 2. Model and Scalers Loading (LAZY LOADING)
+# 2. Model and Scalers Loading (LAZY LOADING + HOT RELOAD)
 # =======================================================
+# Artifacts come from the versioned model registry (see registry.py), falling
+# back to the files bundled next to this module. The loaded model and scalers are
+# kept together in one ModelBundle that is swapped as a single reference, so a
+# prediction never mixes a new model with old scalers.
 model = None
 scaler_X = None
 scaler_y = None
 FEATURE_COUNT = 5
 _model_loaded = False
-_model_lock = None
+_model_lock = threading.Lock()
+_active_bundle = None
+_rejected_version = None
+_model_watcher = None
 
 class FixedInputLayer(tf.keras.layers.InputLayer):
     def __init__(self, **kwargs):
@@ -162,44 +162,183 @@ class DTypePolicy:
     @property
     def variable_dtype(self): return tf.float32 
 
+
+class ModelBundle:
+    """
+    A loaded model with the scalers it was trained with.
+
+    Inference goes through ``infer``, a traced ``tf.function`` around the model's
+    ``__call__``. Unlike ``model.predict`` it does not build a data pipeline per
+    call, which dominates the cost of a single 1x6x5 window. The signature allows
+    any batch size, so single and batched predictions share one graph.
+
+    The scalers are ``scaling.AffineScaler`` instances: scaling is one NumPy
+    multiply-add on each side of the model instead of two scikit-learn calls with
+    their input validation.
+    """
+
+    def __init__(self, version, model, scaler_X, scaler_y):
+        self.version = version
+        self.model = model
+        self.scaler_X = scaler_X
+        self.scaler_y = scaler_y
+        self.infer = tf.function(
+            lambda windows: model(windows, training=False),
+            input_signature=[tf.TensorSpec([None, SEQUENCE_LENGTH, FEATURE_COUNT], tf.float32)],
+        )
+
+    def predict(self, windows):
+        """
+        Run the model on raw feature windows.
+
+        Args:
+            windows: Array of shape (N, SEQUENCE_LENGTH, FEATURE_COUNT), unscaled
+
+        Returns:
+            np.ndarray: Shape (N, 2) of [amount_mm, duration_min], unscaled
+        """
+        scaled = self.scaler_X.transform(windows)
+        return self.scaler_y.inverse_transform(self.infer(tf.constant(scaled)).numpy())
+
+
+def _load_bundle(artifacts):
+    """Load and warm up the model and scalers of a registry version."""
+    custom_objects = {'InputLayer': FixedInputLayer, 'DTypePolicy': DTypePolicy}
+    with tf.keras.utils.custom_object_scope(custom_objects):
+        loaded_model = tf.keras.models.load_model(artifacts.model_path, compile=False)
+
+    # Use minimal memory configuration for model
+    loaded_model.compile(optimizer="adam", loss="mean_squared_error")
+
+    bundle = ModelBundle(
+        artifacts.version,
+        loaded_model,
+        load_scaler(artifacts.scaler_x_path),
+        load_scaler(artifacts.scaler_y_path),
+    )
+    _warm_up(bundle)
+    return bundle
+
+
+def _warm_up(bundle):
+    """
+    Trace the inference graph with a throwaway prediction so the first real
+    prediction does not pay for it, and reject bundles that cannot produce a
+    sane prediction.
+    """
+    window = np.zeros((1, SEQUENCE_LENGTH, FEATURE_COUNT), dtype=np.float32)
+    window[..., 1] = 75.0    # humidity
+    window[..., 3] = 1010.0  # barometric pressure
+    output = bundle.predict(window)
+    if output.shape != (1, 2) or not np.all(np.isfinite(output)):
+        raise ValueError(f"Warm-up inference of model version {bundle.version} returned {output!r}")
+
+
+def _activate_bundle(bundle):
+    global model, scaler_X, scaler_y, _active_bundle, _model_loaded
+    _active_bundle = bundle
+    model, scaler_X, scaler_y = bundle.model, bundle.scaler_X, bundle.scaler_y
+    _model_loaded = True
+
+
 def _load_model():
     """Lazy load the model only when needed. Thread-safe."""
-    global model, scaler_X, scaler_y, _model_loaded, _model_lock
-    
     if _model_loaded:
         return
-    
-    # Use threading lock for thread safety
-    import threading
-    if _model_lock is None:
-        _model_lock = threading.Lock()
-    
+
     with _model_lock:
         # Double-check after acquiring lock
         if _model_loaded:
             return
-        
+
         try:
             logger.info("Loading TensorFlow model (lazy loading)...")
-            custom_objects = {'InputLayer': FixedInputLayer, 'DTypePolicy': DTypePolicy}
-            with tf.keras.utils.custom_object_scope(custom_objects):
-                model = tf.keras.models.load_model(MODEL_FILE, compile=False)
-            
-            # Use minimal memory configuration for model
-            model.compile(optimizer="adam", loss="mean_squared_error")
-            logger.info("Rain model loaded successfully")
-            
-            scaler_X = joblib.load(SCALER_X_FILE)
-            scaler_y = joblib.load(SCALER_Y_FILE)
-            logger.info("Scalers loaded successfully")
-            
-            _model_loaded = True
-            
+            try:
+                artifacts = ModelRegistry().resolve()
+            except RegistryError as e:
+                logger.error("Active model version unusable (%s); using bundled model", e)
+                artifacts = bundled_artifacts()
+
+            _activate_bundle(_load_bundle(artifacts))
+            logger.info("Rain model version %s loaded and warmed up", artifacts.version)
+
         except FileNotFoundError as e:
             logger.warning("One of the required files was not found: %s", e.filename)
         except Exception as e:
             logger.exception("Unexpected error during model/scaler loading")
 
+
+def get_model_version():
+    """Version of the model currently serving predictions, or None."""
+    bundle = _active_bundle
+    return bundle.version if bundle is not None else None
+
+
+def reload_model_if_changed(registry=None):
+    """
+    Swap in the registry's active version if it differs from the loaded one.
+
+    The new bundle is loaded and warmed up before the swap, so predictions keep
+    using the previous model until the new one is ready. A version that fails to
+    load is remembered and not retried until the registry points elsewhere.
+
+    Returns:
+        bool: True if a new model was swapped in.
+    """
+    global _rejected_version
+    registry = registry or ModelRegistry()
+    wanted = registry.current_version() or BUNDLED_VERSION
+    if wanted == get_model_version() or wanted == _rejected_version:
+        return False
+
+    logger.info("Model registry points to version %s; loading for hot swap", wanted)
+    try:
+        bundle = _load_bundle(registry.resolve())
+    except Exception:
+        logger.exception("Model version %s rejected; keeping version %s", wanted, get_model_version())
+        _rejected_version = wanted
+        return False
+
+    with _model_lock:
+        previous = get_model_version()
+        _activate_bundle(bundle)
+    _rejected_version = None
+    logger.info("Swapped rain model version %s -> %s", previous, bundle.version)
+    return True
+
+
+class ModelWatcher(threading.Thread):
+    """Background thread polling the model registry for a new active version."""
+
+    def __init__(self, poll_seconds):
+        super().__init__(name="model-registry-watcher", daemon=True)
+        self.poll_seconds = poll_seconds
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.poll_seconds):
+            try:
+                if _model_loaded:
+                    reload_model_if_changed()
+            except Exception:
+                logger.exception("Model registry watcher error")
+
+    def stop(self):
+        self._stopped.set()
+
+
+def start_model_watcher():
+    """Start the registry watcher once per process (no-op if polling is disabled)."""
+    global _model_watcher
+    poll_seconds = settings.MODEL_REGISTRY_POLL_SECONDS
+    if poll_seconds <= 0:
+        return None
+    with _model_lock:
+        if _model_watcher is None or not _model_watcher.is_alive():
+            _model_watcher = ModelWatcher(poll_seconds)
+            _model_watcher.start()
+    return _model_watcher
+
 # =======================================================
 # 3. Helper and Prediction Functions (REMAINS THE SAME)
 # =======================================================
@@ -243,32 +382,18 @@ def predict_rain(input_features):
     latest_data = input_features[-1]
     latest_temp, latest_humidity, _, _, _ = latest_data
 
+    # --- ML Model Prediction Logic ---
+    # Lazy load model if not already loaded
+    _load_model()
+    
     # --- Fallback Logic ---
-    # Use simple heuristics if ML model/scalers not loaded
+    # Use simple heuristics if ML model/scalers could not be loaded
     # Based on humidity and temperature patterns:
     # - High humidity (>80%) + low temp (<30°C) = higher rain probability
     # - Moderate humidity (>70%) = moderate rain probability
     # - Otherwise = light rain probability
-    if model is None or scaler_X is None or scaler_y is None:
-        if latest_humidity > 80 and latest_temp < 30:
-            predicted_amount_mm, duration_min = 5.0, 30.0
-        elif latest_humidity > 70:
-            predicted_amount_mm, duration_min = 2.0, 15.0
-        else:
-            predicted_amount_mm, duration_min = 0.5, 5.0
-        
-        # Calculate rainfall rate: (total_mm / duration_min) * 60 = mm/hour
-        rate_mm_h = (predicted_amount_mm / duration_min) * 60 if duration_min > 0 else 0.0
-        intensity = get_rain_intensity(rate_mm_h)
-        
-        return predicted_amount_mm, duration_min, intensity, rate_mm_h
-    
-    # --- ML Model Prediction Logic ---
-    # Lazy load model if not already loaded
-    _load_model()
-    
-    if model is None or scaler_X is None or scaler_y is None:
-        # Fallback if model still not loaded
+    bundle = _active_bundle
+    if bundle is None:
         logger.warning("Model not available, using fallback prediction")
         if latest_humidity > 80 and latest_temp < 30:
             predicted_amount_mm, duration_min = 5.0, 30.0
@@ -281,27 +406,14 @@ def predict_rain(input_features):
         intensity = get_rain_intensity(rate_mm_h)
         return predicted_amount_mm, duration_min, intensity, rate_mm_h
     
-    # Step 1: Scale input features using the same scaler used during training
-    # This ensures features are in the same range (typically 0-1 or standardized)
+    # Steps 1-4: Scale the window, run the traced model on a (1, 6, 5) batch and
+    # inverse transform the output back to mm and minutes (see ModelBundle.predict)
     try:
-        input_scaled = scaler_X.transform(input_features)
+        y_pred = bundle.predict(np.asarray(input_features).reshape(1, SEQUENCE_LENGTH, -1))
     except ValueError:
         logger.exception("Error during feature scaling - input shape mismatch")
         return None, None, "Error", None
 
-    # Step 2: Reshape for LSTM input format
-    # LSTM expects: (batch_size, sequence_length, features_per_timestep)
-    # Shape: (1, 6, 5) = 1 sample, 6 time steps, 5 features per step
-    X_seq = input_scaled.reshape(1, SEQUENCE_LENGTH, -1)
-    
-    # Step 3: Run prediction through the LSTM model
-    # Model outputs scaled predictions (normalized during training)
-    # Use minimal batch size and disable verbose to save memory
-    y_pred_scaled = model.predict(X_seq, verbose=0, batch_size=1)
-    
-    # Step 4: Inverse transform to get actual values (mm and minutes)
-    y_pred = scaler_y.inverse_transform(y_pred_scaled)
-    
     # Step 5: Extract and validate predictions
     # Ensure non-negative values (rainfall can't be negative)
     predicted_amount_mm = max(0, float(y_pred[0][0]))
@@ -318,157 +430,96 @@ def predict_rain(input_features):
     return predicted_amount_mm, predicted_duration_minutes, intensity_label, rainfall_rate_mm_h
 
 
+
+def predict_rain_batch(windows):
+    """
+    Predict rainfall for many windows with a single model call.
+
+    Args:
+        windows: Array of shape (N, SEQUENCE_LENGTH, FEATURE_COUNT)
+
+    Returns:
+        tuple: (amount_mm, duration_min, rate_mm_h) NumPy arrays of length N, or
+        None if the model is not available. Use flood_risk.intensity_codes for labels.
+    """
+    _load_model()
+    bundle = _active_bundle
+    if bundle is None:
+        return None
+
+    y_pred = np.maximum(bundle.predict(windows), 0.0)
+    amount_mm, duration_min = y_pred[:, 0], y_pred[:, 1]
+    rate_mm_h = np.zeros_like(amount_mm)
+    np.divide(amount_mm * 60, duration_min, out=rate_mm_h, where=duration_min > 0.01)
+    return amount_mm, duration_min, rate_mm_h
+
+
+def get_barangay_risk_table():
+    """Return the vectorized risk table built from BARANGAY_RISK_DATA."""
+    global _barangay_risk_table
+    if _barangay_risk_table is None:
+        _barangay_risk_table = BarangayRiskTable.from_mapping(BARANGAY_RISK_DATA)
+    return _barangay_risk_table
+
+
 def assess_flood_risk_by_barangay(rain_rate_mm_h, duration, intensity_label):
-    warnings = []
-    
-    for barangay, data in BARANGAY_RISK_DATA.items():
-        land_type = data["land_type"]
-        risk_multiplier = data["risk_multiplier"]
-        land_description = data["description"]
-        
-        adjusted_rain_threshold = 2.5 / risk_multiplier 
-        adjusted_duration_threshold = 60 / risk_multiplier 
-        
-        if rain_rate_mm_h >= adjusted_rain_threshold or (rain_rate_mm_h > 1.0 and duration > adjusted_duration_threshold):
-            if intensity_label in ["Heavy", "Intense", "Torrential"] or rain_rate_mm_h >= 7.6:
-                risk_level = "High"
-                message = f"High flood risk in {barangay} due to predicted {intensity_label} rain ({rain_rate_mm_h:.1f}mm/h) over {duration:.0f} minutes. {land_description}."
-            else:
-                risk_level = "Moderate"
-                message = f"Moderate flood risk in {barangay} due to predicted {intensity_label} rain ({rain_rate_mm_h:.1f}mm/h). {land_description}."
-                
-            warning = {
-                "barangay": barangay, "land_type": land_type,
-                "area": f"{barangay} ({land_type.replace('_', ' ').title()})",
-                "risk_level": risk_level, "message": message,
-                "rain_rate": rain_rate_mm_h, "duration": duration, "intensity": intensity_label
-            }
-            warnings.append(warning)
-            
-        elif rain_rate_mm_h > 1.0 and risk_multiplier > 1.0: 
-            warning = {
-                "barangay": barangay, "land_type": land_type,
-                "area": f"{barangay} ({land_type.replace('_', ' ').title()})",
-                "risk_level": "Low",
-                "message": f"Low flood risk in {barangay}. Monitor conditions as {land_description}.",
-                "rain_rate": rain_rate_mm_h, "duration": duration, "intensity": intensity_label
-            }
-            warnings.append(warning)
-    
-    risk_priority = {"High": 3, "Moderate": 2, "Low": 1}
-    warnings.sort(key=lambda x: risk_priority.get(x["risk_level"], 0), reverse=True)
-    
-    return warnings
+    """
+    Assess flood risk for every barangay in BARANGAY_RISK_DATA.
 
-# =======================================================
-# 4. Main Execution Block
-# =======================================================
+    Thresholds are evaluated as vector masks over the whole risk table and
+    messages are only built for the flagged barangays (see flood_risk.py).
 
-# --- NEW FUNCTION: The core logic that runs per cycle and manages the connection ---
-def run_prediction_cycle():
-    now_pst = datetime.now(PHILIPPINE_TZ)
-    
-    logger.info("Running prediction cycle at %s PST", now_pst.strftime('%Y-%m-%d %H:%M:%S'))
-    
-    try:
-        # Step 1: Fetch Data (uses connection.cursor() internally)
-        sequence_data_list = get_sequence_data_from_db()
-        
-        if sequence_data_list is None:
-            logger.warning("Prediction cycle aborted due to insufficient weather data")
-            return
+    Returns:
+        list: Warning dicts sorted by risk level (High, Moderate, Low)
+    """
+    return get_barangay_risk_table().assess(rain_rate_mm_h, duration, intensity_label)
 
-        input_features_array = np.array(sequence_data_list, dtype=np.float32)
 
-        latest_temp, latest_humidity, wind_speed, barometric_pressure, current_hour = input_features_array[-1]
-        
-        logger.debug(
-            "Latest weather entry temp=%.2f°C humidity=%.2f%% wind=%.2f m/s pressure=%.2f hPa hour=%s",
-            latest_temp,
-            latest_humidity,
-            wind_speed,
-            barometric_pressure,
-            int(current_hour),
-        )
-        
-        # Step 2: Run Prediction
-        predicted_amount_mm, predicted_duration_minutes, intensity_label, rainfall_rate_mm_h = predict_rain(input_features_array)
-        
-        if predicted_amount_mm is None:
-            logger.error("Prediction failed during ML model execution")
-            return
+def assess_flood_risk_grid(rain_rates, durations):
+    """
+    Precompute risk levels for many forecasts at once.
 
-        logger.info(
-            "Prediction results rainfall=%.2f mm duration=%.2f min rate=%.2f mm/h intensity=%s",
-            predicted_amount_mm,
-            predicted_duration_minutes,
-            rainfall_rate_mm_h,
-            intensity_label,
-        )
+    Returns:
+        np.ndarray: Risk codes of shape (len(rain_rates), len(durations), barangays);
+        see flood_risk.RISK_LEVELS for the code labels.
+    """
+    return get_barangay_risk_table().risk_grid(rain_rates, durations)
 
-        # Step 3: Insert Rain Prediction results
-        try:
-            with connection.cursor() as cursor:
-                cursor.execute("""
-                    INSERT INTO ai_predictions (predicted_rain, duration, intensity, created_at)
-                    VALUES (%s, %s, %s, DATE_ADD(CURRENT_TIMESTAMP(), INTERVAL 8 HOUR)) 
-                """, [rainfall_rate_mm_h, predicted_duration_minutes, intensity_label])
-            logger.info("Rain prediction results inserted into the database")
-            
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT created_at FROM ai_predictions ORDER BY created_at DESC LIMIT 1")
-                db_timestamp_pst = cursor.fetchone()[0]
-                
-                logger.debug("Prediction timestamp (PST): %s", db_timestamp_pst.strftime('%Y-%m-%d %H:%M:%S PST'))
-                
-        except Exception as e:
-            logger.exception("Error inserting or fetching prediction results")
-            if hasattr(connection, 'close'): connection.close()
-            return
-            
-        # Step 4: Assess Flood Risk
-        flood_warnings = assess_flood_risk_by_barangay(rainfall_rate_mm_h, predicted_duration_minutes, intensity_label)
-        
-        # Step 5: Insert Flood Warnings
-        if flood_warnings:
-            logger.warning("Flood warnings issued for %s barangays", len(flood_warnings))
-            try:
-                with connection.cursor() as cursor:
-                    # Clear old warnings (optional, but good practice if not done elsewhere)
-                    cursor.execute("DELETE FROM flood_warnings WHERE prediction_date >= DATE_SUB(DATE_ADD(CURRENT_TIMESTAMP(), INTERVAL 8 HOUR), INTERVAL 1 HOUR)")
-                    
-                    for warning in flood_warnings:
-                        logger.warning(
-                            "Flood warning %s risk for %s (%s): %s",
-                            warning['risk_level'],
-                            warning['barangay'],
-                            warning['land_type'],
-                            warning['message'],
-                        )
-                        
-                        cursor.execute("""
-                            INSERT INTO flood_warnings (area, risk_level, message, prediction_date)
-                            VALUES (%s, %s, %s, DATE_ADD(CURRENT_TIMESTAMP(), INTERVAL 8 HOUR))
-                        """, [warning['area'], warning['risk_level'], warning['message']])
-                        
-                    logger.info("%s flood warnings inserted into the database", len(flood_warnings))
-                    
-            except Exception as e:
-                logger.exception("Error processing or inserting flood warnings")
-                if hasattr(connection, 'close'): connection.close()
-                return
-        else:
-            logger.info("No flood warnings issued for this cycle")
 
-    except Exception as e:
-        # Catch any unexpected errors during the cycle
-        logger.exception("Unexpected error during prediction cycle")
-        if hasattr(connection, 'close'): connection.close()
-    finally:
-        # CRITICAL FIX: Explicitly close the persistent Django connection
-        # This forces a fresh connection on the next cycle, preventing 'Server has gone away'
-        if hasattr(connection, 'close'):
-            connection.close()
+def replace_flood_warnings(flood_warnings):
+    """
+    Atomically replace the flood warnings issued within the last hour.
+
+    The range DELETE and a single multi-row INSERT run in one transaction, so
+    readers such as get_alerts see either the previous warning set or the new
+    one, never a half-replaced set. A failure rolls back to the previous set.
+    """
+    if not flood_warnings:
+        return
+
+    values_sql = ", ".join(
+        ["(%s, %s, %s, DATE_ADD(CURRENT_TIMESTAMP(), INTERVAL 8 HOUR))"] * len(flood_warnings)
+    )
+    params = []
+    for warning in flood_warnings:
+        params.extend([warning['area'], warning['risk_level'], warning['message']])
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM flood_warnings WHERE prediction_date >= DATE_SUB(DATE_ADD(CURRENT_TIMESTAMP(), INTERVAL 8 HOUR), INTERVAL 1 HOUR)")
+            cursor.execute(
+                "INSERT INTO flood_warnings (area, risk_level, message, prediction_date) VALUES " + values_sql,
+                params,
+            )
+
+# =======================================================
+# 4. Main Execution Block
+# =======================================================
+
+def run_prediction_cycle():
+    """Run one prediction cycle through the shared pipeline (see pipeline.py)."""
+    from weatherapp.ai.pipeline import get_pipeline
+    return get_pipeline().run_once(force=True)
 
 
 def main():
@@ -489,22 +540,28 @@ def main():
         logger.exception("Initial setup error for prediction service")
         return
 
-    # --- Start the Continuous Loop ---
-    while True:
-        try:
-            # The function now contains the logic and the critical connection management
-            run_prediction_cycle()
+    # Serve on-demand predictions from this process's model instance
+    from weatherapp.ai.server import start_server_thread
+    try:
+        server = start_server_thread()
+    except OSError:
+        logger.exception("Could not start the prediction server")
+        server = None
 
-            # --- PAUSE BEFORE THE NEXT RUN ---
-            logger.info("Cycle complete. Waiting for %s minutes", PREDICTION_INTERVAL_SECONDS/60)
-            time.sleep(PREDICTION_INTERVAL_SECONDS)
+    if settings.PREDICTION_SCHEDULER != 'loop':
+        logger.info(
+            "PREDICTION_SCHEDULER is %r; predictions run through Celery beat, standalone loop not started",
+            settings.PREDICTION_SCHEDULER,
+        )
+        if server is not None:
+            # Nothing else to run here; keep the process alive for the server thread
+            threading.Event().wait()
+        return
 
-        except KeyboardInterrupt:
-            logger.info("Prediction loop stopped by user")
-            break
-        except Exception as e:
-            logger.exception("Unexpected error in prediction loop. Retrying in 60 seconds")
-            time.sleep(60)
+    # --- Start the Continuous Loop ---
+    from weatherapp.ai.pipeline import get_pipeline, get_scheduler
+    pipeline = get_pipeline()
+    get_scheduler(pipeline).run_forever()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,278 @@
+"""
+Versioned model registry for the rain predictor.
+
+Layout under ``settings.MODEL_REGISTRY_DIR``::
+
+    CURRENT                      # name of the active version
+    versions/<version>/
+        rain_model.h5
+        scaler_X.npz             # StandardScaler parameters (see scaling.py)
+        scaler_y.npz
+        manifest.json            # version, created_at, sha256 per artifact, notes
+
+Versions are immutable once published: they are assembled in a temporary
+directory and renamed into place, and ``CURRENT`` is switched with an atomic
+``os.replace``. Readers therefore only ever see complete versions. Pickled
+scalers passed to ``publish`` are exported to ``.npz`` so the serving process
+needs neither joblib nor scikit-learn; versions published before that keep
+their ``.pkl`` scalers and still load. The predictor
+polls ``CURRENT`` and hot-swaps the model (see ``predictor.ModelWatcher``).
+
+If the registry is empty the predictor keeps using the model files bundled in
+``weatherapp/ai``.
+
+Usage::
+
+    python -m weatherapp.ai.registry publish --model rain_model.h5 \\
+        --scaler-x scaler_X.pkl --scaler-y scaler_y.pkl [--version v2] [--no-activate]
+    python -m weatherapp.ai.registry activate v1
+    python -m weatherapp.ai.registry list
+
+This module deliberately does not import TensorFlow.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from weatherapp.ai.scaling import export_scaler
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILENAME = "rain_model.h5"
+SCALER_X_FILENAME = "scaler_X.npz"
+SCALER_Y_FILENAME = "scaler_y.npz"
+ARTIFACT_FILENAMES = (MODEL_FILENAME, SCALER_X_FILENAME, SCALER_Y_FILENAME)
+# Versions published before the scaler export
+LEGACY_ARTIFACT_FILENAMES = (MODEL_FILENAME, "scaler_X.pkl", "scaler_y.pkl")
+MANIFEST_FILENAME = "manifest.json"
+CURRENT_FILENAME = "CURRENT"
+BUNDLED_VERSION = "bundled"
+
+BUNDLED_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ModelArtifacts = namedtuple("ModelArtifacts", "version model_path scaler_x_path scaler_y_path")
+
+
+class RegistryError(Exception):
+    """Raised for missing, incomplete or corrupted registry versions."""
+
+
+def sha256_file(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _atomic_write_text(path, text):
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def bundled_artifacts():
+    """Artifacts shipped with the code, used when the registry has no active version."""
+    return ModelArtifacts(
+        BUNDLED_VERSION,
+        os.path.join(BUNDLED_DIR, MODEL_FILENAME),
+        os.path.join(BUNDLED_DIR, SCALER_X_FILENAME),
+        os.path.join(BUNDLED_DIR, SCALER_Y_FILENAME),
+    )
+
+
+class ModelRegistry:
+    """
+    File-system model registry.
+
+    Args:
+        root: Registry directory; defaults to ``settings.MODEL_REGISTRY_DIR``.
+    """
+
+    def __init__(self, root=None):
+        if root is None:
+            from django.conf import settings
+            root = settings.MODEL_REGISTRY_DIR
+        self.root = str(root)
+        self.versions_dir = os.path.join(self.root, "versions")
+
+    def version_dir(self, version):
+        return os.path.join(self.versions_dir, version)
+
+    def list_versions(self):
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.versions_dir)
+            if not name.startswith(".")
+            and os.path.isfile(os.path.join(self.versions_dir, name, MANIFEST_FILENAME))
+        )
+
+    def current_version(self):
+        """Name of the active version, or None. Cheap enough to poll."""
+        try:
+            with open(os.path.join(self.root, CURRENT_FILENAME)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def load_manifest(self, version):
+        path = os.path.join(self.version_dir(version), MANIFEST_FILENAME)
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise RegistryError(f"Model version {version!r} not found in {self.root}")
+        except ValueError as e:
+            raise RegistryError(f"Invalid manifest for model version {version!r}: {e}")
+
+    def verify(self, version):
+        """
+        Check every artifact of a version against its manifest checksum.
+
+        Returns:
+            ModelArtifacts: Paths of the verified artifacts.
+
+        Raises:
+            RegistryError: If the version is missing or an artifact does not match.
+        """
+        manifest = self.load_manifest(version)
+        directory = self.version_dir(version)
+        checksums = manifest.get("files", {})
+        filenames = ARTIFACT_FILENAMES if SCALER_X_FILENAME in checksums else LEGACY_ARTIFACT_FILENAMES
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            if filename not in checksums or not os.path.isfile(path):
+                raise RegistryError(f"Model version {version!r} is missing {filename}")
+            if sha256_file(path) != checksums[filename]:
+                raise RegistryError(f"Checksum mismatch for {filename} in model version {version!r}")
+        return ModelArtifacts(version, *(os.path.join(directory, filename) for filename in filenames))
+
+    def publish(self, model_path, scaler_x_path, scaler_y_path, version=None, notes="", activate=True):
+        """
+        Copy a trained model and its scalers into a new immutable version.
+
+        Args:
+            model_path: Keras model file produced by training
+            scaler_x_path, scaler_y_path: Scalers as ``.npz`` exports or pickles
+            version: Version name; defaults to a UTC timestamp
+            notes: Free-form description stored in the manifest
+            activate: Switch CURRENT to the new version after publishing
+
+        Returns:
+            str: The published version name.
+        """
+        version = version or datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+        if os.sep in version or version.startswith("."):
+            raise RegistryError(f"Invalid model version name {version!r}")
+        target = self.version_dir(version)
+        if os.path.exists(target):
+            raise RegistryError(f"Model version {version!r} already exists")
+
+        os.makedirs(self.versions_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=self.versions_dir, prefix=f".{version}-")
+        try:
+            files = {}
+            for source, filename in zip((model_path, scaler_x_path, scaler_y_path), ARTIFACT_FILENAMES):
+                destination = os.path.join(staging, filename)
+                if filename == MODEL_FILENAME or str(source).endswith(".npz"):
+                    shutil.copyfile(source, destination)
+                else:
+                    export_scaler(source, destination)
+                files[filename] = sha256_file(destination)
+
+            manifest = {
+                "version": version,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "files": files,
+                "notes": notes,
+            }
+            with open(os.path.join(staging, MANIFEST_FILENAME), "w") as f:
+                json.dump(manifest, f, indent=2)
+            os.chmod(staging, 0o755)
+            os.replace(staging, target)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        logger.info("Published model version %s", version)
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version):
+        """Verify a version and make it the one served by the predictor."""
+        self.verify(version)
+        os.makedirs(self.root, exist_ok=True)
+        _atomic_write_text(os.path.join(self.root, CURRENT_FILENAME), version + "\n")
+        logger.info("Activated model version %s", version)
+
+    def resolve(self):
+        """
+        Artifacts the predictor should serve.
+
+        Returns the verified active version, or the bundled files if no version is
+        active. Raises RegistryError if the active version fails verification.
+        """
+        version = self.current_version()
+        if version is None:
+            return bundled_artifacts()
+        return self.verify(version)
+
+
+def main(argv=None):
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "weatheralert.settings")
+    django.setup()
+
+    parser = argparse.ArgumentParser(description="Manage rain model versions")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    publish = subcommands.add_parser("publish", help="publish a trained model as a new version")
+    publish.add_argument("--model", required=True)
+    publish.add_argument("--scaler-x", required=True)
+    publish.add_argument("--scaler-y", required=True)
+    publish.add_argument("--version")
+    publish.add_argument("--notes", default="")
+    publish.add_argument("--no-activate", action="store_true")
+
+    activate = subcommands.add_parser("activate", help="serve an already published version")
+    activate.add_argument("version")
+
+    subcommands.add_parser("list", help="list published versions")
+
+    args = parser.parse_args(argv)
+    registry = ModelRegistry()
+
+    if args.command == "publish":
+        version = registry.publish(
+            args.model, args.scaler_x, args.scaler_y,
+            version=args.version, notes=args.notes, activate=not args.no_activate,
+        )
+        print(version)
+    elif args.command == "activate":
+        registry.activate(args.version)
+    else:
+        current = registry.current_version()
+        for version in registry.list_versions():
+            print(("* " if version == current else "  ") + version)
+
+
+if __name__ == "__main__":
+    main()
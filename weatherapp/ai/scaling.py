@@ -0,0 +1,122 @@
+"""
+Feature scaling for the rain model without scikit-learn at serving time.
+
+The model was trained on ``StandardScaler`` output. Only two vectors of that
+scaler matter for inference, ``mean_`` and ``scale_``, so they are exported to a
+small ``.npz`` file and applied here as a single multiply-add:
+
+    transform(x)         = x * (1 / scale) + (-mean / scale)
+    inverse_transform(y) = y * scale + mean
+
+Loading an ``.npz`` needs only NumPy. Pickled scalers (``.pkl``, as written by
+``train.py``) are still accepted; joblib is then imported on demand to read them.
+
+Usage::
+
+    python -m weatherapp.ai.scaling scaler_X.pkl scaler_y.pkl
+
+writes ``scaler_X.npz`` and ``scaler_y.npz`` next to the pickles.
+
+This module deliberately does not import TensorFlow or scikit-learn.
+"""
+import argparse
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class AffineScaler:
+    """
+    The inference half of a fitted ``StandardScaler``.
+
+    Args:
+        mean: Per-feature mean (``StandardScaler.mean_``)
+        scale: Per-feature standard deviation (``StandardScaler.scale_``)
+    """
+
+    def __init__(self, mean, scale):
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        if self.mean.ndim != 1 or self.mean.shape != self.scale.shape:
+            raise ValueError(f"Scaler mean {self.mean.shape} and scale {self.scale.shape} do not match")
+        if not (np.all(np.isfinite(self.mean)) and np.all(np.isfinite(self.scale)) and np.all(self.scale != 0)):
+            raise ValueError("Scaler parameters must be finite with a non-zero scale")
+        # Precomputed float32 coefficients so each direction is one fused multiply-add
+        self._forward_mul = (1.0 / self.scale).astype(np.float32)
+        self._forward_add = (-self.mean / self.scale).astype(np.float32)
+        self._inverse_mul = self.scale.astype(np.float32)
+        self._inverse_add = self.mean.astype(np.float32)
+
+    @property
+    def n_features(self):
+        return self.mean.shape[0]
+
+    def transform(self, values):
+        """Scale raw values; any leading shape, last axis = features."""
+        values = np.asarray(values, dtype=np.float32)
+        return values * self._forward_mul + self._forward_add
+
+    def inverse_transform(self, values):
+        """Map scaled values back to original units."""
+        values = np.asarray(values, dtype=np.float32)
+        return values * self._inverse_mul + self._inverse_add
+
+    @classmethod
+    def from_sklearn(cls, scaler):
+        """Extract the parameters of a fitted StandardScaler."""
+        features = scaler.n_features_in_
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(features)
+        scale = scaler.scale_ if scaler.with_std else np.ones(features)
+        return cls(mean, scale)
+
+    def save(self, path):
+        """Write the parameters to an ``.npz`` file."""
+        with open(path, "wb") as f:
+            np.savez(f, mean=self.mean, scale=self.scale)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["mean"], data["scale"])
+
+
+def load_scaler(path):
+    """
+    Load a scaler from an ``.npz`` export or, for older artifacts, a pickle.
+
+    Returns:
+        AffineScaler
+    """
+    if str(path).endswith(".npz"):
+        return AffineScaler.load(path)
+
+    import joblib
+    logger.info("Reading pickled scaler %s with joblib", path)
+    return AffineScaler.from_sklearn(joblib.load(path))
+
+
+def export_scaler(source_path, target_path=None):
+    """
+    Convert a pickled scaler to an ``.npz`` file.
+
+    Returns:
+        str: Path of the written file.
+    """
+    target_path = target_path or os.path.splitext(str(source_path))[0] + ".npz"
+    load_scaler(source_path).save(target_path)
+    return target_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export pickled StandardScalers to .npz")
+    parser.add_argument("scalers", nargs="+", help="scaler .pkl files")
+    args = parser.parse_args(argv)
+    for path in args.scalers:
+        print(f"{path} -> {export_scaler(path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Local inference server for the rain model.
+
+One long-lived process holds the only loaded copy of the model and answers
+prediction requests from the web workers and Celery tasks over localhost HTTP
+with a JSON body (see client.py). Requests that arrive together are
+micro-batched: the batcher thread waits up to ``PREDICTION_SERVER_BATCH_WAIT_MS``
+after the first window, stacks up to ``PREDICTION_SERVER_MAX_BATCH`` windows and
+runs them through the model in one call.
+
+Endpoints::
+
+    GET  /health   -> {"status": "ok", "model_version": "..."}
+    POST /predict  {"windows": [[[t, h, w, p, hour] x 6], ...]}
+                   -> {"model_version": "...", "predictions": [{amount_mm, duration_min,
+                       rate_mm_h, intensity}, ...]}
+
+The prediction service (``python -m weatherapp.ai.predictor``) starts this
+server next to its scheduler, so the pipeline and on-demand requests share one
+model. It can also run on its own::
+
+    python -m weatherapp.ai.server [--host 127.0.0.1] [--port 8765]
+
+The server binds to the loopback interface by default and has no
+authentication; do not expose it beyond the host. Only processes on the same
+host can reach it, which rules out the web dyno on Heroku; see
+``PREDICTION_INPROCESS_FALLBACK`` in settings for that deployment.
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SEQUENCE_LENGTH = 6
+FEATURE_COUNT = 5
+MAX_REQUEST_BYTES = 256 * 1024
+RESULT_TIMEOUT_SECONDS = 30
+
+
+class MicroBatcher:
+    """
+    Collects windows from concurrent requests and runs them as one batch.
+
+    Args:
+        predict_batch: Callable taking an (N, 6, 5) array and returning
+            ``(amount_mm, duration_min, rate_mm_h)`` arrays, or None when the
+            model is unavailable (``predictor.predict_rain_batch``).
+        max_batch: Largest number of windows per model call
+        max_wait: Seconds to wait for more windows after the first one
+    """
+
+    def __init__(self, predict_batch, max_batch=64, max_wait=0.005):
+        self.predict_batch = predict_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="prediction-batcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, window):
+        """Queue one window; the returned Future resolves to its prediction dict."""
+        future = Future()
+        self._queue.put((window, future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self.run_batch(batch)
+
+    def run_batch(self, batch):
+        """Predict a list of (window, future) pairs and resolve the futures."""
+        from weatherapp.ai.predictor import get_rain_intensity
+
+        try:
+            output = self.predict_batch(np.stack([window for window, _ in batch]))
+            if output is None:
+                raise RuntimeError("Rain model is not available")
+            amount_mm, duration_min, rate_mm_h = output
+            for i, (_, future) in enumerate(batch):
+                future.set_result({
+                    "amount_mm": float(amount_mm[i]),
+                    "duration_min": float(duration_min[i]),
+                    "rate_mm_h": float(rate_mm_h[i]),
+                    "intensity": get_rain_intensity(float(rate_mm_h[i])),
+                })
+        except Exception as e:
+            logger.exception("Batched prediction of %d windows failed", len(batch))
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+
+def parse_windows(payload):
+    """
+    Validate a /predict request body.
+
+    Returns:
+        np.ndarray: Shape (N, SEQUENCE_LENGTH, FEATURE_COUNT), float32
+
+    Raises:
+        ValueError: If the windows are missing, malformed or not finite.
+    """
+    if not isinstance(payload, dict) or "windows" not in payload:
+        raise ValueError("Request body must be an object with a 'windows' list")
+    try:
+        windows = np.asarray(payload["windows"], dtype=np.float32)
+    except (TypeError, ValueError):
+        raise ValueError("'windows' must contain numbers only")
+    if windows.ndim != 3 or windows.shape[1:] != (SEQUENCE_LENGTH, FEATURE_COUNT) or not len(windows):
+        raise ValueError(f"Each window must be {SEQUENCE_LENGTH} rows of {FEATURE_COUNT} features")
+    if not np.all(np.isfinite(windows)):
+        raise ValueError("Windows must not contain NaN or infinite values")
+    return windows
+
+
+class PredictionRequestHandler(BaseHTTPRequestHandler):
+    server_version = "WeatherAlertPredictor/1.0"
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        from weatherapp.ai.predictor import get_model_version
+
+        if urlparse(self.path).path != "/health":
+            self._send_json(404, {"error": "Not found"})
+            return
+        version = get_model_version()
+        self._send_json(200 if version else 503, {
+            "status": "ok" if version else "model not loaded",
+            "model_version": version,
+        })
+
+    def do_POST(self):
+        from weatherapp.ai.predictor import get_model_version
+
+        if urlparse(self.path).path != "/predict":
+            self._send_json(404, {"error": "Not found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_REQUEST_BYTES:
+            self._send_json(413 if length else 400, {"error": "Invalid request size"})
+            return
+        try:
+            windows = parse_windows(json.loads(self.rfile.read(length)))
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        futures = [self.server.batcher.submit(window) for window in windows]
+        try:
+            predictions = [future.result(timeout=RESULT_TIMEOUT_SECONDS) for future in futures]
+        except Exception as e:
+            self._send_json(503, {"error": f"Prediction failed: {e}"})
+            return
+        self._send_json(200, {"model_version": get_model_version(), "predictions": predictions})
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, batcher):
+        super().__init__(address, PredictionRequestHandler)
+        self.batcher = batcher
+
+
+def create_server(host=None, port=None, predict_batch=None):
+    """
+    Build a server around the loaded model (not started).
+
+    Args:
+        host, port: Bind address; default to the PREDICTION_SERVER_* settings
+        predict_batch: Override for ``predictor.predict_rain_batch`` (tests)
+    """
+    from django.conf import settings
+
+    if predict_batch is None:
+        from weatherapp.ai.predictor import predict_rain_batch as predict_batch
+
+    batcher = MicroBatcher(
+        predict_batch,
+        max_batch=settings.PREDICTION_SERVER_MAX_BATCH,
+        max_wait=settings.PREDICTION_SERVER_BATCH_WAIT_MS / 1000.0,
+    ).start()
+    host = host if host is not None else settings.PREDICTION_SERVER_HOST
+    port = port if port is not None else settings.PREDICTION_SERVER_PORT
+    return PredictionServer((host, port), batcher)
+
+
+def start_server_thread():
+    """
+    Load the model and serve requests from a daemon thread.
+
+    Returns:
+        PredictionServer, or None when PREDICTION_SERVER_PORT is 0.
+    """
+    from django.conf import settings
+
+    from weatherapp.ai import predictor
+
+    if not settings.PREDICTION_SERVER_PORT:
+        return None
+    predictor._load_model()
+    predictor.start_model_watcher()
+    server = create_server()
+    threading.Thread(target=server.serve_forever, name="prediction-server", daemon=True).start()
+    logger.info("Prediction server listening on %s:%s", *server.server_address[:2])
+    return server
+
+
+def main(argv=None):
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "weatheralert.settings")
+    django.setup()
+    from django.conf import settings
+
+    from weatherapp.ai import predictor
+
+    parser = argparse.ArgumentParser(description="Local inference server for the rain model")
+    parser.add_argument("--host", default=settings.PREDICTION_SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.PREDICTION_SERVER_PORT or 8765)
+    args = parser.parse_args(argv)
+
+    predictor._load_model()
+    predictor.start_model_watcher()
+    server = create_server(args.host, args.port)
+    logger.info("Prediction server listening on %s:%s", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Parallel hyperparameter sweep for the rain model.
+
+Configurations (window length, LSTM units, dropout, learning rate) are trained
+side by side in a ``ProcessPoolExecutor``. Each worker process is pinned to its
+own CPU core and limits TensorFlow to ``--intra-threads`` intra-op threads, so N
+workers use N cores without oversubscribing them.
+
+The data is the memory-mapped training set built from ``weather_reports`` (see
+training.py). It is scaled once by the parent into ``<output>/scaled_*.npy``,
+which every worker maps read-only: the pages are shared through the OS page
+cache instead of being copied into each process.
+
+Results are appended to ``<output>/leaderboard.jsonl`` as each configuration
+finishes and ``<output>/leaderboard.json`` holds the final ranking by
+validation loss.
+
+Usage::
+
+    python -m weatherapp.ai.sweep --past-steps 3 6 12 --units 32,16 64,32 \\
+        --dropout 0.1 0.2 [--learning-rate 0.001] [--epochs 10] [--workers 8]
+"""
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VALIDATION_SPLIT = 0.2
+_worker_core = None
+
+
+def parameter_grid(past_steps, units, dropouts, learning_rates):
+    """Every combination of the given values, as a list of config dicts."""
+    configs = []
+    for index, (steps, unit_pair, dropout, learning_rate) in enumerate(
+        itertools.product(past_steps, units, dropouts, learning_rates)
+    ):
+        configs.append({
+            "id": index,
+            "past_steps": int(steps),
+            "units": [int(u) for u in unit_pair],
+            "dropout": float(dropout),
+            "learning_rate": learning_rate,
+        })
+    return configs
+
+
+def prepare_shared_data(training_set, output_dir):
+    """
+    Scale the training set once and write it where all workers can map it.
+
+    Returns:
+        dict: Paths and scaler parameters passed to the workers.
+    """
+    finite_rows = np.isfinite(training_set.features).all(axis=1) & np.isfinite(training_set.targets).all(axis=1)
+    paths = {}
+    stats = {}
+    for name, values in (("features", training_set.features), ("targets", training_set.targets)):
+        mean = values[finite_rows].mean(axis=0)
+        scale = values[finite_rows].std(axis=0)
+        scale[scale == 0] = 1.0
+        path = os.path.join(output_dir, f"scaled_{name}.npy")
+        scaled = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=values.shape)
+        scaled[:] = (values - mean) / scale
+        scaled.flush()
+        del scaled
+        paths[name] = path
+        stats[name] = {"mean": mean.tolist(), "scale": scale.tolist()}
+    return {"root": training_set.root, "paths": paths, "stats": stats}
+
+
+def _init_worker(cores, intra_threads):
+    """Pin this worker to a free core and cap TensorFlow's thread pools."""
+    global _worker_core
+    _worker_core = cores.get()
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {_worker_core})
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(intra_threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(intra_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def train_config(config, shared, epochs, batch_size):
+    """Train one configuration and return its leaderboard entry."""
+    from weatherapp.ai.dataset import make_tf_dataset, sliding_windows
+    from weatherapp.ai.training import TrainingSet, build_model
+
+    started = time.perf_counter()
+    training_set = TrainingSet(shared["root"])
+    features = np.load(shared["paths"]["features"], mmap_mode="r")
+    targets = np.load(shared["paths"]["targets"], mmap_mode="r")
+
+    past_steps = config["past_steps"]
+    starts, end_times = training_set.windows_for(past_steps)
+    train_pos, val_pos = training_set.split_by_time(VALIDATION_SPLIT, end_times)
+    X_seq, y_seq = sliding_windows(features, targets, past_steps)
+
+    model = build_model(
+        past_steps, features.shape[1], targets.shape[1],
+        units=config["units"], dropout=config["dropout"], learning_rate=config["learning_rate"],
+    )
+    history = model.fit(
+        make_tf_dataset(X_seq, y_seq, starts[train_pos], batch_size, shuffle=True, seed=config["id"]),
+        validation_data=make_tf_dataset(X_seq, y_seq, starts[val_pos], batch_size),
+        epochs=epochs,
+        verbose=0,
+    )
+    val_losses = history.history.get("val_loss") or [float("nan")]
+    return {
+        **config,
+        "val_loss": float(np.nanmin(val_losses)),
+        "best_epoch": int(np.nanargmin(val_losses)) + 1 if np.isfinite(val_losses).any() else None,
+        "train_loss": float(history.history["loss"][-1]),
+        "train_windows": int(len(train_pos)),
+        "val_windows": int(len(val_pos)),
+        "seconds": round(time.perf_counter() - started, 1),
+        "core": _worker_core,
+    }
+
+
+def run_sweep(training_set, configs, output_dir, epochs=10, batch_size=64, workers=None, intra_threads=1):
+    """
+    Train every config in parallel and write the leaderboard.
+
+    Returns:
+        list: Leaderboard entries sorted by validation loss (failures last).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    shared = prepare_shared_data(training_set, output_dir)
+
+    available = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    workers = min(workers or len(available), len(available), len(configs)) or 1
+    # TensorFlow must not be forked after initialisation; start clean interpreters
+    context = multiprocessing.get_context("spawn")
+    cores = context.Manager().Queue()
+    for core in available[:workers]:
+        cores.put(core)
+
+    results = []
+    log_path = os.path.join(output_dir, "leaderboard.jsonl")
+    with open(log_path, "a") as log, ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(cores, intra_threads),
+    ) as executor:
+        futures = {executor.submit(train_config, config, shared, epochs, batch_size): config for config in configs}
+        for future in as_completed(futures):
+            config = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                logger.exception("Sweep config %s failed", config["id"])
+                entry = {**config, "val_loss": None, "error": str(e)}
+            results.append(entry)
+            log.write(json.dumps(entry) + "\n")
+            log.flush()
+            logger.info("Config %s finished: val_loss=%s", config["id"], entry.get("val_loss"))
+
+    results.sort(key=lambda entry: (entry["val_loss"] is None, entry["val_loss"] or 0.0))
+    with open(os.path.join(output_dir, "leaderboard.json"), "w") as f:
+        json.dump({"epochs": epochs, "batch_size": batch_size, "scaling": shared["stats"], "results": results}, f, indent=2)
+    return results
+
+
+def main(argv=None):
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "weatheralert.settings")
+    django.setup()
+    from django.conf import settings
+
+    from weatherapp.ai.training import TrainingSet
+
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter sweep for the rain model")
+    parser.add_argument("--cache-dir", default=settings.TRAINING_CACHE_DIR,
+                        help="training set built by `train.py --from-db`")
+    parser.add_argument("--output", default="sweep_results")
+    parser.add_argument("--past-steps", type=int, nargs="+", default=[6])
+    parser.add_argument("--units", nargs="+", default=["64,32"], help="first,second LSTM units")
+    parser.add_argument("--dropout", type=float, nargs="+", default=[0.2])
+    parser.add_argument("--learning-rate", type=float, nargs="+", default=[None])
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--workers", type=int, help="default: one per available core")
+    parser.add_argument("--intra-threads", type=int, default=1, help="TensorFlow intra-op threads per worker")
+    args = parser.parse_args(argv)
+
+    units = [tuple(int(u) for u in value.split(",")) for value in args.units]
+    configs = parameter_grid(args.past_steps, units, args.dropout, args.learning_rate)
+    results = run_sweep(
+        TrainingSet(args.cache_dir), configs, args.output,
+        epochs=args.epochs, batch_size=args.batch_size, workers=args.workers, intra_threads=args.intra_threads,
+    )
+
+    print(f"{'rank':<6}{'val_loss':>10}  config")
+    for rank, entry in enumerate(results, 1):
+        loss = "failed" if entry["val_loss"] is None else f"{entry['val_loss']:.4f}"
+        print(f"{rank:<6}{loss:>10}  steps={entry['past_steps']} units={entry['units']} "
+              f"dropout={entry['dropout']} lr={entry['learning_rate']}")
+
+
+if __name__ == "__main__":
+    main()
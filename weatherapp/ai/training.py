@@ -0,0 +1,397 @@
+"""
+Training data pipeline built from the production ``weather_reports`` table.
+
+Reports are streamed per sensor through a server-side cursor into a memory-mapped
+``.npy`` cache, then turned into exactly the features the predictor serves
+(temperature, humidity, wind_speed, barometric_pressure, hour_of_day) and the
+targets it predicts (rain amount and duration over the following hour).
+
+Cache layout under ``settings.TRAINING_CACHE_DIR``::
+
+    sensors/<sensor_id>/reports.npy      # raw columns, see RAW_COLUMNS
+    sensors/<sensor_id>/manifest.json    # rows, last (date_time, report_id) synced
+    features.npy, targets.npy, times.npy # all sensors, serving features / targets
+    window_starts.npy, window_end_times.npy
+    manifest.json                        # sensors, rows and settings of the build
+
+Syncing is incremental: only reports after the last synced (date_time, report_id)
+are fetched, and the combined arrays are rebuilt from the cached sensors, so a
+retrain is reproducible from the cache without another full-table export.
+"""
+import calendar
+import json
+import logging
+import os
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SEQUENCE_LENGTH = 6
+SERVING_FEATURES = ("temperature", "humidity", "wind_speed", "barometric_pressure", "hour_of_day")
+TARGETS = ("amount_mm", "duration_min")
+# Raw cache columns; date_time is stored as seconds since the epoch of the naive
+# (Philippine time) timestamp, so hour_of_day matches ``date_time.hour`` at serving
+RAW_COLUMNS = ("date_time", "temperature", "humidity", "wind_speed", "barometric_pressure", "rain_accumulated")
+REPORT_INTERVAL_MINUTES = 10
+# Targets cover the hour after each window (6 reports at 10 minutes)
+DEFAULT_HORIZON = 6
+# Windows spanning a gap longer than this many report intervals are skipped
+MAX_GAP_INTERVALS = 1.5
+DEFAULT_CHUNK_ROWS = 20000
+
+
+@contextmanager
+def server_side_cursor(connection):
+    """
+    Cursor that streams rows from the database instead of buffering the result.
+
+    MySQL uses the driver's SSCursor, PostgreSQL Django's named chunked cursor;
+    other backends fall back to a regular cursor.
+    """
+    if connection.vendor == "mysql":
+        connection.ensure_connection()
+        raw_connection = connection.connection
+        if type(raw_connection).__module__.startswith("pymysql"):
+            from pymysql.cursors import SSCursor
+        else:
+            from MySQLdb.cursors import SSCursor
+        cursor = raw_connection.cursor(SSCursor)
+    elif connection.vendor == "postgresql":
+        cursor = connection.chunked_cursor()
+    else:
+        cursor = connection.cursor()
+    try:
+        yield cursor
+    finally:
+        cursor.close()
+
+
+def _epoch_seconds(dt):
+    return calendar.timegm(dt.timetuple())
+
+
+def _write_json(path, payload):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class ReportCache:
+    """
+    Memory-mapped per-sensor cache of raw weather reports.
+
+    Args:
+        root: Cache directory; defaults to ``settings.TRAINING_CACHE_DIR``.
+    """
+
+    def __init__(self, root=None):
+        if root is None:
+            from django.conf import settings
+            root = settings.TRAINING_CACHE_DIR
+        self.root = str(root)
+
+    def sensor_dir(self, sensor_id):
+        return os.path.join(self.root, "sensors", str(sensor_id))
+
+    def sensor_manifest(self, sensor_id):
+        try:
+            with open(os.path.join(self.sensor_dir(sensor_id), "manifest.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"sensor_id": sensor_id, "rows": 0, "last_date_time": None, "last_report_id": None}
+
+    def cached_sensor_ids(self):
+        sensors_dir = os.path.join(self.root, "sensors")
+        if not os.path.isdir(sensors_dir):
+            return []
+        return sorted(int(name) for name in os.listdir(sensors_dir) if name.isdigit())
+
+    def load_sensor(self, sensor_id):
+        """Raw report rows of a sensor as a read-only memmap (see RAW_COLUMNS)."""
+        path = os.path.join(self.sensor_dir(sensor_id), "reports.npy")
+        if not os.path.exists(path):
+            return np.empty((0, len(RAW_COLUMNS)))
+        return np.load(path, mmap_mode="r")
+
+    def sync_sensor(self, sensor_id, connection=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """
+        Append reports newer than the cached ones for one sensor.
+
+        The new file is written next to the old one and swapped in with
+        ``os.replace``, so an interrupted sync leaves the previous cache intact.
+
+        Returns:
+            int: Number of rows added.
+        """
+        if connection is None:
+            from django.db import connection
+
+        manifest = self.sensor_manifest(sensor_id)
+        where = "WHERE sensor_id = %s"
+        params = [sensor_id]
+        if manifest["last_date_time"] is not None:
+            where += " AND (date_time > %s OR (date_time = %s AND report_id > %s))"
+            params += [manifest["last_date_time"], manifest["last_date_time"], manifest["last_report_id"]]
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM weather_reports {where}", params)
+            new_rows = cursor.fetchone()[0]
+        if not new_rows:
+            return 0
+
+        directory = self.sensor_dir(sensor_id)
+        os.makedirs(directory, exist_ok=True)
+        old = self.load_sensor(sensor_id)
+        tmp_path = os.path.join(directory, "reports.npy.tmp")
+        out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float64, shape=(len(old) + new_rows, len(RAW_COLUMNS)))
+        for offset in range(0, len(old), chunk_rows):
+            stop = min(offset + chunk_rows, len(old))
+            out[offset:stop] = old[offset:stop]
+
+        position = len(old)
+        last_date_time, last_report_id = manifest["last_date_time"], manifest["last_report_id"]
+        with server_side_cursor(connection) as cursor:
+            cursor.execute(f"""
+                SELECT report_id, date_time, temperature, humidity, wind_speed,
+                       barometric_pressure, rain_accumulated
+                FROM weather_reports {where}
+                ORDER BY date_time, report_id
+            """, params)
+            while position < len(out):
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                rows = rows[:len(out) - position]
+                out[position:position + len(rows)] = [
+                    [_epoch_seconds(dt)] + [np.nan if value is None else float(value) for value in values]
+                    for _, dt, *values in rows
+                ]
+                position += len(rows)
+                last_report_id, last_dt = rows[-1][0], rows[-1][1]
+                last_date_time = last_dt.isoformat(sep=" ")
+
+        out.flush()
+        del out
+        if position < len(old) + new_rows:
+            # Rows deleted between COUNT and SELECT: keep only what was written
+            np.save(tmp_path + ".npy", np.load(tmp_path, mmap_mode="r")[:position])
+            os.replace(tmp_path + ".npy", tmp_path)
+        os.replace(tmp_path, os.path.join(directory, "reports.npy"))
+        _write_json(os.path.join(directory, "manifest.json"), {
+            "sensor_id": sensor_id,
+            "rows": position,
+            "last_date_time": last_date_time,
+            "last_report_id": last_report_id,
+            "columns": list(RAW_COLUMNS),
+        })
+        logger.info("Synced %s new reports for sensor %s", position - len(old), sensor_id)
+        return position - len(old)
+
+    def sync(self, sensor_ids=None, connection=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """Sync the given sensors (default: every sensor with reports)."""
+        if connection is None:
+            from django.db import connection
+        if sensor_ids is None:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT DISTINCT sensor_id FROM weather_reports ORDER BY sensor_id")
+                sensor_ids = [row[0] for row in cursor.fetchall()]
+        return {sensor_id: self.sync_sensor(sensor_id, connection, chunk_rows) for sensor_id in sensor_ids}
+
+
+def derive_features(raw):
+    """Serving features (see SERVING_FEATURES) from raw report rows."""
+    features = np.empty((len(raw), len(SERVING_FEATURES)), dtype=np.float32)
+    features[:, :4] = raw[:, 1:5]
+    features[:, 4] = (raw[:, 0] // 3600) % 24
+    return features
+
+
+def derive_targets(raw, horizon=DEFAULT_HORIZON):
+    """
+    Row-aligned targets: rain amount (mm) and rainy minutes over rows r .. r+horizon-1.
+
+    Paired by ``dataset.sliding_windows`` with the window ending right before row r,
+    they are the observed rain in the ``horizon`` reports after that window.
+    Rows without a full horizon after them get NaN.
+    """
+    rain = np.nan_to_num(raw[:, 5], nan=0.0)
+    targets = np.full((len(raw), 2), np.nan, dtype=np.float32)
+    count = len(raw) - horizon + 1
+    if count > 0:
+        amount = np.concatenate(([0.0], np.cumsum(rain)))
+        rainy = np.concatenate(([0], np.cumsum(rain > 0)))
+        targets[:count, 0] = amount[horizon:] - amount[:count]
+        targets[:count, 1] = (rainy[horizon:] - rainy[:count]) * REPORT_INTERVAL_MINUTES
+    return targets
+
+
+def evenly_spaced_windows(times, sequence_length=SEQUENCE_LENGTH, horizon=DEFAULT_HORIZON):
+    """
+    Gap mask for every window start that has a full horizon after it.
+
+    Returns:
+        np.ndarray: bool array of length ``len(times) - sequence_length - horizon + 1``;
+        True where the reports from the window start to the end of the horizon
+        have no gap longer than MAX_GAP_INTERVALS report intervals.
+    """
+    count = max(0, len(times) - sequence_length - horizon + 1)
+    if count == 0:
+        return np.zeros(0, dtype=bool)
+    span = sequence_length + horizon - 1
+    short_gaps = np.diff(np.asarray(times, dtype=np.float64)) <= REPORT_INTERVAL_MINUTES * 60 * MAX_GAP_INTERVALS
+    # Window s covers the ``span`` gaps between rows s .. s + span
+    return np.lib.stride_tricks.sliding_window_view(short_gaps, span)[:count].all(axis=1)
+
+
+def valid_window_starts(times, features, targets, sequence_length=SEQUENCE_LENGTH, horizon=DEFAULT_HORIZON):
+    """
+    Start rows of windows that are usable for training.
+
+    ``times`` are the report times in epoch seconds (RAW_COLUMNS' date_time).
+
+    A window is usable when its inputs are complete, its targets exist and the
+    reports from the window start to the end of the horizon are evenly spaced
+    (no gap longer than MAX_GAP_INTERVALS report intervals).
+    """
+    count = len(times) - sequence_length - horizon + 1
+    if count <= 0:
+        return np.empty(0, dtype=np.int64)
+    starts = np.arange(count)
+
+    complete = np.isfinite(features).all(axis=1)
+    complete_windows = np.lib.stride_tricks.sliding_window_view(complete, sequence_length)[:count].all(axis=1)
+
+    evenly_spaced = evenly_spaced_windows(times, sequence_length, horizon)
+
+    has_target = np.isfinite(targets[starts + sequence_length]).all(axis=1)
+    return starts[complete_windows & evenly_spaced & has_target]
+
+
+class TrainingSet:
+    """Combined memory-mapped training arrays of all cached sensors."""
+
+    def __init__(self, root):
+        self.root = root
+        self.features = np.load(os.path.join(root, "features.npy"), mmap_mode="r")
+        self.targets = np.load(os.path.join(root, "targets.npy"), mmap_mode="r")
+        self.times = np.load(os.path.join(root, "times.npy"), mmap_mode="r")
+        self.window_starts = np.load(os.path.join(root, "window_starts.npy"))
+        self.window_end_times = np.load(os.path.join(root, "window_end_times.npy"))
+        with open(os.path.join(root, "manifest.json")) as f:
+            self.manifest = json.load(f)
+
+    def windows_for(self, sequence_length):
+        """
+        Valid window starts and end times for a window length other than the one
+        the set was built with (e.g. in a hyperparameter sweep).
+        """
+        if sequence_length == self.manifest["sequence_length"]:
+            return self.window_starts, self.window_end_times
+        starts = []
+        offset = 0
+        for sensor in self.manifest["sensors"]:
+            rows = slice(offset, offset + sensor["rows"])
+            sensor_starts = valid_window_starts(
+                self.times[rows], self.features[rows], self.targets[rows],
+                sequence_length, self.manifest["horizon"],
+            )
+            starts.append(sensor_starts + offset)
+            offset += sensor["rows"]
+        starts = np.concatenate(starts) if starts else np.empty(0, dtype=np.int64)
+        return starts, np.asarray(self.times[starts + sequence_length - 1])
+
+    def split_by_time(self, validation_split=0.2, window_end_times=None):
+        """
+        Train / validation positions into ``window_starts`` (or the windows whose
+        end times are given): the latest windows across all sensors are held out
+        for validation.
+        """
+        end_times = self.window_end_times if window_end_times is None else window_end_times
+        if not len(end_times):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        cutoff = np.quantile(end_times, 1.0 - validation_split)
+        is_validation = end_times > cutoff
+        return np.flatnonzero(~is_validation), np.flatnonzero(is_validation)
+
+
+def build_training_set(cache, sensor_ids=None, horizon=DEFAULT_HORIZON, sequence_length=SEQUENCE_LENGTH):
+    """
+    Rebuild the combined feature / target memmaps from the per-sensor cache.
+
+    Sensors are laid out back to back; window starts are global row indexes, and
+    no window crosses from one sensor into the next.
+
+    Returns:
+        TrainingSet
+    """
+    sensor_ids = cache.cached_sensor_ids() if sensor_ids is None else sorted(sensor_ids)
+    raws = {sensor_id: cache.load_sensor(sensor_id) for sensor_id in sensor_ids}
+    total = sum(len(raw) for raw in raws.values())
+    os.makedirs(cache.root, exist_ok=True)
+
+    features = np.lib.format.open_memmap(
+        os.path.join(cache.root, "features.npy"), mode="w+", dtype=np.float32, shape=(total, len(SERVING_FEATURES))
+    )
+    targets = np.lib.format.open_memmap(
+        os.path.join(cache.root, "targets.npy"), mode="w+", dtype=np.float32, shape=(total, len(TARGETS))
+    )
+    times = np.lib.format.open_memmap(
+        os.path.join(cache.root, "times.npy"), mode="w+", dtype=np.float64, shape=(total,)
+    )
+    starts, end_times, sensors = [], [], []
+    offset = 0
+    for sensor_id, raw in raws.items():
+        sensor_features = derive_features(raw)
+        sensor_targets = derive_targets(raw, horizon)
+        features[offset:offset + len(raw)] = sensor_features
+        targets[offset:offset + len(raw)] = sensor_targets
+        times[offset:offset + len(raw)] = raw[:, 0]
+        sensor_starts = valid_window_starts(raw[:, 0], sensor_features, sensor_targets, sequence_length, horizon)
+        starts.append(sensor_starts + offset)
+        end_times.append(raw[sensor_starts + sequence_length - 1, 0] if len(sensor_starts) else np.empty(0))
+        sensors.append({"sensor_id": sensor_id, "rows": len(raw), "windows": len(sensor_starts)})
+        offset += len(raw)
+
+    features.flush()
+    targets.flush()
+    times.flush()
+    del features, targets, times
+    np.save(os.path.join(cache.root, "window_starts.npy"), np.concatenate(starts) if starts else np.empty(0, dtype=np.int64))
+    np.save(os.path.join(cache.root, "window_end_times.npy"), np.concatenate(end_times) if end_times else np.empty(0))
+    _write_json(os.path.join(cache.root, "manifest.json"), {
+        "features": list(SERVING_FEATURES),
+        "targets": list(TARGETS),
+        "sequence_length": sequence_length,
+        "horizon": horizon,
+        "report_interval_minutes": REPORT_INTERVAL_MINUTES,
+        "sensors": sensors,
+    })
+    logger.info("Built training set with %s rows from %s sensors", total, len(sensors))
+    return TrainingSet(cache.root)
+
+
+def build_model(past_steps, feature_count=len(SERVING_FEATURES), target_count=len(TARGETS),
+                units=(64, 32), dropout=0.2, learning_rate=None):
+    """
+    The stacked LSTM trained by train.py, with its hyperparameters exposed.
+
+    Imports TensorFlow, so only call it from training processes.
+    """
+    from tensorflow.keras.layers import LSTM, Dense, Dropout
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.optimizers import Adam
+
+    first_units, second_units = units
+    model = Sequential([
+        LSTM(first_units, input_shape=(past_steps, feature_count), return_sequences=True),
+        Dropout(dropout),
+        LSTM(second_units),
+        Dense(target_count)
+    ])
+    optimizer = Adam(learning_rate=learning_rate) if learning_rate else "adam"
+    # Use full loss name for compatibility
+    model.compile(optimizer=optimizer, loss="mean_squared_error")
+    return model
@@ -0,0 +1,119 @@
+"""
+Event-driven prediction triggers.
+
+``receive_sensor_data`` calls ``notify_new_sensor_data`` after every insert. When
+``settings.PREDICTION_TRIGGER`` is 'event' the next prediction cycle is requested
+right away instead of waiting for the interval schedule:
+
+- PREDICTION_SCHEDULER 'celery': ``predict_rain_task`` is queued with a countdown
+- PREDICTION_SCHEDULER 'loop': a message is published on a Redis pub/sub channel
+  that the predictor's EventScheduler listens on
+
+Bursts of ingests are coalesced through a cache "pending" key (only the first
+ingest after a cycle schedules anything) and cycles are kept at least
+PREDICTION_MIN_SPACING_SECONDS apart.
+
+This module deliberately does not import TensorFlow; it runs in the web process.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from weatherapp.utils.cache import safe_cache_get, safe_cache_set
+
+logger = logging.getLogger(__name__)
+
+TRIGGER_CHANNEL = 'weatheralert:prediction:trigger'
+TRIGGER_PENDING_CACHE_KEY = 'prediction:trigger_pending'
+LAST_RUN_CACHE_KEY = 'prediction:last_run'
+
+
+def event_triggers_enabled():
+    return settings.PREDICTION_TRIGGER == 'event'
+
+
+def record_cycle_start():
+    """Mark the start of a prediction cycle and clear any pending trigger."""
+    safe_cache_set(LAST_RUN_CACHE_KEY, time.time(), settings.PREDICTION_INTERVAL_SECONDS * 2)
+    try:
+        cache.delete(TRIGGER_PENDING_CACHE_KEY)
+    except Exception as e:
+        logger.warning("Cache error clearing prediction trigger: %s", e)
+
+
+def seconds_until_allowed(now=None):
+    """Seconds until the minimum spacing since the last cycle has elapsed (>= 0)."""
+    last_run = safe_cache_get(LAST_RUN_CACHE_KEY)
+    if last_run is None:
+        return 0.0
+    now = time.time() if now is None else now
+    return max(0.0, last_run + settings.PREDICTION_MIN_SPACING_SECONDS - now)
+
+
+def trigger_delay_seconds():
+    """Delay before a triggered cycle: debounce window, stretched to respect min spacing."""
+    return max(float(settings.PREDICTION_TRIGGER_DEBOUNCE_SECONDS), seconds_until_allowed())
+
+
+def _claim_pending_trigger(delay):
+    # The pending key outlives the scheduled run by a margin so a lost task or
+    # message cannot block triggers for longer than one spacing window.
+    timeout = int(delay + settings.PREDICTION_MIN_SPACING_SECONDS) + 1
+    try:
+        return cache.add(TRIGGER_PENDING_CACHE_KEY, time.time(), timeout)
+    except Exception as e:
+        logger.warning("Cache error claiming prediction trigger: %s", e)
+        return False
+
+
+def get_redis_client():
+    """Redis client for the trigger channel, or None if REDIS_URL is not configured."""
+    redis_url = getattr(settings, 'REDIS_URL', None)
+    if not redis_url:
+        return None
+    import redis
+    return redis.Redis.from_url(redis_url, socket_timeout=5)
+
+
+def notify_new_sensor_data(sensor_id):
+    """
+    Request a prediction cycle for freshly ingested sensor data.
+
+    Never raises: a failed trigger only means the interval schedule picks the
+    data up instead.
+
+    Args:
+        sensor_id: Sensor that produced the new reading
+
+    Returns:
+        bool: True if this call scheduled a cycle, False if disabled or coalesced.
+    """
+    if not event_triggers_enabled():
+        return False
+
+    delay = trigger_delay_seconds()
+    if not _claim_pending_trigger(delay):
+        return False
+
+    try:
+        if settings.PREDICTION_SCHEDULER == 'celery':
+            from weatherapp.tasks import predict_rain_task
+            predict_rain_task.apply_async(kwargs={'triggered': True}, countdown=delay)
+        else:
+            client = get_redis_client()
+            if client is None:
+                logger.debug("No REDIS_URL configured; prediction trigger ignored")
+                return False
+            client.publish(TRIGGER_CHANNEL, str(sensor_id))
+    except Exception as e:
+        logger.warning("Failed to trigger prediction for sensor %s: %s", sensor_id, e)
+        try:
+            cache.delete(TRIGGER_PENDING_CACHE_KEY)
+        except Exception:
+            pass
+        return False
+
+    logger.info("Prediction cycle triggered by sensor %s (runs in %.0fs)", sensor_id, delay)
+    return True
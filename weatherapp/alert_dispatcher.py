@@ -0,0 +1,371 @@
+"""
+Multi-channel flood alert dispatch.
+
+The dispatcher is registered as a publisher of the prediction pipeline
+(``publisher(result, flood_warnings)``) when ``ALERT_DISPATCH_ENABLED`` is set. For
+each cycle with warnings at or above ``ALERT_MIN_RISK_LEVEL`` it:
+
+1. resolves the recipients of the flagged barangays once (weatherapp/recipients.py)
+   and drops users still inside their suppression window (sms_suppression.py);
+2. hands that one recipient set to every enabled channel (``ALERT_CHANNELS``):
+
+   - ``sms``: queued in the durable SMS outbox and drained by Celery
+   - ``email``: queued in the durable email outbox (email_outbox.py) and drained
+     by Celery over one reused SMTP connection
+   - ``push``: Web Push to the browsers users subscribed through
+     ``api/push-subscriptions/``; needs the optional ``pywebpush`` package and
+     ``WEBPUSH_VAPID_PRIVATE_KEY``, and is skipped otherwise
+
+Each channel runs on its own thread pool (one dispatch thread per channel, so
+cycles are delivered in order; push adds ``WEBPUSH_CONCURRENCY`` senders), so a
+slow database or push service delays only its own channel. ``dispatch``
+returns one future per channel; the pipeline does not wait for them.
+
+Recipients enter their suppression window only once every channel reported
+success, and only those some channel actually reached (``alerted`` user ids in
+the channel summaries), so a user without a mobile number is not suppressed by
+an SMS-only cycle and a cycle whose channel failed is alerted again by the next.
+"""
+
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from weatherapp.ai.flood_risk import RISK_MODERATE, RISK_PRIORITY
+from weatherapp.recipients import get_users_by_affected_barangays
+from weatherapp.sms_messages import render_alert
+from weatherapp.sms_suppression import partition_recipients, record_alerted
+
+logger = logging.getLogger(__name__)
+
+# recipients: {barangay: [user dicts]} after suppression; warnings: {barangay: warning}
+Alert = namedtuple("Alert", "result warnings recipients suppressed")
+
+# Push subscriptions that the push service reports as gone
+EXPIRED_SUBSCRIPTION_STATUSES = (404, 410)
+
+
+def alertable_warnings(flood_warnings, min_risk_level=None):
+    """The warnings at or above ``min_risk_level`` (``ALERT_MIN_RISK_LEVEL`` by default)."""
+    min_risk_level = min_risk_level or settings.ALERT_MIN_RISK_LEVEL
+    threshold = RISK_PRIORITY.get(min_risk_level)
+    if threshold is None:
+        logger.warning("Unknown ALERT_MIN_RISK_LEVEL %r; alerting Moderate and above", min_risk_level)
+        threshold = RISK_MODERATE
+    return [w for w in flood_warnings if RISK_PRIORITY.get(w['risk_level'], 0) >= threshold]
+
+
+def alert_text(alert, barangay):
+    """The rendered alert text for one barangay (shared by all channels)."""
+    result = alert.result
+    return render_alert(
+        barangay, alert.warnings[barangay], result['rate_mm_h'], result['duration_min'], result['intensity'],
+    ).text
+
+
+class AlertChannel(ABC):
+    """
+    One way of reaching users. Subclasses implement ``deliver``, which runs on
+    the channel's own dispatch thread.
+
+    Attributes:
+        name: Channel name as used in ``ALERT_CHANNELS``
+    """
+
+    name = None
+
+    def is_available(self):
+        return True
+
+    @abstractmethod
+    def deliver(self, alert):
+        """
+        Send the alert to its recipients.
+
+        Returns:
+            dict: Summary with ``success`` and ``alerted`` (ids of the users reached).
+        """
+
+
+class SmsAlertChannel(AlertChannel):
+    name = "sms"
+
+    def deliver(self, alert):
+        from weatherapp.sms_targeted_alerts import queue_sms_alerts
+
+        result = alert.result
+        return queue_sms_alerts(
+            alert.recipients, list(alert.warnings.values()),
+            result['rate_mm_h'], result['duration_min'], result['intensity'], alert.suppressed,
+        )
+
+
+class EmailAlertChannel(AlertChannel):
+    """Alert emails queued in the durable email outbox, which retries failed sends."""
+
+    name = "email"
+
+    def build_messages(self, alert):
+        messages = []
+        for barangay, users in alert.recipients.items():
+            subject = f"Flood alert for {barangay}: {alert.warnings[barangay]['risk_level']} risk"
+            body = alert_text(alert, barangay)
+            messages.extend(
+                {"to_email": user['email'], "subject": subject, "body": body}
+                for user in users if user.get('email')
+            )
+        return messages
+
+    def deliver(self, alert):
+        from weatherapp.email_outbox import enqueue_emails
+
+        total_queued = enqueue_emails(self.build_messages(alert))
+        if total_queued:
+            try:
+                from weatherapp.tasks import drain_email_outbox_task
+                drain_email_outbox_task.delay()
+            except Exception:
+                # The periodic drain will pick the messages up
+                logger.exception("Could not start the email outbox drain")
+        return {
+            "success": True,
+            "total_queued": total_queued,
+            "alerted": [user['user_id'] for users in alert.recipients.values() for user in users if user.get('email')],
+        }
+
+
+class WebPushAlertChannel(AlertChannel):
+    """Web Push notifications to the subscribed browsers of the recipients."""
+
+    name = "push"
+
+    def __init__(self, connection=None):
+        self.connection = connection
+        self.concurrency = max(1, settings.WEBPUSH_CONCURRENCY)
+
+    def is_available(self):
+        if not settings.WEBPUSH_VAPID_PRIVATE_KEY:
+            return False
+        try:
+            import pywebpush  # noqa: F401
+        except ImportError:
+            logger.warning("Web push alerts disabled: pywebpush is not installed")
+            return False
+        return True
+
+    def _connection(self):
+        if self.connection is not None:
+            return self.connection
+        from django.db import connection
+        return connection
+
+    def subscriptions(self, user_ids):
+        """``(user_id, endpoint, p256dh, auth)`` rows for the given users."""
+        if not user_ids:
+            return []
+        placeholders = ", ".join(["%s"] * len(user_ids))
+        with self._connection().cursor() as cursor:
+            cursor.execute(f"""
+                SELECT user_id, endpoint, p256dh, auth FROM push_subscription
+                WHERE user_id IN ({placeholders})
+            """, list(user_ids))
+            return list(cursor.fetchall())
+
+    def remove(self, endpoints):
+        if not endpoints:
+            return
+        placeholders = ", ".join(["%s"] * len(endpoints))
+        with self._connection().cursor() as cursor:
+            cursor.execute(f"DELETE FROM push_subscription WHERE endpoint IN ({placeholders})", list(endpoints))
+
+    def deliver(self, alert):
+        import requests
+        from pywebpush import WebPushException, webpush
+
+        barangay_of = {user['user_id']: barangay for barangay, users in alert.recipients.items() for user in users}
+        payloads = {
+            barangay: json.dumps({
+                "title": f"Flood alert: {barangay}",
+                "body": alert_text(alert, barangay),
+                "risk_level": alert.warnings[barangay]['risk_level'],
+            })
+            for barangay in alert.recipients
+        }
+        session = requests.Session()
+        expired = []
+
+        def push(row):
+            user_id, endpoint, p256dh, auth = row
+            try:
+                webpush(
+                    subscription_info={"endpoint": endpoint, "keys": {"p256dh": p256dh, "auth": auth}},
+                    data=payloads[barangay_of[user_id]],
+                    vapid_private_key=settings.WEBPUSH_VAPID_PRIVATE_KEY,
+                    vapid_claims={"sub": settings.WEBPUSH_VAPID_SUBJECT},
+                    requests_session=session,
+                    timeout=10,
+                )
+                return user_id
+            except WebPushException as e:
+                if getattr(e.response, "status_code", None) in EXPIRED_SUBSCRIPTION_STATUSES:
+                    expired.append(endpoint)
+                else:
+                    logger.warning("Web push to user %s failed: %s", user_id, e)
+                return None
+
+        rows = self.subscriptions(barangay_of)
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="alert-push-send") as executor:
+            reached = [user_id for user_id in executor.map(push, rows) if user_id is not None]
+        self.remove(expired)
+        session.close()
+        failed = len(rows) - len(reached)
+        # Expired subscriptions are gone for good; any other failure means users missed the alert
+        return {
+            "success": failed == len(expired),
+            "total_sent": len(reached),
+            "total_failed": failed,
+            "expired": len(expired),
+            "alerted": sorted(set(reached)),
+        }
+
+
+class _SuppressionRecorder:
+    """
+    Records the recipients of one dispatch that a channel reached as alerted,
+    once every channel is done and only if none of them failed.
+    """
+
+    def __init__(self, recipients, risk_levels, channel_count):
+        self.recipients = recipients
+        self.risk_levels = risk_levels
+        self.pending = channel_count
+        self.failed = []
+        self.alerted = set()
+        self.lock = threading.Lock()
+
+    def channel_done(self, name, summary):
+        with self.lock:
+            if not summary.get("success", True):
+                self.failed.append(name)
+            self.alerted.update(summary.get("alerted", ()))
+            self.pending -= 1
+            if self.pending:
+                return
+        if self.failed:
+            logger.warning("Alert channels %s failed; recipients stay eligible for the next cycle",
+                           ", ".join(self.failed))
+            return
+        reached = {}
+        for barangay, users in self.recipients.items():
+            users = [user for user in users if user['user_id'] in self.alerted]
+            if users:
+                reached[barangay] = users
+        record_alerted(reached, self.risk_levels)
+
+
+CHANNELS = {
+    channel.name: channel for channel in (SmsAlertChannel, EmailAlertChannel, WebPushAlertChannel)
+}
+
+
+class AlertDispatcher:
+    """
+    Fan one resolved recipient set out to several channels in parallel.
+
+    Args:
+        channels: AlertChannel instances; each gets its own thread pool
+    """
+
+    def __init__(self, channels):
+        self.channels = list(channels)
+        self._executors = {
+            channel.name: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"alert-{channel.name}")
+            for channel in self.channels
+        }
+
+    def __call__(self, result, flood_warnings):
+        self.dispatch(result, flood_warnings)
+
+    def _deliver(self, channel, alert, recorder):
+        from django.db import connection
+
+        started = time.perf_counter()
+        try:
+            summary = channel.deliver(alert)
+            logger.info("Alert channel %s done in %.1fs: %s", channel.name, time.perf_counter() - started,
+                        {k: v for k, v in summary.items() if k.startswith("total")})
+        except Exception as e:
+            logger.exception("Alert channel %s failed", channel.name)
+            summary = {"success": False, "error": str(e)}
+        try:
+            recorder.channel_done(channel.name, summary)
+        except Exception:
+            logger.exception("Could not record alerted recipients")
+        finally:
+            # Worker threads hold their own database connection
+            connection.close()
+        return summary
+
+    def dispatch(self, result, flood_warnings):
+        """
+        Resolve recipients once and start every channel.
+
+        Args:
+            result: Prediction result (rate_mm_h, duration_min, intensity)
+            flood_warnings: Flood warning dicts of the cycle; those below
+                ``ALERT_MIN_RISK_LEVEL`` are not sent
+
+        Returns:
+            dict: ``{channel name: Future of its summary dict}``; empty when there
+            is nobody to alert.
+        """
+        flood_warnings = alertable_warnings(flood_warnings)
+        if not flood_warnings or not self.channels:
+            return {}
+        warnings = {w['barangay']: w for w in flood_warnings}
+        risk_levels = {barangay: w['risk_level'] for barangay, w in warnings.items()}
+        recipients, suppressed = partition_recipients(get_users_by_affected_barangays(flood_warnings), risk_levels)
+        if not recipients:
+            logger.info("No users to alert for %s flood warnings", len(flood_warnings))
+            return {}
+
+        alert = Alert(result, warnings, recipients, suppressed)
+        recorder = _SuppressionRecorder(recipients, risk_levels, len(self.channels))
+        futures = {
+            channel.name: self._executors[channel.name].submit(self._deliver, channel, alert, recorder)
+            for channel in self.channels
+        }
+        logger.info(
+            "Dispatching flood alerts to %s users in %s barangays via %s",
+            sum(len(users) for users in recipients.values()), len(recipients), ", ".join(futures),
+        )
+        return futures
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    """Process-wide dispatcher for the channels in ``ALERT_CHANNELS`` that are available."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            channels = []
+            for name in settings.ALERT_CHANNELS:
+                if name not in CHANNELS:
+                    logger.warning("Unknown alert channel %r in ALERT_CHANNELS", name)
+                    continue
+                channel = CHANNELS[name]()
+                if channel.is_available():
+                    channels.append(channel)
+                else:
+                    logger.info("Alert channel %s is not configured; skipping it", name)
+            _dispatcher = AlertDispatcher(channels)
+        return _dispatcher
@@ -0,0 +1,259 @@
+"""
+Durable email outbox for transactional mail (OTPs, password resets) and the
+email channel of the flood alert dispatcher.
+
+Callers only INSERT the message into ``email_outbox`` and return; Celery
+(``drain_email_outbox_task``) sends it. A drain opens one SMTP connection and
+reuses it for every message it claims, in batches of ``EMAIL_OUTBOX_BATCH_SIZE``,
+instead of the connect/TLS/login/quit round trip ``send_mail`` makes per message.
+
+Claims, leases and retries work like the SMS outbox (weatherapp/sms_outbox.py):
+a claimed row is leased to one worker, failed rows are retried with exponential
+backoff and jitter (``EMAIL_OUTBOX_RETRY_*``) and marked ``failed`` after
+``EMAIL_OUTBOX_MAX_ATTEMPTS``. The body of a sent row is cleared, since it
+usually carries a one-time password.
+
+``kick_drain`` starts a drain right after a message is queued without making the
+request wait for the broker. If no Celery broker is reachable, it drains the
+outbox from that background thread itself.
+"""
+
+import logging
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from weatherapp.sms_outbox import STATUS_FAILED, STATUS_PENDING, STATUS_SENDING, STATUS_SENT, retry_delay
+
+logger = logging.getLogger(__name__)
+
+MAX_ERROR_LENGTH = 255
+
+
+def _get_connection(connection):
+    if connection is None:
+        from django.db import connection
+    return connection
+
+
+def enqueue_email(to_email, subject, body, from_email=None, connection=None):
+    """
+    Queue one email.
+
+    Args:
+        to_email: Recipient address
+        subject: Subject line
+        body: Plain-text body
+        from_email: Sender; ``DEFAULT_FROM_EMAIL`` when empty
+
+    Returns:
+        int: Number of messages queued (0 without a recipient).
+    """
+    return enqueue_emails(
+        [{"to_email": to_email, "subject": subject, "body": body, "from_email": from_email}], connection,
+    )
+
+
+def enqueue_emails(messages, connection=None):
+    """
+    Queue several emails with one batched INSERT.
+
+    Args:
+        messages: Iterable of dicts with ``to_email``, ``subject`` and ``body`` and
+            optionally ``from_email``
+
+    Returns:
+        int: Number of messages queued (those without a recipient are skipped).
+    """
+    now = timezone.now()
+    rows = [
+        (m["to_email"], m.get("from_email") or None, m["subject"], m["body"], STATUS_PENDING, now, now)
+        for m in messages if m.get("to_email")
+    ]
+    if not rows:
+        return 0
+    with _get_connection(connection).cursor() as cursor:
+        cursor.executemany("""
+            INSERT INTO email_outbox (to_email, from_email, subject, body, status, next_attempt_at, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, rows)
+    return len(rows)
+
+
+def claim_due(limit, connection=None, now=None, token=None):
+    """
+    Lease up to ``limit`` due messages to this worker, oldest first.
+
+    Args:
+        token: Lease token stamped on the claimed rows (a new one by default);
+            pass the same token to ``mark_sent`` and ``mark_failed``
+
+    Returns:
+        list: ``(id, to_email, from_email, subject, body, attempts)`` tuples;
+        ``attempts`` already counts the attempt being made.
+    """
+    connection = _get_connection(connection)
+    now = now or timezone.now()
+    token = token or uuid.uuid4().hex
+    lease_expiry = now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT id FROM email_outbox
+            WHERE status IN (%s, %s) AND next_attempt_at <= %s
+            ORDER BY id
+            LIMIT %s
+        """, [STATUS_PENDING, STATUS_SENDING, now, limit])
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            return []
+
+        placeholders = ", ".join(["%s"] * len(ids))
+        cursor.execute(f"""
+            UPDATE email_outbox
+            SET status = %s, lease_token = %s, next_attempt_at = %s, attempts = attempts + 1
+            WHERE id IN ({placeholders}) AND status IN (%s, %s) AND next_attempt_at <= %s
+        """, [STATUS_SENDING, token, lease_expiry, *ids, STATUS_PENDING, STATUS_SENDING, now])
+
+        cursor.execute("""
+            SELECT id, to_email, from_email, subject, body, attempts FROM email_outbox
+            WHERE lease_token = %s AND status = %s
+            ORDER BY id
+        """, [token, STATUS_SENDING])
+        return list(cursor.fetchall())
+
+
+def mark_sent(ids, token, connection=None):
+    """
+    Mark messages of the lease ``token`` as sent.
+
+    Returns:
+        int: Rows updated; rows whose lease was lost to another drain are skipped.
+    """
+    if not ids:
+        return 0
+    placeholders = ", ".join(["%s"] * len(ids))
+    with _get_connection(connection).cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE email_outbox SET status = %s, lease_token = NULL, last_error = NULL, body = '', sent_at = %s
+            WHERE id IN ({placeholders}) AND lease_token = %s
+        """, [STATUS_SENT, timezone.now(), *ids, token])
+        updated = cursor.rowcount
+    if updated < len(ids):
+        logger.warning("%s sent emails had lost their lease to another drain", len(ids) - updated)
+    return updated
+
+
+def mark_failed(failures, token, connection=None, now=None):
+    """
+    Reschedule failed messages, or give up on them after the last attempt.
+
+    Args:
+        failures: Iterable of ``(id, attempts, error)``
+        token: Lease token the messages were claimed with; rows whose lease
+            was lost to another drain are left alone
+    """
+    now = now or timezone.now()
+    with _get_connection(connection).cursor() as cursor:
+        for outbox_id, attempts, error in failures:
+            error = (error or "")[:MAX_ERROR_LENGTH]
+            if attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                logger.error("Giving up on email %s after %s attempts: %s", outbox_id, attempts, error)
+                cursor.execute("""
+                    UPDATE email_outbox SET status = %s, lease_token = NULL, last_error = %s
+                    WHERE id = %s AND lease_token = %s
+                """, [STATUS_FAILED, error, outbox_id, token])
+            else:
+                delay = retry_delay(
+                    attempts,
+                    base=settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS,
+                    maximum=settings.EMAIL_OUTBOX_RETRY_MAX_SECONDS,
+                )
+                cursor.execute("""
+                    UPDATE email_outbox SET status = %s, lease_token = NULL, last_error = %s, next_attempt_at = %s
+                    WHERE id = %s AND lease_token = %s
+                """, [STATUS_PENDING, error, now + timedelta(seconds=delay), outbox_id, token])
+            if not cursor.rowcount:
+                logger.warning("Email %s lost its lease to another drain; not rescheduling it", outbox_id)
+
+
+def drain_outbox(get_mail_connection=None, connection=None, max_batches=None):
+    """
+    Send due emails over one SMTP connection until none are left (or
+    ``max_batches`` batches ran).
+
+    Args:
+        get_mail_connection: Factory for the mail connection; defaults to
+            ``django.core.mail.get_connection``
+
+    Returns:
+        dict: ``sent``, ``retried`` and ``failed`` counts for this drain.
+    """
+    from django.core.mail import EmailMessage
+
+    if get_mail_connection is None:
+        from django.core.mail import get_connection as get_mail_connection
+
+    counts = {"sent": 0, "retried": 0, "failed": 0}
+    mail = None
+    batches = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            token = uuid.uuid4().hex
+            rows = claim_due(settings.EMAIL_OUTBOX_BATCH_SIZE, connection, token=token)
+            if not rows:
+                break
+            batches += 1
+            if mail is None:
+                mail = get_mail_connection(fail_silently=False)
+
+            delivered, failures = [], []
+            for outbox_id, to_email, from_email, subject, body, attempts in rows:
+                message = EmailMessage(subject, body, from_email or settings.DEFAULT_FROM_EMAIL, [to_email])
+                try:
+                    # Opens the SMTP connection on first use and keeps it for the whole drain
+                    mail.open()
+                    mail.send_messages([message])
+                    delivered.append(outbox_id)
+                except Exception as e:
+                    logger.warning("Email %s to %s failed: %s", outbox_id, to_email, e)
+                    failures.append((outbox_id, attempts, str(e) or type(e).__name__))
+                    # The connection may be broken; the next message reconnects
+                    mail.close()
+
+            mark_sent(delivered, token, connection)
+            mark_failed(failures, token, connection)
+            counts["sent"] += len(delivered)
+            for _, attempt, _ in failures:
+                counts["failed" if attempt >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS else "retried"] += 1
+    finally:
+        if mail is not None:
+            mail.close()
+
+    if batches:
+        logger.info("Email outbox drained: %(sent)s sent, %(retried)s to retry, %(failed)s failed", counts)
+    return counts
+
+
+def _drain_now():
+    from django.db import connection
+
+    try:
+        from weatherapp.tasks import drain_email_outbox_task
+        drain_email_outbox_task.delay()
+    except Exception as e:
+        logger.warning("Could not queue the email outbox drain (%s); draining in-process", e)
+        try:
+            drain_outbox()
+        except Exception:
+            logger.exception("In-process email outbox drain failed")
+    finally:
+        connection.close()
+
+
+def kick_drain():
+    """Start sending queued email without blocking the caller."""
+    threading.Thread(target=_drain_now, name="email-outbox-kick", daemon=True).start()
@@ -0,0 +1,54 @@
+"""
+Create the durable SMS outbox table (weatherapp/sms_outbox.py).
+
+Like the app's other tables it is managed with raw SQL rather than a Django model.
+"""
+from django.db import migrations
+
+ID_COLUMNS = {
+    'mysql': 'BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY',
+    'postgresql': 'BIGSERIAL PRIMARY KEY',
+    'sqlite': 'INTEGER PRIMARY KEY AUTOINCREMENT',
+}
+
+
+def create_sms_outbox(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if 'sms_outbox' in connection.introspection.table_names(cursor):
+            return
+        cursor.execute(f"""
+            CREATE TABLE sms_outbox (
+                id {ID_COLUMNS.get(connection.vendor, ID_COLUMNS['postgresql'])},
+                phone_number VARCHAR(20) NOT NULL,
+                message TEXT NOT NULL,
+                barangay VARCHAR(100) NULL,
+                priority SMALLINT NOT NULL DEFAULT 0,
+                status VARCHAR(10) NOT NULL DEFAULT 'pending',
+                attempts INT NOT NULL DEFAULT 0,
+                next_attempt_at DATETIME NOT NULL,
+                lease_token CHAR(32) NULL,
+                last_error VARCHAR(255) NULL,
+                created_at DATETIME NOT NULL,
+                sent_at DATETIME NULL
+            )
+        """.replace('DATETIME', 'TIMESTAMP' if connection.vendor == 'postgresql' else 'DATETIME'))
+        # Drain query: due messages by status, highest priority first
+        cursor.execute("CREATE INDEX idx_sms_outbox_due ON sms_outbox (status, next_attempt_at, priority)")
+        cursor.execute("CREATE INDEX idx_sms_outbox_lease ON sms_outbox (lease_token)")
+
+
+def drop_sms_outbox(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS sms_outbox")
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.RunPython(create_sms_outbox, drop_sms_outbox),
+    ]
@@ -0,0 +1,63 @@
+"""
+Add the normalized, indexed ``barangay`` column to ``user`` for recipient
+resolution (weatherapp/recipients.py) and backfill it from ``address``.
+
+The normalization is a frozen copy of ``recipients.barangay_from_address`` as of
+this migration, so later changes to the app code do not change what it does.
+"""
+import re
+
+from django.db import migrations
+
+BARANGAY_PREFIX = re.compile(r"^(barangay|brgy\.?)\s+", re.IGNORECASE)
+
+
+def barangay_from_address(address):
+    """Upper-cased first part of "Barangay, City, Province", without a "Barangay"/"Brgy." prefix."""
+    if not address:
+        return None
+    name = " ".join(str(address.split(",")[0]).split())
+    name = BARANGAY_PREFIX.sub("", name).strip()
+    return name.upper() or None
+
+
+def add_barangay_column(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if 'user' not in connection.introspection.table_names(cursor):
+            return
+        columns = {c.name for c in connection.introspection.get_table_description(cursor, 'user')}
+        if 'barangay' not in columns:
+            cursor.execute("ALTER TABLE user ADD COLUMN barangay VARCHAR(100) NULL")
+            cursor.execute("CREATE INDEX idx_user_barangay ON user (barangay)")
+
+        cursor.execute("SELECT user_id, address FROM user WHERE barangay IS NULL")
+        updates = []
+        for user_id, address in cursor.fetchall():
+            barangay = barangay_from_address(address)
+            if barangay:
+                updates.append((barangay, user_id))
+        if updates:
+            cursor.executemany("UPDATE user SET barangay = %s WHERE user_id = %s", updates)
+
+
+def drop_barangay_column(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if 'user' not in connection.introspection.table_names(cursor):
+            return
+        columns = {c.name for c in connection.introspection.get_table_description(cursor, 'user')}
+        if 'barangay' in columns:
+            cursor.execute("DROP INDEX idx_user_barangay ON user")
+            cursor.execute("ALTER TABLE user DROP COLUMN barangay")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weatherapp', '0001_sms_outbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_barangay_column, drop_barangay_column),
+    ]
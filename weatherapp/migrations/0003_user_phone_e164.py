@@ -0,0 +1,64 @@
+"""
+Add ``user.phone_e164``, the recipient's number normalized once to E.164
+(weatherapp/recipients.py), and backfill it from ``phone_num``.
+
+The normalization is a frozen copy of ``recipients.to_e164`` as of this
+migration, so later changes to the app code do not change what it does.
+"""
+import re
+
+from django.db import migrations
+
+
+def to_e164(phone_num):
+    """Philippine mobile number in E.164 form, or None if it cannot be normalized."""
+    if not phone_num:
+        return None
+    digits = re.sub(r"\D", "", str(phone_num))
+    if len(digits) == 11 and digits.startswith("09"):
+        return "+63" + digits[1:]
+    if len(digits) == 10 and digits.startswith("9"):
+        return "+63" + digits
+    if len(digits) == 12 and digits.startswith("639"):
+        return "+" + digits
+    return None
+
+
+def add_phone_e164_column(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if 'user' not in connection.introspection.table_names(cursor):
+            return
+        columns = {c.name for c in connection.introspection.get_table_description(cursor, 'user')}
+        if 'phone_e164' not in columns:
+            cursor.execute("ALTER TABLE user ADD COLUMN phone_e164 VARCHAR(16) NULL")
+
+        cursor.execute("SELECT user_id, phone_num FROM user WHERE phone_e164 IS NULL")
+        updates = []
+        for user_id, phone_num in cursor.fetchall():
+            phone_e164 = to_e164(phone_num)
+            if phone_e164:
+                updates.append((phone_e164, user_id))
+        if updates:
+            cursor.executemany("UPDATE user SET phone_e164 = %s WHERE user_id = %s", updates)
+
+
+def drop_phone_e164_column(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if 'user' not in connection.introspection.table_names(cursor):
+            return
+        columns = {c.name for c in connection.introspection.get_table_description(cursor, 'user')}
+        if 'phone_e164' in columns:
+            cursor.execute("ALTER TABLE user DROP COLUMN phone_e164")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weatherapp', '0002_user_barangay'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_phone_e164_column, drop_phone_e164_column),
+    ]
@@ -0,0 +1,49 @@
+"""
+Create the ``push_subscription`` table for Web Push flood alerts
+(weatherapp/alert_dispatcher.py). Browsers register through
+``api/push-subscriptions/``.
+"""
+from django.db import migrations
+
+ID_COLUMNS = {
+    'mysql': 'BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY',
+    'postgresql': 'BIGSERIAL PRIMARY KEY',
+    'sqlite': 'INTEGER PRIMARY KEY AUTOINCREMENT',
+}
+
+
+def create_push_subscription(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if 'push_subscription' in connection.introspection.table_names(cursor):
+            return
+        cursor.execute(f"""
+            CREATE TABLE push_subscription (
+                id {ID_COLUMNS.get(connection.vendor, ID_COLUMNS['postgresql'])},
+                user_id INT NOT NULL,
+                endpoint VARCHAR(500) NOT NULL,
+                p256dh VARCHAR(255) NOT NULL,
+                auth VARCHAR(64) NOT NULL,
+                created_at DATETIME NOT NULL
+            )
+        """.replace('DATETIME', 'TIMESTAMP' if connection.vendor == 'postgresql' else 'DATETIME'))
+        cursor.execute("CREATE INDEX idx_push_subscription_user ON push_subscription (user_id)")
+        cursor.execute("CREATE INDEX idx_push_subscription_endpoint ON push_subscription (endpoint(255))"
+                       if connection.vendor == 'mysql' else
+                       "CREATE INDEX idx_push_subscription_endpoint ON push_subscription (endpoint)")
+
+
+def drop_push_subscription(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS push_subscription")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weatherapp', '0003_user_phone_e164'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_push_subscription, drop_push_subscription),
+    ]
@@ -0,0 +1,51 @@
+"""
+Create the durable email outbox table (weatherapp/email_outbox.py).
+"""
+from django.db import migrations
+
+ID_COLUMNS = {
+    'mysql': 'BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY',
+    'postgresql': 'BIGSERIAL PRIMARY KEY',
+    'sqlite': 'INTEGER PRIMARY KEY AUTOINCREMENT',
+}
+
+
+def create_email_outbox(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if 'email_outbox' in connection.introspection.table_names(cursor):
+            return
+        cursor.execute(f"""
+            CREATE TABLE email_outbox (
+                id {ID_COLUMNS.get(connection.vendor, ID_COLUMNS['postgresql'])},
+                to_email VARCHAR(254) NOT NULL,
+                from_email VARCHAR(254) NULL,
+                subject VARCHAR(255) NOT NULL,
+                body TEXT NOT NULL,
+                status VARCHAR(10) NOT NULL DEFAULT 'pending',
+                attempts INT NOT NULL DEFAULT 0,
+                next_attempt_at DATETIME NOT NULL,
+                lease_token CHAR(32) NULL,
+                last_error VARCHAR(255) NULL,
+                created_at DATETIME NOT NULL,
+                sent_at DATETIME NULL
+            )
+        """.replace('DATETIME', 'TIMESTAMP' if connection.vendor == 'postgresql' else 'DATETIME'))
+        cursor.execute("CREATE INDEX idx_email_outbox_due ON email_outbox (status, next_attempt_at)")
+        cursor.execute("CREATE INDEX idx_email_outbox_lease ON email_outbox (lease_token)")
+
+
+def drop_email_outbox(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS email_outbox")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weatherapp', '0004_push_subscription'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_email_outbox, drop_email_outbox),
+    ]
@@ -0,0 +1,39 @@
+"""
+Create the ``otp_delivery`` table holding the status of asynchronous OTP SMS
+sends (weatherapp/otp_delivery.py), so the web process sees what a Celery
+worker recorded without depending on a shared cache.
+"""
+from django.db import migrations
+
+
+def create_otp_delivery(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if 'otp_delivery' in connection.introspection.table_names(cursor):
+            return
+        cursor.execute("""
+            CREATE TABLE otp_delivery (
+                delivery_id CHAR(32) NOT NULL PRIMARY KEY,
+                status VARCHAR(10) NOT NULL,
+                error VARCHAR(255) NULL,
+                created_at DATETIME NOT NULL,
+                updated_at DATETIME NOT NULL
+            )
+        """.replace('DATETIME', 'TIMESTAMP' if connection.vendor == 'postgresql' else 'DATETIME'))
+        cursor.execute("CREATE INDEX idx_otp_delivery_created ON otp_delivery (created_at)")
+
+
+def drop_otp_delivery(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS otp_delivery")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weatherapp', '0005_email_outbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_otp_delivery, drop_otp_delivery),
+    ]
@@ -0,0 +1,157 @@
+"""
+Asynchronous OTP SMS delivery.
+
+``send_otp`` used to wait on the SMS gateway inside the request, holding a
+gunicorn thread for up to the gateway timeout. Now the view calls
+``start_otp_sms`` and redirects at once. The OTP is sent by
+``send_otp_sms_task`` through the shared gateway client (weatherapp/sms_client.py).
+The task is routed to its own Celery queue (``OTP_TASK_QUEUE``), served by the
+``otp_worker`` process, so an OTP never waits behind a long outbox drain.
+The verification page polls ``api/otp-status/`` for the outcome.
+
+Delivery status is a row of the ``otp_delivery`` table, so whichever process
+sends the OTP (Celery worker or the web process itself) the web process reads
+the same outcome; the cache may be per-process. It moves through:
+
+    queued -> sending -> sent | failed
+
+and is reported for ``STATUS_TTL_SECONDS``. Older rows are purged when a new
+OTP is started.
+
+The task is queued from a daemon thread, so a slow or unreachable broker never
+delays the request. If queueing fails, that thread sends the OTP itself.
+"""
+
+import logging
+import threading
+import uuid
+from datetime import timedelta
+
+import requests
+from django.db import DatabaseError
+from django.utils import timezone
+
+from weatherapp.sms_client import gateway_rejection, get_sms_client
+
+logger = logging.getLogger(__name__)
+
+# Polled by the OTP verification page; an OTP is only valid for a few minutes
+STATUS_TTL_SECONDS = 600
+
+STATUS_QUEUED = "queued"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+FAILED_MESSAGE = "Failed to send SMS. Please try again later."
+
+
+def _get_connection(connection):
+    if connection is None:
+        from django.db import connection
+    return connection
+
+
+def create_delivery(delivery_id, connection=None):
+    """Record a new delivery as queued and purge the expired ones."""
+    now = timezone.now()
+    try:
+        with _get_connection(connection).cursor() as cursor:
+            cursor.execute("DELETE FROM otp_delivery WHERE created_at < %s",
+                           [now - timedelta(seconds=STATUS_TTL_SECONDS)])
+            cursor.execute("""
+                INSERT INTO otp_delivery (delivery_id, status, error, created_at, updated_at)
+                VALUES (%s, %s, NULL, %s, %s)
+            """, [delivery_id, STATUS_QUEUED, now, now])
+    except DatabaseError:
+        logger.exception("Could not record OTP delivery %s", delivery_id)
+
+
+def set_delivery_status(delivery_id, status, error=None, connection=None):
+    try:
+        with _get_connection(connection).cursor() as cursor:
+            cursor.execute("""
+                UPDATE otp_delivery SET status = %s, error = %s, updated_at = %s WHERE delivery_id = %s
+            """, [status, error, timezone.now(), delivery_id])
+    except DatabaseError:
+        logger.exception("Could not record OTP delivery %s as %s", delivery_id, status)
+
+
+def get_delivery_status(delivery_id, connection=None):
+    """
+    Returns:
+        dict: ``{"status", "error"}``; status is None for unknown or expired deliveries.
+    """
+    unknown = {"status": None, "error": None}
+    if not delivery_id:
+        return unknown
+    try:
+        with _get_connection(connection).cursor() as cursor:
+            cursor.execute("""
+                SELECT status, error FROM otp_delivery WHERE delivery_id = %s AND created_at >= %s
+            """, [delivery_id, timezone.now() - timedelta(seconds=STATUS_TTL_SECONDS)])
+            row = cursor.fetchone()
+    except DatabaseError:
+        logger.exception("Could not read OTP delivery %s", delivery_id)
+        return unknown
+    if row is None:
+        return unknown
+    return {"status": row[0], "error": row[1]}
+
+
+def deliver_otp_sms(delivery_id, phone_number, message):
+    """
+    Send the OTP through the shared gateway client and record the outcome.
+
+    Returns:
+        bool: True if the gateway accepted the message.
+    """
+    set_delivery_status(delivery_id, STATUS_SENDING)
+    try:
+        response = get_sms_client().post(phone_number, message)
+    except requests.RequestException:
+        logger.exception("SMS gateway error when sending OTP")
+        set_delivery_status(delivery_id, STATUS_FAILED, FAILED_MESSAGE)
+        return False
+
+    rejection = gateway_rejection(response)
+    if rejection is not None:
+        logger.warning("SMS gateway rejected OTP: %s", rejection)
+        # API-level rejections (bad number, no credit) are shown; HTTP errors are not
+        set_delivery_status(delivery_id, STATUS_FAILED, rejection if response.status_code == 200 else FAILED_MESSAGE)
+        return False
+    set_delivery_status(delivery_id, STATUS_SENT)
+    return True
+
+
+def _dispatch(delivery_id, phone_number, message):
+    from django.db import connection
+
+    try:
+        from weatherapp.tasks import send_otp_sms_task
+        send_otp_sms_task.delay(delivery_id, phone_number, message)
+    except Exception as e:
+        logger.warning("Could not queue the OTP task (%s); sending from this process", e)
+        deliver_otp_sms(delivery_id, phone_number, message)
+    finally:
+        # This thread's own database connection
+        connection.close()
+
+
+def start_otp_sms(phone_number, message):
+    """
+    Start sending an OTP SMS without blocking the caller.
+
+    Args:
+        phone_number: E.164 number
+        message: SMS text
+
+    Returns:
+        str: Delivery id for ``get_delivery_status``.
+    """
+    delivery_id = uuid.uuid4().hex
+    create_delivery(delivery_id)
+    threading.Thread(
+        target=_dispatch, args=(delivery_id, phone_number, message), name="otp-dispatch", daemon=True,
+    ).start()
+    return delivery_id
@@ -0,0 +1,156 @@
+"""
+Alert recipient resolution by barangay.
+
+Each user row stores its barangay in the normalized ``user.barangay`` column
+(indexed; set at registration and backfilled from ``address`` by migration
+0003), so the users of the flagged barangays come from one indexed
+``WHERE barangay IN (...)`` query instead of matching substrings of the
+free-text address.
+
+Results are cached per barangay (``sms:recipients:v2:<BARANGAY>``). A resolution
+reads every flagged barangay with one ``get_many`` and queries the database only
+for the misses. Registration and user deletion invalidate the affected
+barangay's entry.
+
+Phone numbers are stored in E.164 form (``user.phone_e164``, set at registration
+and backfilled by migration 0003), so sending never re-normalizes them.
+"""
+
+import logging
+import re
+
+from weatherapp.utils.cache import (
+    CACHE_TIMEOUTS,
+    safe_cache_delete,
+    safe_cache_get_many,
+    safe_cache_set_many,
+)
+
+logger = logging.getLogger(__name__)
+
+# v2: entries carry the user's email for the alert dispatcher
+RECIPIENT_CACHE_PREFIX = "sms:recipients:v2"
+_BARANGAY_PREFIX = re.compile(r"^(barangay|brgy\.?)\s+", re.IGNORECASE)
+
+
+def normalize_barangay(name):
+    """
+    Canonical form of a barangay name: upper case, single spaces, without a
+    leading "Barangay"/"Brgy." (e.g. " brgy.  Ma-ao " -> "MA-AO").
+
+    Returns:
+        str or None: None for empty names.
+    """
+    if not name:
+        return None
+    name = " ".join(str(name).split())
+    name = _BARANGAY_PREFIX.sub("", name).strip()
+    return name.upper() or None
+
+
+def barangay_from_address(address):
+    """Normalized barangay of a registration address ("Barangay, City, Province")."""
+    if not address:
+        return None
+    return normalize_barangay(address.split(",")[0])
+
+
+def to_e164(phone_num):
+    """
+    Philippine mobile number in E.164 form ("09171234567" -> "+639171234567").
+
+    Accepts the local 11-digit form, the 10-digit form without the leading 0 and
+    numbers already carrying the 63 country code, with or without separators.
+
+    Returns:
+        str or None: None if the number cannot be normalized.
+    """
+    if not phone_num:
+        return None
+    digits = re.sub(r"\D", "", str(phone_num))
+    if len(digits) == 11 and digits.startswith("09"):
+        return "+63" + digits[1:]
+    if len(digits) == 10 and digits.startswith("9"):
+        return "+63" + digits
+    if len(digits) == 12 and digits.startswith("639"):
+        return "+" + digits
+    return None
+
+
+def recipient_cache_key(barangay):
+    return f"{RECIPIENT_CACHE_PREFIX}:{normalize_barangay(barangay)}"
+
+
+def invalidate_recipients(barangay):
+    """Drop the cached recipient list of one barangay (after a user joins or leaves it)."""
+    if normalize_barangay(barangay):
+        safe_cache_delete(recipient_cache_key(barangay))
+
+
+def fetch_recipients(barangays, connection=None):
+    """
+    Users of the given normalized barangays, from the database.
+
+    Returns:
+        dict: ``{BARANGAY: [{user_id, name, phone_num, phone_e164, email}, ...]}`` with an entry
+        (possibly empty) for every requested barangay.
+    """
+    if connection is None:
+        from django.db import connection
+    barangays = list(barangays)
+    recipients = {barangay: [] for barangay in barangays}
+    if not barangays:
+        return recipients
+
+    placeholders = ", ".join(["%s"] * len(barangays))
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT user_id, name, phone_num, phone_e164, email, barangay
+            FROM user
+            WHERE barangay IN ({placeholders})
+            ORDER BY user_id
+        """, barangays)
+        for user_id, name, phone_num, phone_e164, email, barangay in cursor.fetchall():
+            phone_e164 = phone_e164 or to_e164(phone_num)
+            if phone_e164 or email:
+                recipients[barangay].append({
+                    "user_id": user_id, "name": name, "phone_num": phone_num, "phone_e164": phone_e164,
+                    "email": email or None,
+                })
+    return recipients
+
+
+def get_users_by_affected_barangays(flood_warnings, connection=None):
+    """
+    Map each flagged barangay to its registered users.
+
+    Args:
+        flood_warnings (list): Flood warning dicts with a ``barangay`` key
+
+    Returns:
+        dict: ``{barangay (as named in the warning): [{user_id, name, phone_num, phone_e164, email}, ...]}``
+        for the barangays that have users.
+    """
+    names = {}
+    for warning in flood_warnings:
+        key = normalize_barangay(warning.get("barangay"))
+        if key:
+            names.setdefault(key, warning["barangay"])
+    if not names:
+        return {}
+
+    cache_keys = {recipient_cache_key(key): key for key in names}
+    cached = safe_cache_get_many(cache_keys)
+    recipients = {cache_keys[cache_key]: users for cache_key, users in cached.items()}
+
+    missing = [key for key in names if key not in recipients]
+    if missing:
+        fetched = fetch_recipients(missing, connection)
+        safe_cache_set_many(
+            {recipient_cache_key(key): users for key, users in fetched.items()},
+            CACHE_TIMEOUTS["recipients"],
+        )
+        recipients.update(fetched)
+    logger.debug("Resolved recipients for %s barangays (%s from cache)", len(names), len(cached))
+
+    return {names[key]: users for key, users in recipients.items() if users}
@@ -0,0 +1,157 @@
+"""
+Delivery-throughput benchmark for SMS flood alerts.
+
+Fires a synthetic city-wide warning (``--barangays`` x ``--users`` recipients)
+through the same path as a real alert drain: the rendered alert text, the
+gateway sender used by the outbox (``sms_outbox.default_sender``) and the
+concurrent fan-out engine. Messages that fail are retried up to
+``SMS_OUTBOX_MAX_ATTEMPTS`` times like the outbox does, but without waiting out
+the backoff, so a run measures the gateway path rather than the retry schedule.
+
+Unless ``--gateway-url`` is given, a stub gateway (sms_stub_gateway.py) with the
+requested latency, error rate and rate limit is started in-process. Reports
+messages/second, p50/p95/p99 send latency and retry counts::
+
+    python -m weatherapp.sms_benchmark [--barangays 24] [--users 50] \\
+        [--concurrency 8] [--client-rate 0] [--latency-ms 50] [--error-rate 0.02]
+
+Never point ``--gateway-url`` at the production gateway: every message is sent.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from weatherapp.sms_fanout import SmsFanout, SmsJob, TokenBucket
+from weatherapp.sms_messages import render_alert
+from weatherapp.sms_stub_gateway import add_gateway_arguments, gateway_options, start_gateway_thread
+
+
+def synthetic_alert_jobs(barangays, users):
+    """One rendered alert per barangay, addressed to ``users`` numbers each."""
+    jobs = []
+    for b in range(barangays):
+        barangay = f"Barangay {b + 1}"
+        warning = {
+            "risk_level": ("High", "Moderate", "Low")[b % 3],
+            "land_type": "lowland",
+            "message": "Flooding possible in low-lying areas. Prepare to evacuate.",
+        }
+        message = render_alert(barangay, warning, 18.5, 90, "Heavy").text
+        for u in range(users):
+            phone = f"+639{(b * users + u) % 10 ** 9:09d}"
+            jobs.append(SmsJob(barangay, phone, message, f"user {b}-{u}"))
+    return jobs
+
+
+def timed(send, samples):
+    def send_and_time(phone_number, message):
+        started = time.perf_counter()
+        try:
+            return send(phone_number, message)
+        finally:
+            samples.append(time.perf_counter() - started)  # list.append is atomic
+    return send_and_time
+
+
+def run(barangays=24, users=50, concurrency=None, client_rate=0, gateway_url=None,
+        send=None, **gateway):
+    """
+    Run the benchmark and print a report.
+
+    Args:
+        barangays, users: Size of the synthetic warning
+        concurrency: Fan-out workers; defaults to ``SMS_FANOUT_CONCURRENCY``
+        client_rate: Client-side rate limit in messages per second (0 = none)
+        gateway_url: Existing gateway to target instead of a stub
+        send: Override for the gateway sender (tests)
+        **gateway: Stub gateway options (see ``start_gateway_thread``)
+
+    Returns:
+        dict: messages, delivered, failed, retries, retries_by_attempt,
+        elapsed_seconds, messages_per_second, latency_ms (p50/p95/p99) and,
+        with a stub gateway, gateway_stats.
+    """
+    from django.conf import settings
+
+    from weatherapp.sms_outbox import default_sender
+
+    stub = None
+    if send is None:
+        if gateway_url is None:
+            stub = start_gateway_thread(**gateway)
+            gateway_url = stub.url
+        settings.SMS_API_URL = gateway_url
+        send = default_sender()
+
+    jobs = synthetic_alert_jobs(barangays, users)
+    samples = []
+    fanout = SmsFanout(timed(send, samples), concurrency=concurrency,
+                       rate_limiter=TokenBucket(client_rate))
+
+    delivered = 0
+    retries_by_attempt = {}
+    pending = jobs
+    attempt = 0
+    started = time.perf_counter()
+    while pending and attempt < settings.SMS_OUTBOX_MAX_ATTEMPTS:
+        attempt += 1
+        if attempt > 1:
+            retries_by_attempt[attempt] = len(pending)
+        failed = []
+        fanout.on_result = lambda job, success, error: None if success else failed.append(job)
+        delivered += fanout.run(pending)["total_sent"]
+        pending = failed
+    elapsed = time.perf_counter() - started
+
+    latency = np.asarray(samples) * 1000 if samples else np.zeros(1)
+    report = {
+        "messages": len(jobs),
+        "delivered": delivered,
+        "failed": len(pending),
+        "retries": sum(retries_by_attempt.values()),
+        "retries_by_attempt": retries_by_attempt,
+        "elapsed_seconds": round(elapsed, 3),
+        "messages_per_second": round(delivered / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {f"p{q}": round(float(np.percentile(latency, q)), 2) for q in (50, 95, 99)},
+    }
+    if stub is not None:
+        report["gateway_stats"] = stub.stats.snapshot()
+        stub.shutdown()
+        stub.server_close()
+
+    print(f"Messages: {report['messages']} ({barangays} barangays x {users} users), "
+          f"concurrency {fanout.concurrency}, client rate {client_rate or 'unlimited'}/s")
+    print(f"Delivered {delivered}, failed {report['failed']} in {report['elapsed_seconds']:.2f}s "
+          f"-> {report['messages_per_second']} msg/s")
+    print("Send latency ms: " + "  ".join(f"{k} {v:.1f}" for k, v in report["latency_ms"].items()))
+    print(f"Retries: {report['retries']} "
+          + " ".join(f"[attempt {a}: {n}]" for a, n in retries_by_attempt.items()))
+    if "gateway_stats" in report:
+        print(f"Gateway: {report['gateway_stats']}")
+    return report
+
+
+def main(argv=None):
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "weatheralert.settings")
+    django.setup()
+
+    parser = argparse.ArgumentParser(description="Benchmark SMS alert delivery throughput")
+    parser.add_argument("--barangays", type=int, default=24)
+    parser.add_argument("--users", type=int, default=50, help="Recipients per barangay")
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--client-rate", type=float, default=0.0,
+                        help="Client-side messages per second (0 = none)")
+    parser.add_argument("--gateway-url", default=None,
+                        help="Use an already running gateway instead of an in-process stub")
+    add_gateway_arguments(parser)
+    args = parser.parse_args(argv)
+    run(barangays=args.barangays, users=args.users, concurrency=args.concurrency,
+        client_rate=args.client_rate, gateway_url=args.gateway_url, **gateway_options(args))
+
+
+if __name__ == "__main__":
+    main()
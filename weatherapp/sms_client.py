@@ -0,0 +1,173 @@
+"""
+Shared HTTP client for the SMS gateway.
+
+Every SMS the app sends — flood alerts drained from the outbox, OTPs sent by
+otp_delivery.py — goes through one process-wide ``SmsGatewayClient``. It owns a single
+``requests.Session`` with a pooled ``HTTPAdapter``:
+
+- up to ``SMS_POOL_SIZE`` kept-alive connections to the gateway (defaults to
+  ``SMS_FANOUT_CONCURRENCY``, so every fan-out worker can hold one), so the TCP
+  and TLS handshakes are paid once per connection instead of once per message
+- TLS verified against ``SMS_CA_BUNDLE`` (the certifi bundle by default); there
+  is no unverified fallback
+- transport retries (``SMS_HTTP_RETRIES``) only where the gateway cannot have
+  accepted the message: connection failures and 429/503 answers, honouring
+  ``Retry-After``. A timed-out or failed request is left to the caller (the
+  outbox retries it with backoff), so a message is never resent blindly.
+- a message counts as accepted only on HTTP 200 without an API-level rejection
+  (JSON body with a false ``success``, e.g. a bad number or no credit); see
+  ``gateway_rejection``.
+
+The client is created lazily and re-created after a fork (Celery prefork
+workers, gunicorn), so processes never share a connection pool.
+"""
+
+import logging
+import os
+import threading
+
+import certifi
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 503)
+
+
+def gateway_rejection(response):
+    """
+    Why the gateway did not accept a submitted message.
+
+    A 200 answer without a JSON body counts as accepted, as it always has.
+
+    Returns:
+        str or None: None if the message was accepted.
+    """
+    if response.status_code != 200:
+        return f"HTTP {response.status_code}"
+    try:
+        result = response.json()
+    except ValueError:
+        return None
+    if isinstance(result, dict) and not result.get("success", True):
+        return f"SMS API Error: {result.get('message', 'Unknown error')}"
+    return None
+
+
+class SmsGatewayClient:
+    """
+    Args:
+        url: Gateway endpoint (``SMS_API_URL``)
+        api_key: Gateway API key
+        device_id: Sending device (``SMS_DEVICE_ID``)
+        pool_size: Connections kept alive to the gateway
+        timeout: Per-request timeout in seconds
+        retries: Transport retries for refused or throttled requests
+        ca_bundle: CA bundle used to verify the gateway's certificate
+    """
+
+    def __init__(self, url, api_key, device_id, pool_size=8, timeout=10.0, retries=2, ca_bundle=None):
+        self.url = url
+        self.device_id = device_id
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.verify = ca_bundle or certifi.where()
+        self.session.headers.update({
+            "apikey": api_key or "",
+            "Content-Type": "application/x-www-form-urlencoded",
+        })
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=max(1, pool_size),
+            max_retries=Retry(
+                total=retries,
+                connect=retries,
+                read=0,
+                status=retries,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset({"POST"}),
+                backoff_factor=0.5,
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def post(self, phone_number, message):
+        """
+        Submit one message.
+
+        Returns:
+            requests.Response
+
+        Raises:
+            requests.RequestException: The gateway could not be reached.
+        """
+        return self.session.post(
+            self.url,
+            data={
+                "message": message,
+                "mobile_number": phone_number,
+                "device": self.device_id,
+                "device_sim": "1",
+            },
+            timeout=self.timeout,
+        )
+
+    def send(self, phone_number, message):
+        """
+        Submit one message and report whether the gateway accepted it.
+
+        Returns:
+            bool: True if the gateway accepted it (see ``gateway_rejection``).
+        """
+        try:
+            response = self.post(phone_number, message)
+        except requests.RequestException:
+            logger.exception("SMS gateway request failed")
+            return False
+        rejection = gateway_rejection(response)
+        if rejection is None:
+            return True
+        logger.warning("SMS gateway rejected message: %s - %s", rejection, response.text[:200])
+        return False
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_key = None
+_client_lock = threading.Lock()
+
+
+def get_sms_client():
+    """
+    The process-wide gateway client for the current SMS settings.
+
+    A new client is built when the gateway settings change (e.g. under
+    ``override_settings``) or after the process forked.
+    """
+    from django.conf import settings
+
+    global _client, _client_key
+    key = (
+        os.getpid(), settings.SMS_API_URL, settings.SMS_API_KEY, settings.SMS_DEVICE_ID,
+        settings.SMS_POOL_SIZE, settings.SMS_HTTP_TIMEOUT, settings.SMS_HTTP_RETRIES, settings.SMS_CA_BUNDLE,
+    )
+    with _client_lock:
+        if _client is None or _client_key != key:
+            _client = SmsGatewayClient(
+                settings.SMS_API_URL,
+                settings.SMS_API_KEY,
+                settings.SMS_DEVICE_ID,
+                pool_size=settings.SMS_POOL_SIZE,
+                timeout=settings.SMS_HTTP_TIMEOUT,
+                retries=settings.SMS_HTTP_RETRIES,
+                ca_bundle=settings.SMS_CA_BUNDLE,
+            )
+            _client_key = key
+        return _client
@@ -0,0 +1,185 @@
+"""
+Concurrent SMS fan-out for barangay flood alerts.
+
+Messages are sent from a bounded thread pool (``SMS_FANOUT_CONCURRENCY``
+workers) instead of one blocking request at a time. Every send first takes a
+token from the provider's rate limiter, a token bucket shared by all fan-outs in
+the process, so the gateway's limit (``SMS_RATE_LIMIT_PER_SECOND``, burst
+``SMS_RATE_LIMIT_BURST``) holds no matter how many alerts go out at once.
+
+Per-barangay and total sent/failed counters are kept while the jobs run and
+returned as one summary per run. The outbox drain (sms_outbox.py) reports each
+result back to its row through ``on_result``.
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# outbox_id links the job to its sms_outbox row when sent from the outbox
+SmsJob = namedtuple("SmsJob", "barangay phone_number message name outbox_id", defaults=(None,))
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Args:
+        rate: Tokens added per second; 0 or None disables limiting
+        capacity: Largest burst; defaults to one second's worth of tokens
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate or 0)
+        self.capacity = float(capacity or max(self.rate, 1.0))
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        """Take a token if one is available right now, without waiting."""
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+    def acquire(self):
+        """Block until a token is available. Returns the seconds spent waiting."""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                delay = (1.0 - self._tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider):
+    """The process-wide token bucket for an SMS provider (keyed by its API URL)."""
+    with _rate_limiters_lock:
+        if provider not in _rate_limiters:
+            _rate_limiters[provider] = TokenBucket(
+                settings.SMS_RATE_LIMIT_PER_SECOND, settings.SMS_RATE_LIMIT_BURST or None,
+            )
+        return _rate_limiters[provider]
+
+
+class FanoutCounters:
+    """Sent/failed counts per barangay and in total, safe to update from workers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.results = {}
+        self.total_sent = 0
+        self.total_failed = 0
+
+    def expect(self, barangay):
+        with self._lock:
+            entry = self.results.setdefault(barangay, {"users_count": 0, "sent": 0, "failed": 0})
+            entry["users_count"] += 1
+
+    def record(self, barangay, success):
+        with self._lock:
+            if success:
+                self.results[barangay]["sent"] += 1
+                self.total_sent += 1
+            else:
+                self.results[barangay]["failed"] += 1
+                self.total_failed += 1
+
+
+class SmsFanout:
+    """
+    Send many SMS concurrently under a provider rate limit.
+
+    Args:
+        send: Callable ``send(phone_number, message) -> bool``
+        concurrency: Worker threads; defaults to ``SMS_FANOUT_CONCURRENCY``
+        rate_limiter: TokenBucket to draw from; defaults to the limiter of
+            ``SMS_API_URL``
+        on_result: Optional ``on_result(job, success, error)`` called from the
+            worker thread after each send
+    """
+
+    def __init__(self, send, concurrency=None, rate_limiter=None, on_result=None):
+        self.send = send
+        self.concurrency = max(1, concurrency or settings.SMS_FANOUT_CONCURRENCY)
+        self.rate_limiter = rate_limiter or get_rate_limiter(settings.SMS_API_URL)
+        self.on_result = on_result
+
+    def _deliver(self, job, counters):
+        error = None
+        try:
+            self.rate_limiter.acquire()
+            success = bool(self.send(job.phone_number, job.message))
+        except Exception as e:
+            logger.exception("Error sending SMS to %s", job.name)
+            success = False
+            error = str(e)
+        if success:
+            logger.debug("Sent SMS to %s (%s)", job.name, job.phone_number)
+        else:
+            logger.warning("Failed to send SMS to %s (%s)", job.name, job.phone_number)
+        counters.record(job.barangay, success)
+        if self.on_result is not None:
+            self.on_result(job, success, error)
+
+    def run(self, jobs):
+        """
+        Send every job and wait for all of them.
+
+        Args:
+            jobs: Iterable of SmsJob
+
+        Returns:
+            dict: ``total_sent``, ``total_failed``, ``results`` (per barangay:
+            users_count, sent, failed) and ``elapsed_seconds``.
+        """
+        jobs = list(jobs)
+        counters = FanoutCounters()
+        for job in jobs:
+            counters.expect(job.barangay)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(jobs) or 1),
+                                thread_name_prefix="sms-fanout") as executor:
+            for job in jobs:
+                executor.submit(self._deliver, job, counters)
+        elapsed = time.perf_counter() - started
+
+        logger.info(
+            "SMS fan-out: %s sent, %s failed in %.1fs (%s workers)",
+            counters.total_sent, counters.total_failed, elapsed, self.concurrency,
+        )
+        return {
+            "total_sent": counters.total_sent,
+            "total_failed": counters.total_failed,
+            "results": counters.results,
+            "elapsed_seconds": round(elapsed, 3),
+        }
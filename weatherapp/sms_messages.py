@@ -0,0 +1,125 @@
+"""
+SMS text rendering and cost accounting.
+
+Flood alert text is rendered from one precompiled template, once per
+(barangay, warning, forecast) combination, and cached in-process. Every rendered
+message carries its encoding and segment count, so the cost of an alert run is
+known before anything is sent.
+
+Cost model: a message that only uses the GSM 03.38 alphabet (GSM-7) fits 160
+characters in one segment and 153 per segment when concatenated. Any other
+character, e.g. an emoji, switches the whole message to UCS-2: 70 characters,
+67 per concatenated segment. The alert template is therefore GSM-7 only, and
+dynamic text is passed through ``to_gsm7``, which replaces typographic
+characters with their GSM equivalents and drops emoji.
+"""
+
+import math
+import re
+import unicodedata
+from collections import namedtuple
+from functools import lru_cache
+
+GSM7_BASIC = set(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+# Characters sent as an escape sequence: two septets each
+GSM7_EXTENSION = set("^{}\\[~]|€\f")
+
+GSM7_REPLACEMENTS = str.maketrans({
+    "‘": "'", "’": "'", "“": '"', "”": '"',
+    "–": "-", "—": "-", "…": "...", " ": " ", "•": "-",
+})
+
+SINGLE_SEGMENT = {"GSM-7": 160, "UCS-2": 70}
+CONCATENATED_SEGMENT = {"GSM-7": 153, "UCS-2": 67}
+
+RenderedMessage = namedtuple("RenderedMessage", "text encoding units segments")
+
+
+def is_gsm7(text):
+    return all(char in GSM7_BASIC or char in GSM7_EXTENSION for char in text)
+
+
+def to_gsm7(text):
+    """
+    Make text GSM-7 safe where possible: typographic punctuation is replaced and
+    emoji/pictographs are dropped. Other non-GSM letters are kept (they still
+    need UCS-2, which ``describe_message`` will report).
+    """
+    text = unicodedata.normalize("NFC", text).translate(GSM7_REPLACEMENTS)
+    kept = []
+    for char in text:
+        if char in GSM7_BASIC or char in GSM7_EXTENSION:
+            kept.append(char)
+        elif unicodedata.category(char) in ("So", "Sk", "Cs", "Mn", "Cf"):
+            continue  # emoji, variation selectors, joiners
+        else:
+            kept.append(char)
+    return re.sub(r" {2,}", " ", "".join(kept)).replace(" \n", "\n").strip()
+
+
+def describe_message(text):
+    """
+    Encoding and segment count of an SMS text.
+
+    Returns:
+        RenderedMessage
+    """
+    if is_gsm7(text):
+        encoding = "GSM-7"
+        units = sum(2 if char in GSM7_EXTENSION else 1 for char in text)
+    else:
+        encoding = "UCS-2"
+        units = len(text.encode("utf-16-le")) // 2
+    if units <= SINGLE_SEGMENT[encoding]:
+        segments = 1 if units else 0
+    else:
+        segments = math.ceil(units / CONCATENATED_SEGMENT[encoding])
+    return RenderedMessage(text, encoding, units, segments)
+
+
+ALERT_TEMPLATE = (
+    "FLOOD ALERT - {barangay}\n"
+    "Risk Level: {risk_level}\n"
+    "Predicted Rain: {rain_rate:.1f}mm over {duration:.0f}min\n"
+    "Intensity: {intensity}\n"
+    "Land Type: {land_type}\n"
+    "Message: {message}\n"
+    "Stay safe and monitor conditions!"
+).format
+
+
+@lru_cache(maxsize=512)
+def _render_alert(barangay, risk_level, land_type, message, rain_rate, duration, intensity):
+    text = ALERT_TEMPLATE(
+        barangay=to_gsm7(barangay.upper()),
+        risk_level=risk_level,
+        rain_rate=rain_rate,
+        duration=duration,
+        intensity=intensity,
+        land_type=to_gsm7(land_type.replace("_", " ").title()),
+        message=to_gsm7(message),
+    )
+    return describe_message(text)
+
+
+def render_alert(barangay, warning, rain_rate, duration, intensity):
+    """
+    The flood alert SMS for one barangay, rendered once per distinct input.
+
+    Args:
+        barangay (str): Barangay name
+        warning (dict): Flood warning with risk_level, land_type and message
+        rain_rate (float): Predicted rainfall rate
+        duration (float): Predicted duration in minutes
+        intensity (str): Rain intensity label
+
+    Returns:
+        RenderedMessage
+    """
+    return _render_alert(
+        barangay, warning["risk_level"], warning["land_type"], warning["message"],
+        round(float(rain_rate), 1), round(float(duration)), intensity,
+    )
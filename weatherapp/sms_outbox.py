@@ -0,0 +1,237 @@
+"""
+Durable SMS outbox.
+
+Alerts are written to the ``sms_outbox`` table first and sent by Celery
+(``drain_sms_outbox_task``), so a restart of the web or worker process loses no
+message that was accepted. Each drain:
+
+1. Claims up to ``SMS_OUTBOX_BATCH_SIZE`` due messages, highest priority first
+   (High-risk barangays before Moderate and Low). A claim is a conditional
+   UPDATE that stamps the rows with a lease token and a lease expiry, so two
+   workers never claim the same row. A worker that dies mid-send leaves its
+   rows leased; they become due again when the lease expires.
+2. Sends them through the concurrent fan-out engine (sms_fanout.py), so one
+   slow or failing number does not hold up the others.
+3. Marks delivered rows ``sent``. Failed rows go back to ``pending`` with an
+   exponential backoff plus jitter, and become ``failed`` after
+   ``SMS_OUTBOX_MAX_ATTEMPTS`` attempts. Both updates only apply while the row
+   still carries the worker's lease token, so a worker whose lease expired
+   cannot overwrite the state of a row another drain has re-claimed.
+
+Delivery is at-least-once: a message whose send succeeded just before a crash
+can be sent again after its lease expires.
+"""
+
+import logging
+import random
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from weatherapp.sms_fanout import SmsFanout, SmsJob
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+# Higher is sent first
+PRIORITY_BY_RISK = {"High": 30, "Moderate": 20, "Low": 10}
+DEFAULT_PRIORITY = 0
+MAX_ERROR_LENGTH = 255
+
+
+def _get_connection(connection):
+    if connection is None:
+        from django.db import connection
+    return connection
+
+
+def enqueue_sms(messages, connection=None):
+    """
+    Add messages to the outbox.
+
+    Args:
+        messages: Iterable of dicts with ``phone_number`` and ``message`` and
+            optionally ``barangay`` and ``priority``
+
+    Returns:
+        int: Number of messages queued.
+    """
+    now = timezone.now()
+    rows = [
+        (m["phone_number"], m["message"], m.get("barangay"), m.get("priority", DEFAULT_PRIORITY),
+         STATUS_PENDING, now, now)
+        for m in messages if m.get("phone_number")
+    ]
+    if not rows:
+        return 0
+    with _get_connection(connection).cursor() as cursor:
+        cursor.executemany("""
+            INSERT INTO sms_outbox (phone_number, message, barangay, priority, status, next_attempt_at, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, rows)
+    return len(rows)
+
+
+def retry_delay(attempts, rng=random, base=None, maximum=None):
+    """
+    Seconds to wait before attempt ``attempts + 1``.
+
+    Exponential in the number of attempts so far, capped at ``maximum``
+    (``SMS_OUTBOX_RETRY_MAX_SECONDS``), with "equal jitter": half the delay is
+    fixed and half is random, so retries after a gateway outage do not all
+    arrive at once. ``base`` defaults to ``SMS_OUTBOX_RETRY_BASE_SECONDS``.
+    """
+    base = settings.SMS_OUTBOX_RETRY_BASE_SECONDS if base is None else base
+    maximum = settings.SMS_OUTBOX_RETRY_MAX_SECONDS if maximum is None else maximum
+    delay = min(maximum, base * 2 ** max(attempts - 1, 0))
+    return delay / 2 + rng.uniform(0, delay / 2)
+
+
+def claim_due(limit, connection=None, now=None, token=None):
+    """
+    Lease up to ``limit`` due messages to this worker.
+
+    Args:
+        token: Lease token stamped on the claimed rows (a new one by default);
+            pass the same token to ``mark_sent`` and ``mark_failed``
+
+    Returns:
+        list: ``(id, phone_number, message, barangay, attempts)`` tuples, highest
+        priority first. ``attempts`` already counts the attempt being made.
+    """
+    connection = _get_connection(connection)
+    now = now or timezone.now()
+    token = token or uuid.uuid4().hex
+    lease_expiry = now + timedelta(seconds=settings.SMS_OUTBOX_LEASE_SECONDS)
+
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT id FROM sms_outbox
+            WHERE status IN (%s, %s) AND next_attempt_at <= %s
+            ORDER BY priority DESC, id
+            LIMIT %s
+        """, [STATUS_PENDING, STATUS_SENDING, now, limit])
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            return []
+
+        # Re-checking the due condition makes the claim safe against concurrent drains
+        placeholders = ", ".join(["%s"] * len(ids))
+        cursor.execute(f"""
+            UPDATE sms_outbox
+            SET status = %s, lease_token = %s, next_attempt_at = %s, attempts = attempts + 1
+            WHERE id IN ({placeholders}) AND status IN (%s, %s) AND next_attempt_at <= %s
+        """, [STATUS_SENDING, token, lease_expiry, *ids, STATUS_PENDING, STATUS_SENDING, now])
+
+        cursor.execute("""
+            SELECT id, phone_number, message, barangay, attempts FROM sms_outbox
+            WHERE lease_token = %s AND status = %s
+            ORDER BY priority DESC, id
+        """, [token, STATUS_SENDING])
+        return list(cursor.fetchall())
+
+
+def mark_sent(ids, token, connection=None):
+    """
+    Mark messages of the lease ``token`` as sent.
+
+    Returns:
+        int: Rows updated; rows whose lease was lost to another drain are skipped.
+    """
+    if not ids:
+        return 0
+    placeholders = ", ".join(["%s"] * len(ids))
+    with _get_connection(connection).cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE sms_outbox SET status = %s, lease_token = NULL, last_error = NULL, sent_at = %s
+            WHERE id IN ({placeholders}) AND lease_token = %s
+        """, [STATUS_SENT, timezone.now(), *ids, token])
+        updated = cursor.rowcount
+    if updated < len(ids):
+        logger.warning("%s sent SMS had lost their lease to another drain", len(ids) - updated)
+    return updated
+
+
+def mark_failed(failures, token, connection=None, now=None):
+    """
+    Reschedule failed messages, or give up on them after the last attempt.
+
+    Args:
+        failures: Iterable of ``(id, attempts, error)``
+        token: Lease token the messages were claimed with; rows whose lease
+            was lost to another drain are left alone
+    """
+    now = now or timezone.now()
+    with _get_connection(connection).cursor() as cursor:
+        for outbox_id, attempts, error in failures:
+            error = (error or "")[:MAX_ERROR_LENGTH]
+            if attempts >= settings.SMS_OUTBOX_MAX_ATTEMPTS:
+                logger.error("Giving up on SMS %s after %s attempts: %s", outbox_id, attempts, error)
+                cursor.execute("""
+                    UPDATE sms_outbox SET status = %s, lease_token = NULL, last_error = %s
+                    WHERE id = %s AND lease_token = %s
+                """, [STATUS_FAILED, error, outbox_id, token])
+            else:
+                cursor.execute("""
+                    UPDATE sms_outbox SET status = %s, lease_token = NULL, last_error = %s, next_attempt_at = %s
+                    WHERE id = %s AND lease_token = %s
+                """, [STATUS_PENDING, error, now + timedelta(seconds=retry_delay(attempts)), outbox_id, token])
+            if not cursor.rowcount:
+                logger.warning("SMS %s lost its lease to another drain; not rescheduling it", outbox_id)
+
+
+def default_sender():
+    """``send(phone_number, message) -> bool`` through the shared gateway client."""
+    from weatherapp.sms_client import get_sms_client
+
+    return get_sms_client().send
+
+
+def drain_outbox(send=None, connection=None, max_batches=None):
+    """
+    Send due messages until none are left (or ``max_batches`` batches ran).
+
+    Args:
+        send: ``send(phone_number, message) -> bool``; defaults to the gateway
+
+    Returns:
+        dict: ``sent``, ``retried`` and ``failed`` counts for this drain.
+    """
+    send = send or default_sender()
+    counts = {"sent": 0, "retried": 0, "failed": 0}
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        token = uuid.uuid4().hex
+        rows = claim_due(settings.SMS_OUTBOX_BATCH_SIZE, connection, token=token)
+        if not rows:
+            break
+        batches += 1
+
+        attempts = {row[0]: row[4] for row in rows}
+        delivered, failures = [], []
+
+        def on_result(job, success, error):
+            if success:
+                delivered.append(job.outbox_id)
+            else:
+                failures.append((job.outbox_id, attempts[job.outbox_id], error or "Gateway rejected message"))
+
+        jobs = [SmsJob(barangay or "", phone, message, f"outbox #{outbox_id}", outbox_id)
+                for outbox_id, phone, message, barangay, _ in rows]
+        SmsFanout(send, on_result=on_result).run(jobs)
+
+        mark_sent(delivered, token, connection)
+        mark_failed(failures, token, connection)
+        counts["sent"] += len(delivered)
+        for outbox_id, attempt, _ in failures:
+            counts["failed" if attempt >= settings.SMS_OUTBOX_MAX_ATTEMPTS else "retried"] += 1
+
+    if batches:
+        logger.info("SMS outbox drained: %(sent)s sent, %(retried)s to retry, %(failed)s failed", counts)
+    return counts
@@ -0,0 +1,201 @@
+"""
+Local stand-in for the SMS gateway, for load tests and benchmarks.
+
+Accepts the same form POST as the real gateway (``message``, ``mobile_number``,
+``device``, ``device_sim``) on any path and answers like it would, but delivers
+nothing. Behaviour is configurable:
+
+- latency: every request takes ``latency`` seconds plus up to ``jitter`` more
+- error rate: this fraction of accepted requests fails with HTTP 500
+- reject rate: this fraction is answered HTTP 200 with ``"success": false``, the
+  way the gateway reports a bad number or missing credit
+- rate limit: requests above ``rate_limit`` per second (burst ``burst``) are
+  rejected with HTTP 429, like a provider throttling its API
+
+``GET /stats`` returns the request counters and the number of TCP connections
+accepted (connections are kept alive, so a pooled client opens few).
+
+Point ``SMS_API_URL`` at it to exercise flood alerts, the outbox drain or
+``send_otp`` without sending real messages::
+
+    python -m weatherapp.sms_stub_gateway [--port 9090] [--latency-ms 80] \\
+        [--jitter-ms 40] [--error-rate 0.02] [--rate-limit 50]
+    SMS_API_URL=http://127.0.0.1:9090/send ...
+
+sms_benchmark.py starts one in-process. Like the prediction server it binds to
+the loopback interface and has no authentication.
+"""
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from weatherapp.sms_fanout import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+MAX_REQUEST_BYTES = 64 * 1024
+
+
+class GatewayStats:
+    """Request counters, safe to update from handler threads."""
+
+    FIELDS = ("connections", "requests", "accepted", "rejected", "errors", "throttled", "invalid")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+
+    def add(self, *fields):
+        with self._lock:
+            for field in fields:
+                self._counts[field] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+
+class StubGatewayHandler(BaseHTTPRequestHandler):
+    server_version = "WeatherAlertStubGateway/1.0"
+    # Keep connections alive like a real gateway, so client pooling shows up in the stats
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.stats.add("connections")
+
+    def _send_json(self, status, body, headers=()):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/stats":
+            self._send_json(404, {"error": "Not found"})
+            return
+        self._send_json(200, self.server.stats.snapshot())
+
+    def do_POST(self):
+        gateway = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        form = parse_qs(self.rfile.read(min(length, MAX_REQUEST_BYTES)).decode(errors="replace"))
+
+        if not gateway.limiter.try_acquire():
+            gateway.stats.add("requests", "throttled")
+            self._send_json(429, {"error": "Too many requests"}, [("Retry-After", "1")])
+            return
+        if not form.get("mobile_number") or not form.get("message"):
+            gateway.stats.add("requests", "invalid")
+            self._send_json(400, {"error": "mobile_number and message are required"})
+            return
+
+        time.sleep(gateway.latency + gateway.rng.uniform(0, gateway.jitter))
+        if gateway.rng.random() < gateway.error_rate:
+            gateway.stats.add("requests", "errors")
+            self._send_json(500, {"error": "Simulated gateway failure"})
+            return
+        if gateway.rng.random() < gateway.reject_rate:
+            gateway.stats.add("requests", "rejected")
+            self._send_json(200, {"success": False, "message": "Simulated rejection"})
+            return
+        gateway.stats.add("requests", "accepted")
+        self._send_json(200, {"success": True, "status": "queued", "mobile_number": form["mobile_number"][0]})
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class StubGateway(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, latency=0.0, jitter=0.0, error_rate=0.0, reject_rate=0.0,
+                 rate_limit=0, burst=None, seed=None):
+        super().__init__(address, StubGatewayHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.reject_rate = reject_rate
+        self.limiter = TokenBucket(rate_limit, burst)
+        # random.Random is safe to share between handler threads
+        self.rng = random.Random(seed)
+        self.stats = GatewayStats()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/send"
+
+
+def start_gateway_thread(host="127.0.0.1", port=0, **options):
+    """
+    Serve a stub gateway from a daemon thread.
+
+    Args:
+        host, port: Bind address; port 0 picks a free port
+        **options: ``latency``/``jitter`` (seconds), ``error_rate``, ``reject_rate``,
+            ``rate_limit`` (requests per second, 0 = unlimited), ``burst``, ``seed``
+
+    Returns:
+        StubGateway: call ``shutdown()`` and ``server_close()`` when done.
+    """
+    gateway = StubGateway((host, port), **options)
+    threading.Thread(target=gateway.serve_forever, name="sms-stub-gateway", daemon=True).start()
+    logger.info("Stub SMS gateway listening on %s", gateway.url)
+    return gateway
+
+
+def add_gateway_arguments(parser):
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Base latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=25.0, help="Extra random latency, uniform")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with 500")
+    parser.add_argument("--reject-rate", type=float, default=0.0, help="Fraction answered with success false")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requests per second before 429 (0 = none)")
+    parser.add_argument("--burst", type=int, default=None, help="Rate limit burst size")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def gateway_options(args):
+    return {
+        "latency": args.latency_ms / 1000.0,
+        "jitter": args.jitter_ms / 1000.0,
+        "error_rate": args.error_rate,
+        "reject_rate": args.reject_rate,
+        "rate_limit": args.rate_limit,
+        "burst": args.burst,
+        "seed": args.seed,
+    }
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Local stub SMS gateway")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9090)
+    add_gateway_arguments(parser)
+    args = parser.parse_args(argv)
+
+    gateway = StubGateway((args.host, args.port), **gateway_options(args))
+    logger.info("Stub SMS gateway listening on %s", gateway.url)
+    try:
+        gateway.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        gateway.server_close()
+        logger.info("Gateway stats: %s", gateway.stats.snapshot())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Suppression ledger for repeated flood alerts.
+
+Every prediction cycle can flag the same barangay at the same risk level again.
+Each alerted user therefore gets a cache entry ``sms:suppress:<BARANGAY>:<user_id>``
+that holds the risk level they were last alerted at and expires after
+``SMS_SUPPRESSION_WINDOW_SECONDS``. While the entry exists, the user is only
+texted again if the barangay's risk level rises above it (escalation).
+
+All recipients of a cycle are checked with one ``get_many`` and recorded with one
+``set_many``. If the cache is unavailable nothing is suppressed: a duplicate
+alert is better than a missed one.
+"""
+
+import logging
+
+from django.conf import settings
+
+from weatherapp.ai.flood_risk import RISK_PRIORITY
+from weatherapp.recipients import normalize_barangay
+from weatherapp.utils.cache import safe_cache_get_many, safe_cache_set_many
+
+logger = logging.getLogger(__name__)
+
+SUPPRESSION_CACHE_PREFIX = "sms:suppress"
+
+
+def suppression_key(barangay, user_id):
+    return f"{SUPPRESSION_CACHE_PREFIX}:{normalize_barangay(barangay)}:{user_id}"
+
+
+def _ledger_entries(affected_users, risk_levels):
+    for barangay, users in affected_users.items():
+        rank = RISK_PRIORITY.get(risk_levels.get(barangay), 0)
+        for user in users:
+            yield suppression_key(barangay, user['user_id']), barangay, user, rank
+
+
+def partition_recipients(affected_users, risk_levels):
+    """
+    Split recipients into those to alert now and those already alerted.
+
+    Args:
+        affected_users: ``{barangay: [user dicts with user_id]}``
+        risk_levels: ``{barangay: risk level name}`` of the current warnings
+
+    Returns:
+        tuple: ``({barangay: [users to alert]}, {barangay: suppressed count})``
+    """
+    if settings.SMS_SUPPRESSION_WINDOW_SECONDS <= 0:
+        return affected_users, {}
+
+    entries = list(_ledger_entries(affected_users, risk_levels))
+    ledger = safe_cache_get_many(key for key, _, _, _ in entries)
+
+    to_alert = {}
+    suppressed = {}
+    for key, barangay, user, rank in entries:
+        if ledger.get(key, 0) >= rank:
+            suppressed[barangay] = suppressed.get(barangay, 0) + 1
+        else:
+            to_alert.setdefault(barangay, []).append(user)
+
+    if suppressed:
+        logger.info("Suppressed repeat alerts: %s", suppressed)
+    return to_alert, suppressed
+
+
+def record_alerted(alerted_users, risk_levels):
+    """Start (or extend) the suppression window of users that were just alerted."""
+    window = settings.SMS_SUPPRESSION_WINDOW_SECONDS
+    if window <= 0:
+        return
+    safe_cache_set_many(
+        {key: rank for key, _, _, rank in _ledger_entries(alerted_users, risk_levels)},
+        window,
+    )
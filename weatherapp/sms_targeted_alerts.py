@@ -4,126 +4,117 @@ This module handles sending SMS alerts only to users in affected barangays.
 """
 
 import logging
-import requests
-from django.conf import settings
 from django.db import connection
-from weatherapp.ai.predictor import get_users_by_affected_barangays
+from weatherapp.recipients import get_users_by_affected_barangays, to_e164
+from weatherapp.sms_client import get_sms_client
+from weatherapp.sms_messages import render_alert
+from weatherapp.sms_outbox import DEFAULT_PRIORITY, PRIORITY_BY_RISK, enqueue_sms
 
 logger = logging.getLogger(__name__)
 
 
-def send_targeted_sms_alerts(flood_warnings, predicted_rain_rate, predicted_duration, intensity_label):
+def queue_sms_alerts(affected_users, flood_warnings, predicted_rain_rate, predicted_duration,
+                     intensity_label, suppressed=None):
     """
-    Send targeted SMS alerts to users in barangays with flood warnings.
+    Queue alerts for an already resolved (and suppression-filtered) recipient set.
+    
+    Used by the SMS channel of the alert dispatcher (weatherapp/alert_dispatcher.py),
+    which resolves the recipients and records the users alerted.
     
     Args:
+        affected_users (dict): ``{barangay: [user dicts with phone_e164]}``
         flood_warnings (list): List of flood warning dictionaries
         predicted_rain_rate (float): Predicted rainfall rate
         predicted_duration (float): Predicted duration
         intensity_label (str): Rain intensity label
+        suppressed (dict): Optional ``{barangay: count}`` of suppressed users
         
     Returns:
-        dict: Summary of SMS sending results
+        dict: Summary of queued SMS per barangay; ``alerted`` lists the ids of
+        the users an SMS was queued for
     """
-    if not flood_warnings:
-        return {"success": True, "message": "No flood warnings to send", "total_sent": 0}
+    suppressed = suppressed or {}
+    risk_levels = {w['barangay']: w['risk_level'] for w in flood_warnings}
+    messages = []
+    alerted = []
+    results = {
+        barangay: {"users_count": 0, "suppressed": count, "risk_level": risk_levels.get(barangay)}
+        for barangay, count in suppressed.items()
+    }
     
-    try:
-        affected_users = get_users_by_affected_barangays(flood_warnings)
-        
-        if not affected_users:
-            return {"success": True, "message": "No users found in affected barangays", "total_sent": 0}
-        
-        # Setup SMS parameters
-        headers = {
-            "apikey": settings.SMS_API_KEY,
-            "Content-Type": "application/x-www-form-urlencoded"
-        }
-        
-        session = requests.Session()
-        session.verify = False  # Disable SSL verification if needed
-        
-        total_sent = 0
-        total_failed = 0
-        results = {}
+    for barangay, users in affected_users.items():
+        # Users registered with an email but no valid mobile number get email alerts only
+        users = [user for user in users if user.get('phone_e164')]
         
-        logger.info("Sending targeted SMS alerts")
+        # Get the warning for this barangay
+        barangay_warning = next((w for w in flood_warnings if w['barangay'] == barangay), None)
         
-        for barangay, users in affected_users.items():
-            # Get the warning for this barangay
-            barangay_warning = next((w for w in flood_warnings if w['barangay'] == barangay), None)
-            
-            if not barangay_warning or not users:
-                continue
-                
-            logger.info(
-                "Sending alerts to %s users in %s (%s risk)",
-                len(users),
-                barangay,
-                barangay_warning['risk_level'],
-            )
-            
-            # Create targeted message for this barangay
-            sms_message = create_barangay_sms_message(
-                barangay, barangay_warning, predicted_rain_rate, predicted_duration, intensity_label
-            )
-            
-            barangay_sent = 0
-            barangay_failed = 0
+        if not barangay_warning or not users:
+            continue
             
-            # Send SMS to each user in this barangay
-            for user in users:
-                try:
-                    # Format phone number
-                    formatted_phone = format_phone_number(user['phone_num'])
-                    
-                    # Send SMS
-                    success = send_single_sms(formatted_phone, sms_message, headers, session)
-                    
-                    if success:
-                        barangay_sent += 1
-                        total_sent += 1
-                        logger.debug("Sent SMS to %s (%s)", user['name'], formatted_phone)
-                    else:
-                        barangay_failed += 1
-                        total_failed += 1
-                        logger.warning("Failed to send SMS to %s (%s)", user['name'], formatted_phone)
-                        
-                except Exception as e:
-                    barangay_failed += 1
-                    total_failed += 1
-                    logger.exception("Error sending SMS to %s", user['name'])
-            
-            results[barangay] = {
-                "users_count": len(users),
-                "sent": barangay_sent,
-                "failed": barangay_failed
-            }
-        
-        logger.info("SMS alert summary: %s sent, %s failed", total_sent, total_failed)
+        logger.info(
+            "Queueing alerts for %s users in %s (%s risk)",
+            len(users),
+            barangay,
+            barangay_warning['risk_level'],
+        )
         
-        return {
-            "success": True,
-            "total_sent": total_sent,
-            "total_failed": total_failed,
-            "results": results,
-            "message": f"Sent {total_sent} SMS alerts to affected barangays"
-        }
+        # Rendered once per barangay and forecast, numbers already in E.164
+        sms_message = render_alert(
+            barangay, barangay_warning, predicted_rain_rate, predicted_duration, intensity_label
+        )
+        priority = PRIORITY_BY_RISK.get(barangay_warning['risk_level'], DEFAULT_PRIORITY)
+        
+        for user in users:
+            alerted.append(user['user_id'])
+            messages.append({
+                "phone_number": user['phone_e164'],
+                "message": sms_message.text,
+                "barangay": barangay,
+                "priority": priority,
+            })
         
-    except Exception as e:
-        logger.exception("Error in targeted SMS alerts")
-        return {
-            "success": False,
-            "error": str(e),
-            "total_sent": 0,
-            "total_failed": 0
+        results[barangay] = {
+            "users_count": len(users),
+            "suppressed": suppressed.get(barangay, 0),
+            "risk_level": barangay_warning['risk_level'],
+            "encoding": sms_message.encoding,
+            "segments": sms_message.segments * len(users),
         }
+    
+    total_queued = enqueue_sms(messages)
+    total_segments = sum(r.get("segments", 0) for r in results.values())
+    logger.info(
+        "SMS alerts queued: %s messages (%s segments) for %s barangays",
+        total_queued, total_segments, len(results),
+    )
+    
+    if total_queued:
+        try:
+            from weatherapp.tasks import drain_sms_outbox_task
+            drain_sms_outbox_task.delay()
+        except Exception:
+            # The periodic drain will pick the messages up
+            logger.exception("Could not start the SMS outbox drain")
+    
+    return {
+        "success": True,
+        "total_queued": total_queued,
+        "total_suppressed": sum(suppressed.values()),
+        "total_segments": total_segments,
+        "results": results,
+        "alerted": alerted,
+        "message": f"Queued {total_queued} SMS alerts for affected barangays"
+    }
 
 
 def create_barangay_sms_message(barangay, warning, rain_rate, duration, intensity):
     """
     Create a targeted SMS message for a specific barangay.
     
+    Rendered from the GSM-7 alert template in weatherapp/sms_messages.py and
+    cached per (barangay, warning, forecast).
+    
     Args:
         barangay (str): Barangay name
         warning (dict): Warning information
@@ -134,15 +125,7 @@ def create_barangay_sms_message(barangay, warning, rain_rate, duration, intensit
     Returns:
         str: Formatted SMS message
     """
-    message = f"🚨 FLOOD ALERT - {barangay.upper()} 🚨\n"
-    message += f"Risk Level: {warning['risk_level']}\n"
-    message += f"Predicted Rain: {rain_rate:.1f}mm over {duration:.0f}min\n"
-    message += f"Intensity: {intensity}\n"
-    message += f"Land Type: {warning['land_type'].replace('_', ' ').title()}\n"
-    message += f"Message: {warning['message']}\n"
-    message += f"Stay safe and monitor conditions!"
-    
-    return message
+    return render_alert(barangay, warning, rain_rate, duration, intensity).text
 
 
 def format_phone_number(phone_num):
@@ -153,62 +136,24 @@ def format_phone_number(phone_num):
         phone_num (str): Raw phone number
         
     Returns:
-        str: Formatted phone number
+        str: E.164 phone number, or None if it cannot be normalized
     """
-    if not phone_num:
-        return None
-        
-    # Remove any spaces or special characters
-    phone_num = phone_num.strip().replace(" ", "").replace("-", "")
-    
-    # Format for Philippines
-    if phone_num.startswith("09"):
-        return "+63" + phone_num[1:]
-    elif phone_num.startswith("9") and len(phone_num) == 10:
-        return "+63" + phone_num
-    elif not phone_num.startswith("+63"):
-        return "+63" + phone_num
-    else:
-        return phone_num
+    return to_e164(phone_num)
 
 
-def send_single_sms(phone_number, message, headers, session):
+def send_single_sms(phone_number, message):
     """
-    Send a single SMS message.
+    Send a single SMS message through the shared gateway client
+    (weatherapp/sms_client.py).
     
     Args:
         phone_number (str): Formatted phone number
         message (str): SMS message
-        headers (dict): HTTP headers
-        session (requests.Session): HTTP session
         
     Returns:
         bool: True if successful, False otherwise
     """
-    try:
-        parameters = {
-            'message': message,
-            'mobile_number': phone_number,
-            'device': settings.SMS_DEVICE_ID,
-            'device_sim': '1'
-        }
-        
-        response = session.post(
-            settings.SMS_API_URL,
-            data=parameters,
-            headers=headers,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            return True
-        else:
-            logger.warning("SMS API error: %s - %s", response.status_code, response.text)
-            return False
-            
-    except Exception as e:
-        logger.exception("SMS sending error")
-        return False
+    return get_sms_client().send(phone_number, message)
 
 
 def get_sms_alert_summary(flood_warnings):
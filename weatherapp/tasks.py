@@ -2,95 +2,77 @@ import os
 import logging
 from celery import Celery
 from django.conf import settings
-from django.db import connection
-# ❗ Updated import: Removed fetch_weather_data_from_api as it's no longer used.
-from .ai.predictor import predict_rain 
-import numpy as np
-import json
-from datetime import datetime
-
-# Define the expected sequence length for the time-series model
-SEQUENCE_LENGTH = 6
-FEATURE_COUNT = 5 # (temp, humid, wind, pressure, hour_of_day)
 
 # Create a Celery instance
 app = Celery('weather_app', broker=settings.CELERY_BROKER_URL)
 logger = logging.getLogger(__name__)
 
 @app.task(bind=True)
-def predict_rain_task(self):
+def predict_rain_task(self, triggered=False):
     """
-    Celery task to perform asynchronous rain prediction using only database data.
-    This task fetches the latest 6 data points to form the time series input.
+    Celery entry point of the shared rain prediction pipeline.
+
+    Runs the same fetch -> predict -> persist -> assess -> publish cycle as the
+    standalone predictor (see weatherapp/ai/pipeline.py). The pipeline is imported
+    lazily so processes that only enqueue this task never import TensorFlow.
+
+    Args:
+        triggered: True when queued by a fresh-ingest trigger (weatherapp/ai/triggers.py).
+            Triggered runs are already debounced and spaced, so they skip the
+            once-per-interval run gate.
     """
-    logger.info("AI prediction task started (database only mode)")
+    logger.info("AI prediction task started (triggered=%s)", triggered)
 
     try:
-        # 1. Fetch the last 6 data points from the database
-        with connection.cursor() as cursor:
-            # We must fetch the 4 features + date_time to calculate the hour_of_day feature
-            query = f"""
-                SELECT temperature, humidity, wind_speed, barometric_pressure, date_time
-                FROM weather_reports
-                ORDER BY date_time DESC
-                LIMIT {SEQUENCE_LENGTH}
-            """
-            cursor.execute(query)
-            # Data points are fetched newest-to-oldest
-            data_points = cursor.fetchall()
+        from .ai.pipeline import get_pipeline
+        get_pipeline().run_once(force=triggered)
+    except Exception as e:
+        logger.exception("Prediction task failed")
 
-        if len(data_points) < SEQUENCE_LENGTH:
-            logger.warning(
-                "Not enough data points (found %s, need %s) to run the time-series model. Skipping prediction.",
-                len(data_points),
-                SEQUENCE_LENGTH,
-            )
-            return
 
-        # 2. Process data: Reverse order (oldest to newest) and build the feature array
-        data_points.reverse() # Reverse to get oldest-to-newest chronological order
 
-        input_sequence = []
-        for temp, humid, wind, pressure, date_time_obj in data_points:
-            # Calculate the required 'hour_of_day' feature (0-23)
-            hour_of_day = float(date_time_obj.hour)
-            
-            # Assemble the 5 features in the order expected by the predictor/model
-            # [temperature, humidity, wind_speed, barometric_pressure, hour_of_day]
-            input_sequence.append([
-                float(temp),
-                float(humid),
-                float(wind),
-                float(pressure),
-                hour_of_day
-            ])
+@app.task(bind=True)
+def drain_sms_outbox_task(self):
+    """
+    Send due messages from the durable SMS outbox (weatherapp/sms_outbox.py).
 
-        # Convert the list of lists (6, 5) into the required NumPy array
-        input_features = np.array(input_sequence, dtype=np.float32)
+    Queued right after alerts are enqueued and run periodically by Celery beat,
+    which also picks up retries whose backoff has elapsed. Concurrent drains are
+    safe: each message is leased to one worker.
+    """
+    try:
+        from .sms_outbox import drain_outbox
+        return drain_outbox()
+    except Exception:
+        logger.exception("SMS outbox drain failed")
 
-        # 3. Call the prediction model
-        # The predictor.py function now handles the scaling and reshaping internally
-        rain_rate, duration, intensity = predict_rain(input_features)
-        
-        if rain_rate is None:
-            logger.error("Prediction failed inside the model function")
-            return
 
-        # 4. Log prediction results to the database
-        with connection.cursor() as cursor:
-            # Note: Using NOW() to ensure the insertion time is recorded by the DB server
-            cursor.execute("""
-                INSERT INTO ai_predictions (predicted_rain, duration, intensity, created_at)
-                VALUES (%s, %s, %s, NOW())
-            """, [rain_rate, duration, intensity])
+@app.task(bind=True)
+def drain_email_outbox_task(self):
+    """
+    Send due messages from the durable email outbox (weatherapp/email_outbox.py)
+    over one SMTP connection.
 
-        logger.info(
-            "Prediction results rainfall=%.2f mm duration=%.2f min intensity=%s",
-            rain_rate,
-            duration,
-            intensity,
-        )
-        logger.info("Prediction results successfully inserted into the database")
+    Queued right after an email is enqueued and run periodically by Celery beat
+    for retries. Concurrent drains are safe: each message is leased to one worker.
+    """
+    try:
+        from .email_outbox import drain_outbox
+        return drain_outbox()
+    except Exception:
+        logger.exception("Email outbox drain failed")
 
-    except Exception as e:
-        logger.exception("Prediction task failed")
+
+@app.task(bind=True)
+def send_otp_sms_task(self, delivery_id, phone_number, message):
+    """
+    Send an OTP SMS off the request thread (weatherapp/otp_delivery.py).
+
+    Not retried: the user can request a new OTP, and a late duplicate would
+    only confuse them.
+    """
+    try:
+        from .otp_delivery import deliver_otp_sms
+        return deliver_otp_sms(delivery_id, phone_number, message)
+    except Exception:
+        logger.exception("OTP SMS task failed")
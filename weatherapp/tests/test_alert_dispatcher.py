@@ -0,0 +1,179 @@
+"""
+Unit tests for the multi-channel alert dispatcher (channels replaced by stubs).
+"""
+import threading
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from weatherapp import alert_dispatcher
+from weatherapp.alert_dispatcher import (
+    Alert,
+    AlertChannel,
+    AlertDispatcher,
+    EmailAlertChannel,
+    SmsAlertChannel,
+    WebPushAlertChannel,
+    get_dispatcher,
+)
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+USERS = {
+    "Atipuluan": [
+        {"user_id": 1, "name": "Ana", "phone_e164": "+639170000001", "email": "ana@example.com"},
+        {"user_id": 2, "name": "Ben", "phone_e164": None, "email": "ben@example.com"},
+        {"user_id": 3, "name": "Cris", "phone_e164": "+639170000003", "email": None},
+    ],
+}
+WARNINGS = [{"barangay": "Atipuluan", "risk_level": "High", "land_type": "lowland", "message": "Evacuate"}]
+RESULT = {"rate_mm_h": 20.0, "duration_min": 60, "intensity": "Heavy"}
+
+
+class RecordingChannel(AlertChannel):
+    def __init__(self, name, gate=None):
+        self.name = name
+        self.gate = gate
+        self.alerts = []
+        self.done = threading.Event()
+
+    def deliver(self, alert):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.alerts.append(alert)
+        self.done.set()
+        alerted = [user["user_id"] for users in alert.recipients.values() for user in users]
+        return {"total_sent": len(alerted), "alerted": alerted}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, SMS_SUPPRESSION_WINDOW_SECONDS=3600)
+class AlertDispatcherTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(alert_dispatcher, "get_users_by_affected_barangays", return_value=USERS)
+        self.resolve = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_slow_channel_does_not_block_others(self):
+        gate = threading.Event()
+        slow, fast = RecordingChannel("slow", gate), RecordingChannel("fast")
+        futures = AlertDispatcher([slow, fast]).dispatch(RESULT, WARNINGS)
+
+        self.assertEqual(futures["fast"].result(timeout=5)["total_sent"], 3)
+        self.assertFalse(futures["slow"].done())
+        gate.set()
+        self.assertEqual(futures["slow"].result(timeout=5)["total_sent"], 3)
+        self.assertEqual(self.resolve.call_count, 1)
+        self.assertIs(slow.alerts[0], fast.alerts[0])
+
+    def test_recipients_are_suppressed_across_cycles(self):
+        channel = RecordingChannel("test")
+        dispatcher = AlertDispatcher([channel])
+        dispatcher.dispatch(RESULT, WARNINGS)["test"].result(timeout=5)
+        self.assertEqual(dispatcher.dispatch(RESULT, WARNINGS), {})
+
+    def test_only_users_a_channel_reached_are_suppressed(self):
+        queued = []
+        dispatcher = AlertDispatcher([SmsAlertChannel()])
+        with mock.patch("weatherapp.sms_targeted_alerts.enqueue_sms",
+                        side_effect=lambda messages: queued.extend(messages) or len(messages)), \
+                mock.patch("weatherapp.tasks.drain_sms_outbox_task.delay"):
+            dispatcher.dispatch(RESULT, WARNINGS)["sms"].result(timeout=5)
+            # Ben has no mobile number, so the SMS-only cycle did not reach him
+            second = dispatcher.dispatch(RESULT, WARNINGS)["sms"].result(timeout=5)
+        self.assertEqual(second["results"]["Atipuluan"]["suppressed"], 2)
+        self.assertEqual(second["total_queued"], 0)
+        self.assertEqual(len(queued), 2)
+
+    @override_settings(ALERT_MIN_RISK_LEVEL="Moderate")
+    def test_only_escalated_barangays_are_alerted_again(self):
+        dispatcher = AlertDispatcher([RecordingChannel("test")])
+        moderate = [dict(WARNINGS[0], risk_level="Moderate")]
+        dispatcher.dispatch(RESULT, moderate)["test"].result(timeout=5)
+        self.assertEqual(dispatcher.dispatch(RESULT, moderate), {})
+        self.assertEqual(dispatcher.dispatch(RESULT, WARNINGS)["test"].result(timeout=5)["total_sent"], 3)
+
+    def test_warnings_below_minimum_risk_are_not_sent(self):
+        low = [dict(WARNINGS[0], risk_level="Low")]
+        dispatcher = AlertDispatcher([RecordingChannel("test")])
+        with override_settings(ALERT_MIN_RISK_LEVEL="Moderate"):
+            self.assertEqual(dispatcher.dispatch(RESULT, low), {})
+        self.resolve.assert_not_called()
+        with override_settings(ALERT_MIN_RISK_LEVEL="Low"):
+            self.assertIn("test", dispatcher.dispatch(RESULT, low))
+
+    def test_failing_channel_reports_error_and_skips_suppression(self):
+        class Broken(AlertChannel):
+            name = "broken"
+
+            def deliver(self, alert):
+                raise RuntimeError("down")
+
+        dispatcher = AlertDispatcher([RecordingChannel("test"), Broken()])
+        futures = dispatcher.dispatch(RESULT, WARNINGS)
+        futures["test"].result(timeout=5)
+        self.assertEqual(futures["broken"].result(timeout=5), {"success": False, "error": "down"})
+        # Nobody was recorded as alerted, so the next cycle tries again
+        self.assertIn("test", dispatcher.dispatch(RESULT, WARNINGS))
+
+    @override_settings(ALERT_CHANNELS=["sms", "email", "push", "fax"], WEBPUSH_VAPID_PRIVATE_KEY="")
+    def test_unconfigured_channels_are_skipped(self):
+        with mock.patch.object(alert_dispatcher, "_dispatcher", None):
+            self.assertEqual([channel.name for channel in get_dispatcher().channels], ["sms", "email"])
+
+
+class ChannelTests(SimpleTestCase):
+
+    def alert(self):
+        return Alert(RESULT, {w["barangay"]: w for w in WARNINGS}, USERS, {})
+
+    def test_email_is_queued_in_the_outbox(self):
+        queued = []
+        with mock.patch("weatherapp.email_outbox.enqueue_emails",
+                        side_effect=lambda messages: queued.extend(messages) or len(messages)), \
+                mock.patch("weatherapp.tasks.drain_email_outbox_task.delay") as drain:
+            summary = EmailAlertChannel().deliver(self.alert())
+
+        self.assertEqual(summary, {"success": True, "total_queued": 2, "alerted": [1, 2]})
+        self.assertEqual([m["to_email"] for m in queued], ["ana@example.com", "ben@example.com"])
+        self.assertIn("FLOOD ALERT - ATIPULUAN", queued[0]["body"])
+        drain.assert_called_once_with()
+
+    @override_settings(WEBPUSH_VAPID_PRIVATE_KEY="key", WEBPUSH_CONCURRENCY=2)
+    def test_push_reports_failure_unless_only_expired_subscriptions_failed(self):
+        class WebPushException(Exception):
+            def __init__(self, status_code):
+                super().__init__(f"push service answered {status_code}")
+                self.response = SimpleNamespace(status_code=status_code)
+
+        def deliver(answers):
+            def webpush(subscription_info, **kwargs):
+                status_code = answers[subscription_info["endpoint"]]
+                if status_code != 201:
+                    raise WebPushException(status_code)
+
+            pywebpush = SimpleNamespace(webpush=webpush, WebPushException=WebPushException)
+            rows = [(1, "https://push/ana", "p", "a"), (2, "https://push/ben", "p", "a")]
+            channel = WebPushAlertChannel()
+            with mock.patch.dict("sys.modules", {"pywebpush": pywebpush}), \
+                    mock.patch.object(channel, "subscriptions", return_value=rows), \
+                    mock.patch.object(channel, "remove"):
+                return channel.deliver(self.alert())
+
+        summary = deliver({"https://push/ana": 201, "https://push/ben": 410})
+        self.assertEqual((summary["success"], summary["total_failed"], summary["expired"]), (True, 1, 1))
+        self.assertEqual(summary["alerted"], [1])
+        summary = deliver({"https://push/ana": 201, "https://push/ben": 500})
+        self.assertEqual((summary["success"], summary["total_failed"], summary["expired"]), (False, 1, 0))
+
+    def test_sms_skips_users_without_a_mobile_number(self):
+        queued = []
+        with mock.patch("weatherapp.sms_targeted_alerts.enqueue_sms",
+                        side_effect=lambda messages: queued.extend(messages) or len(messages)), \
+                mock.patch("weatherapp.tasks.drain_sms_outbox_task.delay"):
+            summary = SmsAlertChannel().deliver(self.alert())
+        self.assertEqual([m["phone_number"] for m in queued], ["+639170000001", "+639170000003"])
+        self.assertEqual(summary["results"]["Atipuluan"]["users_count"], 2)
@@ -0,0 +1,99 @@
+"""
+Unit tests for the vectorized rain model backtest.
+"""
+import numpy as np
+from django.test import SimpleTestCase
+
+from weatherapp.ai.backtest import (
+    ReportHistory,
+    backtest_targets,
+    build_windows,
+    future_sums,
+    run_backtest,
+)
+
+
+def make_history(sensor_ids, rain_rate=None, times=None):
+    count = len(sensor_ids)
+    # One report every 10 minutes per sensor
+    times = np.arange(count) * 600.0 if times is None else np.asarray(times, dtype=np.float64)
+    features = np.column_stack([
+        np.arange(count, dtype=np.float32),      # temperature, used to identify rows
+        np.full(count, 80.0), np.full(count, 2.0), np.full(count, 1008.0),
+        np.arange(count) % 24,
+    ])
+    rain_rate = np.zeros(count) if rain_rate is None else np.asarray(rain_rate, dtype=np.float64)
+    return ReportHistory(sensor_ids, times, features, rain_rate, rain_rate / 6)
+
+
+class WindowTests(SimpleTestCase):
+    def test_windows_are_views_in_row_order(self):
+        features = np.arange(40, dtype=np.float32).reshape(8, 5)
+        windows = build_windows(features, 6)
+        self.assertEqual(windows.shape, (3, 6, 5))
+        np.testing.assert_array_equal(windows[2], features[2:8])
+        self.assertTrue(np.shares_memory(windows, features))
+
+    def test_short_history_has_no_windows(self):
+        self.assertEqual(build_windows(np.zeros((3, 5)), 6).shape, (0, 6, 5))
+
+    def test_future_sums(self):
+        np.testing.assert_array_equal(
+            future_sums([1, 2, 3, 4, 5], 2),
+            [5, 7, 9, np.nan, np.nan],
+        )
+
+
+class BacktestTargetTests(SimpleTestCase):
+    def test_windows_never_cross_sensors(self):
+        history = make_history([1] * 8 + [2] * 8)
+        indexes, _, _, sensor_ids = backtest_targets(history, horizon=1)
+        # 8 rows per sensor leave 2 windows each with a 1-report horizon
+        np.testing.assert_array_equal(indexes, [0, 1, 8, 9])
+        np.testing.assert_array_equal(sensor_ids, [1, 1, 2, 2])
+
+    def test_missing_readings_invalidate_windows(self):
+        history = make_history([1] * 10)
+        history.features[3, 1] = np.nan
+        indexes, _, _, _ = backtest_targets(history, horizon=1)
+        np.testing.assert_array_equal(indexes, [])
+
+    def test_windows_spanning_a_reporting_gap_are_skipped(self):
+        times = np.arange(12) * 600.0
+        times[7:] += 3 * 3600  # Sensor offline for three hours after row 6
+        history = make_history([1] * 12, times=times)
+        indexes, _, _, _ = backtest_targets(history, horizon=1)
+        # Window 0 and its horizon (rows 0-6) end before the gap; every later window spans it
+        np.testing.assert_array_equal(indexes, [0])
+
+    def test_observed_targets_cover_the_horizon(self):
+        rates = np.arange(10, dtype=np.float64)
+        history = make_history([1] * 10, rain_rate=rates)
+        indexes, observed_rate, observed_amount, _ = backtest_targets(history, horizon=2)
+        # Window 0 ends at row 5, so it is scored against rows 6 and 7
+        self.assertEqual(indexes[0], 0)
+        self.assertEqual(observed_rate[0], 6.5)
+        self.assertAlmostEqual(observed_amount[0], (6 + 7) / 6)
+
+
+class RunBacktestTests(SimpleTestCase):
+    def test_perfect_predictor_scores_zero_error(self):
+        rates = np.tile([0.0, 0.0, 3.0, 3.0, 12.0, 12.0], 5)
+        history = make_history([1] * 15 + [2] * 15, rain_rate=rates)
+        _, observed_rate, observed_amount, _ = backtest_targets(history, horizon=1)
+        calls = []
+
+        def oracle(batch):
+            # Look the answer up by the row id stored in the temperature column
+            calls.append(len(batch))
+            end_rows = batch[:, -1, 0].astype(int)
+            rate = rates[end_rows + 1]
+            return rate / 6, np.full(len(batch), 10.0), rate
+
+        summary = run_backtest(history, horizon=1, batch_size=7, predict_batch=oracle)
+        self.assertEqual(summary["overall"]["count"], len(observed_rate))
+        self.assertEqual(summary["overall"]["rate_mae"], 0.0)
+        self.assertEqual(summary["overall"]["intensity_accuracy"], 1.0)
+        self.assertEqual(set(summary["by_sensor"]), {1, 2})
+        self.assertEqual(set(summary["by_intensity"]), {"None", "Moderate", "Heavy"})
+        self.assertTrue(all(size <= 7 for size in calls))
@@ -0,0 +1,95 @@
+"""
+Unit tests for the sliding-window training dataset builder.
+"""
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+from sklearn.preprocessing import StandardScaler
+
+from weatherapp.ai.dataset import (
+    fit_scalers,
+    sliding_windows,
+    split_indexes,
+    stream_windows,
+    window_batches,
+)
+
+FEATURE_COLS = ["temp", "humidity", "pressure", "wind_speed", "rain_mm"]
+TARGET_COLS = ["rain_mm", "duration_min"]
+PAST_STEPS = 6
+
+
+def loop_windows(X, y, past_steps):
+    """The original train.py loop, as the reference."""
+    X_seq, y_seq = [], []
+    for i in range(past_steps, len(X)):
+        X_seq.append(X[i - past_steps:i])
+        y_seq.append(y[i])
+    return np.array(X_seq), np.array(y_seq)
+
+
+class SlidingWindowTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X = rng.normal(size=(50, 5)).astype(np.float32)
+        self.y = rng.normal(size=(50, 2)).astype(np.float32)
+
+    def test_matches_original_loop_without_copying(self):
+        X_seq, y_seq = sliding_windows(self.X, self.y, PAST_STEPS)
+        expected_X, expected_y = loop_windows(self.X, self.y, PAST_STEPS)
+        np.testing.assert_array_equal(X_seq, expected_X)
+        np.testing.assert_array_equal(y_seq, expected_y)
+        self.assertTrue(np.shares_memory(X_seq, self.X))
+
+    def test_batches_cover_indexes_once(self):
+        X_seq, y_seq = sliding_windows(self.X, self.y, PAST_STEPS)
+        train_idx, val_idx = split_indexes(len(X_seq), 0.2)
+        self.assertEqual(len(train_idx) + len(val_idx), len(X_seq))
+        self.assertLess(train_idx[-1], val_idx[0])
+
+        batches = list(window_batches(X_seq, y_seq, train_idx, batch_size=8, shuffle=True, seed=1))
+        self.assertTrue(all(len(xb) <= 8 for xb, _ in batches))
+        gathered = np.concatenate([yb for _, yb in batches])
+        np.testing.assert_array_equal(
+            np.sort(gathered, axis=0), np.sort(y_seq[train_idx], axis=0)
+        )
+
+    def test_too_few_rows(self):
+        X_seq, y_seq = sliding_windows(self.X[:4], self.y[:4], PAST_STEPS)
+        self.assertEqual(X_seq.shape, (0, PAST_STEPS, 5))
+        self.assertEqual(len(y_seq), 0)
+
+
+class StreamingDatasetTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        rng = np.random.default_rng(1)
+        self.frame = pd.DataFrame(
+            rng.normal(size=(97, 6)).astype(np.float32),
+            columns=FEATURE_COLS + ["duration_min"],
+        )
+        self.path = os.path.join(self.tmp, "rainfall.csv")
+        self.frame.to_csv(self.path, index=False)
+
+    def test_chunked_scalers_match_full_fit(self):
+        scaler_X, scaler_y, rows = fit_scalers(self.path, FEATURE_COLS, TARGET_COLS, chunk_rows=10)
+        self.assertEqual(rows, 97)
+        full = StandardScaler().fit(self.frame[FEATURE_COLS].values)
+        np.testing.assert_allclose(scaler_X.mean_, full.mean_, rtol=1e-5)
+        np.testing.assert_allclose(scaler_X.scale_, full.scale_, rtol=1e-5)
+
+    def test_streamed_windows_match_in_memory_windows(self):
+        scaler_X, scaler_y, _ = fit_scalers(self.path, FEATURE_COLS, TARGET_COLS)
+        X = scaler_X.transform(self.frame[FEATURE_COLS].values).astype(np.float32)
+        y = scaler_y.transform(self.frame[TARGET_COLS].values).astype(np.float32)
+        expected_X, expected_y = sliding_windows(X, y, PAST_STEPS)
+
+        chunks = list(stream_windows(self.path, FEATURE_COLS, TARGET_COLS, PAST_STEPS, scaler_X, scaler_y, chunk_rows=10))
+        self.assertEqual([start for start, _, _ in chunks][:2], [0, 4])
+        np.testing.assert_allclose(np.concatenate([w for _, w, _ in chunks]), expected_X, rtol=1e-6)
+        np.testing.assert_allclose(np.concatenate([t for _, _, t in chunks]), expected_y, rtol=1e-6)
@@ -0,0 +1,133 @@
+"""
+Unit tests for the durable email outbox (sqlite stand-in for the database, fake SMTP connection).
+"""
+import importlib
+import smtplib
+import sqlite3
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from weatherapp import email_outbox
+from weatherapp.tests.test_sms_outbox import Cursor
+
+create_email_outbox = importlib.import_module("weatherapp.migrations.0005_email_outbox").create_email_outbox
+
+
+class SqliteConnection:
+    vendor = "sqlite"
+
+    def __init__(self):
+        self.db = sqlite3.connect(":memory:", isolation_level=None, check_same_thread=False)
+        self.introspection = SimpleNamespace(table_names=lambda cursor: [
+            row[0] for row in self.db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        ])
+        create_email_outbox(None, SimpleNamespace(connection=self))
+
+    def cursor(self):
+        return Cursor(self.db.cursor())
+
+    def rows(self, columns="to_email, status, attempts"):
+        return self.db.execute(f"SELECT {columns} FROM email_outbox ORDER BY id").fetchall()
+
+
+class FakeSmtpConnection:
+    """Counts SMTP sessions; addresses in ``failing`` are refused."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.sessions = 0
+        self.is_open = False
+        self.sent = []
+
+    def open(self):
+        if not self.is_open:
+            self.is_open = True
+            self.sessions += 1
+
+    def close(self):
+        self.is_open = False
+
+    def send_messages(self, messages):
+        assert self.is_open
+        for message in messages:
+            if message.to[0] in self.failing:
+                raise smtplib.SMTPRecipientsRefused({message.to[0]: (550, b"No such user")})
+            self.sent.append(message)
+        return len(messages)
+
+
+@override_settings(DEFAULT_FROM_EMAIL="WeatherAlert <noreply@example.com>", EMAIL_OUTBOX_BATCH_SIZE=2,
+                   EMAIL_OUTBOX_LEASE_SECONDS=300, EMAIL_OUTBOX_MAX_ATTEMPTS=2,
+                   EMAIL_OUTBOX_RETRY_BASE_SECONDS=30, EMAIL_OUTBOX_RETRY_MAX_SECONDS=600)
+class EmailOutboxTests(SimpleTestCase):
+
+    def setUp(self):
+        self.connection = SqliteConnection()
+
+    def enqueue(self, *addresses):
+        for address in addresses:
+            email_outbox.enqueue_email(address, "WeatherAlert Verification OTP", "Your OTP is: 123456",
+                                       connection=self.connection)
+
+    def drain(self, smtp):
+        return email_outbox.drain_outbox(lambda **kwargs: smtp, connection=self.connection)
+
+    def test_batches_share_one_smtp_session(self):
+        self.enqueue("a@example.com", "b@example.com", "c@example.com", "d@example.com", "e@example.com")
+        smtp = FakeSmtpConnection()
+        self.assertEqual(self.drain(smtp), {"sent": 5, "retried": 0, "failed": 0})
+        self.assertEqual(smtp.sessions, 1)
+        self.assertEqual([m.to for m in smtp.sent][:2], [["a@example.com"], ["b@example.com"]])
+        self.assertEqual(smtp.sent[0].from_email, "WeatherAlert <noreply@example.com>")
+        # Sent rows no longer hold the OTP
+        self.assertEqual({row for row in self.connection.rows("status, body")}, {("sent", "")})
+
+    def test_refused_message_is_retried_then_failed(self):
+        self.enqueue("a@example.com", "bad@example.com", "c@example.com")
+        smtp = FakeSmtpConnection(failing={"bad@example.com"})
+        self.assertEqual(self.drain(smtp), {"sent": 2, "retried": 1, "failed": 0})
+        # Reconnected after the failure, still one session per drain otherwise
+        self.assertEqual(smtp.sessions, 2)
+        self.assertEqual(self.connection.rows()[1], ("bad@example.com", "pending", 1))
+
+        self.connection.db.execute("UPDATE email_outbox SET next_attempt_at = '2000-01-01 00:00:00'"
+                                   " WHERE status = 'pending'")
+        self.assertEqual(self.drain(smtp), {"sent": 0, "retried": 0, "failed": 1})
+        self.assertEqual(self.connection.rows()[1], ("bad@example.com", "failed", 2))
+
+    def test_bulk_enqueue_skips_missing_recipients(self):
+        queued = email_outbox.enqueue_emails([
+            {"to_email": "a@example.com", "subject": "Flood alert", "body": "Evacuate"},
+            {"to_email": None, "subject": "Flood alert", "body": "Evacuate"},
+            {"to_email": "b@example.com", "subject": "Flood alert", "body": "Evacuate"},
+        ], connection=self.connection)
+        self.assertEqual(queued, 2)
+        self.assertEqual(self.connection.rows(), [("a@example.com", "pending", 0), ("b@example.com", "pending", 0)])
+
+    def test_expired_lease_cannot_overwrite_new_owner(self):
+        self.enqueue("a@example.com")
+        now = timezone.now()
+        stale = email_outbox.claim_due(10, connection=self.connection, now=now, token="a" * 32)
+        email_outbox.claim_due(10, connection=self.connection, now=now + timedelta(seconds=301), token="b" * 32)
+
+        # The first worker finishes late: neither outcome may touch the re-claimed row
+        self.assertEqual(email_outbox.mark_sent([stale[0][0]], "a" * 32, connection=self.connection), 0)
+        email_outbox.mark_failed([(stale[0][0], 1, "timeout")], "a" * 32, connection=self.connection)
+        self.assertEqual(self.connection.rows("status, attempts, lease_token"), [("sending", 2, "b" * 32)])
+
+        self.assertEqual(email_outbox.mark_sent([stale[0][0]], "b" * 32, connection=self.connection), 1)
+        self.assertEqual(self.connection.rows("status, body"), [("sent", "")])
+
+    def test_empty_recipient_is_not_queued(self):
+        self.assertEqual(email_outbox.enqueue_email("", "Subject", "Body", connection=self.connection), 0)
+
+    def test_kick_falls_back_to_in_process_drain(self):
+        with mock.patch("weatherapp.tasks.drain_email_outbox_task.delay", side_effect=OSError("no broker")), \
+                mock.patch.object(email_outbox, "drain_outbox") as drain, \
+                mock.patch("django.db.connection.close"):
+            email_outbox._drain_now()
+        drain.assert_called_once_with()
@@ -0,0 +1,158 @@
+"""
+Unit tests for the vectorized barangay flood-risk assessment.
+"""
+import numpy as np
+from django.test import SimpleTestCase
+
+from weatherapp.ai.flood_risk import (
+    INTENSITY_LABELS,
+    RISK_LEVELS,
+    BarangayRiskTable,
+    RiskLookupGrid,
+    intensity_codes,
+)
+
+RISK_DATA = {
+    "Poblacion": {"land_type": "low_lying", "risk_multiplier": 1.5, "description": "Prone to water accumulation"},
+    "Ma-ao": {"land_type": "rural_agricultural", "risk_multiplier": 1.2, "description": "Agricultural drainage"},
+    "Mailum": {"land_type": "highland", "risk_multiplier": 0.3, "description": "Elevated terrain"},
+    "Pacol": {"land_type": "mixed_flat_elevated", "risk_multiplier": 1.0, "description": "Balanced terrain"},
+    "Bacong": {"land_type": "low_lying", "risk_multiplier": 1.5, "description": "Riverside"},
+}
+
+
+def legacy_rain_intensity(rate_mm_h):
+    if rate_mm_h <= 0.01:
+        return "None"
+    elif rate_mm_h < 2.5:
+        return "Light"
+    elif rate_mm_h < 7.6:
+        return "Moderate"
+    elif rate_mm_h < 15:
+        return "Heavy"
+    elif rate_mm_h < 30:
+        return "Intense"
+    return "Torrential"
+
+
+def legacy_risk_level(data, rain_rate, duration, intensity_label):
+    """Per-barangay reference of the original loop-based assessment."""
+    multiplier = data["risk_multiplier"]
+    if rain_rate >= 2.5 / multiplier or (rain_rate > 1.0 and duration > 60 / multiplier):
+        if intensity_label in ["Heavy", "Intense", "Torrential"] or rain_rate >= 7.6:
+            return "High"
+        return "Moderate"
+    if rain_rate > 1.0 and multiplier > 1.0:
+        return "Low"
+    return "None"
+
+
+class BarangayRiskTableTests(SimpleTestCase):
+    def setUp(self):
+        self.table = BarangayRiskTable.from_mapping(RISK_DATA)
+
+    def test_matches_reference_assessment(self):
+        for rate in (0.0, 0.5, 1.2, 1.7, 2.1, 2.5, 5.0, 7.6, 12.0, 40.0):
+            for duration in (0.0, 30.0, 45.0, 61.0, 200.0):
+                label = legacy_rain_intensity(rate)
+                warnings = self.table.assess(rate, duration, label)
+                expected = {
+                    name: legacy_risk_level(data, rate, duration, label)
+                    for name, data in RISK_DATA.items()
+                }
+                actual = {w["barangay"]: w["risk_level"] for w in warnings}
+                self.assertEqual(
+                    actual,
+                    {name: level for name, level in expected.items() if level != "None"},
+                    msg=f"rate={rate} duration={duration}",
+                )
+
+    def test_warnings_sorted_by_priority_and_stable(self):
+        warnings = self.table.assess(1.8, 10.0, "Light")
+        self.assertEqual(
+            [(w["barangay"], w["risk_level"]) for w in warnings],
+            [("Poblacion", "Moderate"), ("Bacong", "Moderate"), ("Ma-ao", "Low")],
+        )
+
+    def test_warning_fields(self):
+        warning = self.table.assess(10.0, 60.0, "Heavy")[0]
+        self.assertEqual(warning["barangay"], "Poblacion")
+        self.assertEqual(warning["area"], "Poblacion (Low Lying)")
+        self.assertEqual(warning["land_type"], "low_lying")
+        self.assertEqual(
+            warning["message"],
+            "High flood risk in Poblacion due to predicted Heavy rain (10.0mm/h) over 60 minutes. "
+            "Prone to water accumulation.",
+        )
+
+    def test_risk_grid_matches_single_assessments(self):
+        rates = np.array([0.0, 1.5, 3.0, 8.0])
+        durations = np.array([10.0, 70.0, 250.0])
+        grid = self.table.risk_grid(rates, durations)
+        self.assertEqual(grid.shape, (4, 3, len(RISK_DATA)))
+        for i, rate in enumerate(rates):
+            for j, duration in enumerate(durations):
+                label = legacy_rain_intensity(rate)
+                expected = [
+                    legacy_risk_level(data, rate, duration, label) for data in RISK_DATA.values()
+                ]
+                self.assertEqual([RISK_LEVELS[c] for c in grid[i, j]], expected)
+
+    def test_empty_table(self):
+        table = BarangayRiskTable.from_mapping({})
+        self.assertEqual(table.assess(20.0, 120.0, "Intense"), [])
+        self.assertEqual(table.risk_grid([1.0], [10.0]).shape, (1, 1, 0))
+
+
+class RiskLookupGridTests(SimpleTestCase):
+    def setUp(self):
+        self.table = BarangayRiskTable.from_mapping(RISK_DATA)
+        self.grid = RiskLookupGrid(self.table)
+
+    def test_queries_round_up_to_next_bucket(self):
+        rate_index, duration_index = self.grid.bucket_indexes(2.3, 41.0)
+        self.assertEqual(self.grid.rain_rate_buckets[rate_index], 2.5)
+        self.assertEqual(self.grid.duration_buckets[duration_index], 50.0)
+
+        self.assertEqual(self.grid.bucket_indexes(500.0, 10000.0), (None, None))
+
+    def test_queries_beyond_the_grid_are_assessed_exactly(self):
+        table = BarangayRiskTable.from_mapping({
+            "Low-lying": {"land_type": "lowland", "risk_multiplier": 0.04, "description": "Near the river"},
+        })
+        grid = RiskLookupGrid(table)
+        # Threshold 62.5 mm/h is above the last rate bucket (50 mm/h)
+        self.assertEqual(grid.lookup(50.0, 0.0).tolist(), [0])
+        for rate, duration in ((70.0, 0.0), (70.0, 1000.0), (2.0, 2000.0)):
+            expected = table.risk_codes(rate, duration, legacy_rain_intensity(rate))
+            np.testing.assert_array_equal(grid.lookup(rate, duration), expected)
+
+    def test_rejects_non_finite_queries(self):
+        for rate, duration in ((float('nan'), 10.0), (5.0, float('nan')), (float('inf'), 10.0)):
+            with self.assertRaises(ValueError):
+                self.grid.lookup(rate, duration)
+
+    def test_lookup_matches_exact_assessment_on_bucket_edges(self):
+        for rate, duration in ((0.0, 0.0), (1.5, 70.0), (3.0, 30.0), (8.0, 120.0)):
+            expected = self.table.risk_codes(rate, duration, legacy_rain_intensity(rate))
+            np.testing.assert_array_equal(self.grid.lookup(rate, duration), expected)
+
+    def test_flagged_lists_highest_risk_first(self):
+        flagged = self.grid.flagged(1.8, 10.0)
+        self.assertEqual(
+            [(b["barangay"], b["risk_level"]) for b in flagged],
+            [("Poblacion", "Moderate"), ("Bacong", "Moderate"), ("Ma-ao", "Low")],
+        )
+
+    def test_to_dict_shape(self):
+        payload = self.grid.to_dict()
+        self.assertEqual(payload["barangays"], list(RISK_DATA))
+        self.assertEqual(len(payload["grid"]), len(payload["rain_rate_buckets"]))
+        self.assertEqual(len(payload["grid"][0]), len(payload["duration_buckets"]))
+
+
+class IntensityCodesTests(SimpleTestCase):
+    def test_matches_scalar_classification(self):
+        rates = np.array([0.0, 0.01, 0.02, 2.49, 2.5, 7.59, 7.6, 14.9, 15.0, 29.9, 30.0, 80.0])
+        labels = [INTENSITY_LABELS[c] for c in intensity_codes(rates)]
+        self.assertEqual(labels, [legacy_rain_intensity(r) for r in rates])
@@ -0,0 +1,93 @@
+"""
+Unit tests for the versioned rain model registry.
+"""
+import json
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from weatherapp.ai.registry import (
+    BUNDLED_VERSION,
+    MANIFEST_FILENAME,
+    MODEL_FILENAME,
+    ModelRegistry,
+    RegistryError,
+    sha256_file,
+)
+from weatherapp.ai.scaling import AffineScaler
+
+
+class ModelRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.registry = ModelRegistry(os.path.join(self.tmp, "registry"))
+        model_path = os.path.join(self.tmp, "model.h5")
+        with open(model_path, "wb") as f:
+            f.write(b"model")
+        self.sources = [model_path]
+        for name, features in (("sx.npz", 5), ("sy.npz", 2)):
+            path = os.path.join(self.tmp, name)
+            AffineScaler([1.0] * features, [2.0] * features).save(path)
+            self.sources.append(path)
+
+    def test_empty_registry_resolves_to_bundled_model(self):
+        self.assertIsNone(self.registry.current_version())
+        self.assertEqual(self.registry.resolve().version, BUNDLED_VERSION)
+
+    def test_publish_activates_and_records_checksums(self):
+        version = self.registry.publish(*self.sources, version="v1", notes="first")
+        self.assertEqual(version, "v1")
+        self.assertEqual(self.registry.current_version(), "v1")
+
+        artifacts = self.registry.resolve()
+        self.assertEqual(artifacts.version, "v1")
+        with open(artifacts.model_path, "rb") as f:
+            self.assertEqual(f.read(), b"model")
+
+        with open(os.path.join(self.registry.version_dir("v1"), MANIFEST_FILENAME)) as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest["notes"], "first")
+        self.assertEqual(len(manifest["files"]), 3)
+
+    def test_publish_without_activation_keeps_current(self):
+        self.registry.publish(*self.sources, version="v1")
+        self.registry.publish(*self.sources, version="v2", activate=False)
+        self.assertEqual(self.registry.current_version(), "v1")
+        self.assertEqual(self.registry.list_versions(), ["v1", "v2"])
+
+        self.registry.activate("v2")
+        self.assertEqual(self.registry.current_version(), "v2")
+
+    def test_versions_are_immutable(self):
+        self.registry.publish(*self.sources, version="v1")
+        with self.assertRaises(RegistryError):
+            self.registry.publish(*self.sources, version="v1")
+
+    def test_corrupted_artifact_fails_verification(self):
+        self.registry.publish(*self.sources, version="v1", activate=False)
+        with open(os.path.join(self.registry.version_dir("v1"), MODEL_FILENAME), "ab") as f:
+            f.write(b"truncated-upload")
+        with self.assertRaises(RegistryError):
+            self.registry.activate("v1")
+        self.assertIsNone(self.registry.current_version())
+
+    def test_unknown_version(self):
+        with self.assertRaises(RegistryError):
+            self.registry.activate("missing")
+
+    def test_versions_with_pickled_scalers_still_resolve(self):
+        directory = self.registry.version_dir("old")
+        os.makedirs(directory)
+        files = {}
+        for filename, content in (("rain_model.h5", b"model"), ("scaler_X.pkl", b"x"), ("scaler_y.pkl", b"y")):
+            with open(os.path.join(directory, filename), "wb") as f:
+                f.write(content)
+            files[filename] = sha256_file(os.path.join(directory, filename))
+        with open(os.path.join(directory, MANIFEST_FILENAME), "w") as f:
+            json.dump({"version": "old", "files": files}, f)
+
+        self.registry.activate("old")
+        self.assertTrue(self.registry.resolve().scaler_x_path.endswith("scaler_X.pkl"))
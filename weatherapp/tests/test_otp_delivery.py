@@ -0,0 +1,119 @@
+"""
+Unit tests for asynchronous OTP SMS delivery, against the local stub gateway
+(sqlite stand-in for the database).
+"""
+import importlib
+import sqlite3
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from weatherapp import otp_delivery
+from weatherapp.sms_stub_gateway import start_gateway_thread
+from weatherapp.tests.test_sms_outbox import Cursor
+
+create_otp_delivery = importlib.import_module("weatherapp.migrations.0006_otp_delivery").create_otp_delivery
+
+
+class SqliteConnection:
+    vendor = "sqlite"
+
+    def __init__(self):
+        # Shared with the dispatch thread, as django.db.connection would be per thread
+        self.db = sqlite3.connect(":memory:", isolation_level=None, check_same_thread=False)
+        self.introspection = SimpleNamespace(table_names=lambda cursor: [
+            row[0] for row in self.db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        ])
+        create_otp_delivery(None, SimpleNamespace(connection=self))
+
+    def cursor(self):
+        return Cursor(self.db.cursor())
+
+    def close(self):
+        pass
+
+
+@override_settings(SMS_API_KEY="key", SMS_DEVICE_ID="device", SMS_HTTP_RETRIES=0)
+class OtpDeliveryTests(SimpleTestCase):
+
+    def setUp(self):
+        self.connection = SqliteConnection()
+        patcher = mock.patch("django.db.connection", self.connection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def gateway(self, **options):
+        gateway = start_gateway_thread(**options)
+        self.addCleanup(gateway.server_close)
+        self.addCleanup(gateway.shutdown)
+        override = override_settings(SMS_API_URL=gateway.url)
+        override.enable()
+        self.addCleanup(override.disable)
+        return gateway
+
+    def wait_for(self, delivery_id, statuses=("sent", "failed")):
+        for _ in range(100):
+            status = otp_delivery.get_delivery_status(delivery_id)
+            if status["status"] in statuses:
+                return status
+            time.sleep(0.05)
+        self.fail(f"Delivery still {status}")
+
+    def test_delivery_records_outcome(self):
+        self.gateway()
+        otp_delivery.create_delivery("a")
+        otp_delivery.create_delivery("b")
+        self.assertTrue(otp_delivery.deliver_otp_sms("a", "+639171234567", "OTP 123456"))
+        self.assertEqual(otp_delivery.get_delivery_status("a"), {"status": "sent", "error": None})
+
+        self.gateway(error_rate=1.0)
+        self.assertFalse(otp_delivery.deliver_otp_sms("b", "+639171234567", "OTP 123456"))
+        self.assertEqual(otp_delivery.get_delivery_status("b")["status"], "failed")
+
+    def test_gateway_rejection_in_body_is_reported(self):
+        response = SimpleNamespace(status_code=200, json=lambda: {"success": False, "message": "No credits"})
+        client = SimpleNamespace(post=lambda phone, message: response)
+        otp_delivery.create_delivery("c")
+        with mock.patch.object(otp_delivery, "get_sms_client", return_value=client):
+            otp_delivery.deliver_otp_sms("c", "+639171234567", "OTP 123456")
+        self.assertEqual(otp_delivery.get_delivery_status("c"),
+                         {"status": "failed", "error": "SMS API Error: No credits"})
+
+    def test_start_returns_before_a_slow_gateway_answers(self):
+        gateway = self.gateway(latency=0.5)
+        with mock.patch("weatherapp.tasks.send_otp_sms_task.delay", side_effect=OSError("no broker")):
+            started = time.perf_counter()
+            delivery_id = otp_delivery.start_otp_sms("+639171234567", "OTP 123456")
+            self.assertLess(time.perf_counter() - started, 0.1)
+            self.assertIn(otp_delivery.get_delivery_status(delivery_id)["status"], ("queued", "sending"))
+            # No broker: the dispatch thread sent it itself
+            self.assertEqual(self.wait_for(delivery_id)["status"], "sent")
+        self.assertEqual(gateway.stats.snapshot()["accepted"], 1)
+
+    def test_queues_celery_task(self):
+        with mock.patch("weatherapp.tasks.send_otp_sms_task.delay") as delay:
+            delivery_id = otp_delivery.start_otp_sms("+639171234567", "OTP 123456")
+            for _ in range(100):
+                if delay.called:
+                    break
+                time.sleep(0.01)
+        delay.assert_called_once_with(delivery_id, "+639171234567", "OTP 123456")
+
+    def test_expired_deliveries_are_unknown_and_purged(self):
+        otp_delivery.create_delivery("old")
+        expired = timezone.now() - timedelta(seconds=otp_delivery.STATUS_TTL_SECONDS + 1)
+        self.connection.db.execute("UPDATE otp_delivery SET created_at = ?",
+                                   [expired.isoformat(sep=" ", timespec="microseconds")])
+        self.assertEqual(otp_delivery.get_delivery_status("old"), {"status": None, "error": None})
+
+        otp_delivery.create_delivery("new")
+        self.assertEqual(self.connection.db.execute("SELECT delivery_id FROM otp_delivery").fetchall(), [("new",)])
+        self.assertEqual(otp_delivery.get_delivery_status("new"), {"status": "queued", "error": None})
+
+    def test_unknown_delivery(self):
+        self.assertEqual(otp_delivery.get_delivery_status(None), {"status": None, "error": None})
+        self.assertEqual(otp_delivery.get_delivery_status("missing"), {"status": None, "error": None})
@@ -0,0 +1,98 @@
+"""
+Unit tests for the shared prediction pipeline (model and database mocked out).
+"""
+from unittest import mock
+
+import numpy as np
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from weatherapp.ai import pipeline, predictor
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+WINDOW = np.tile(np.array([[26.0, 85.0, 2.0, 1008.0, 14.0]], dtype=np.float32), (6, 1))
+RESULT = {'amount_mm': 0.5, 'duration_min': 20.0, 'intensity': 'Light', 'rate_mm_h': 1.5}
+
+
+class GetPipelineTests(SimpleTestCase):
+    def setUp(self):
+        for target, kwargs in (
+            (pipeline, {'attribute': '_pipeline', 'new': None}),
+            (predictor, {'attribute': 'start_model_watcher'}),
+        ):
+            patcher = mock.patch.object(target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @override_settings(ALERT_DISPATCH_ENABLED=False)
+    def test_alert_dispatch_is_off_by_default(self):
+        self.assertEqual(pipeline.get_pipeline().publishers, [])
+
+    @override_settings(ALERT_DISPATCH_ENABLED=True)
+    def test_enabled_alert_dispatch_is_published(self):
+        dispatcher = object()
+        with mock.patch('weatherapp.alert_dispatcher.get_dispatcher', return_value=dispatcher):
+            self.assertEqual(pipeline.get_pipeline().publishers, [dispatcher])
+
+
+class PredictionMemoKeyTests(SimpleTestCase):
+    def test_sensor_noise_below_quantum_maps_to_same_key(self):
+        jittered = WINDOW + np.array([0.02, 0.1, 0.03, 0.01, 0.0], dtype=np.float32)
+        self.assertEqual(
+            pipeline.prediction_memo_key(WINDOW, 'v1'),
+            pipeline.prediction_memo_key(jittered, 'v1'),
+        )
+
+    def test_real_change_or_new_model_changes_key(self):
+        changed = WINDOW.copy()
+        changed[-1, 1] = 92.0
+        key = pipeline.prediction_memo_key(WINDOW, 'v1')
+        self.assertNotEqual(key, pipeline.prediction_memo_key(changed, 'v1'))
+        self.assertNotEqual(key, pipeline.prediction_memo_key(WINDOW, 'v2'))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class PredictionPipelineRunTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.pipeline = pipeline.PredictionPipeline()
+        for target, kwargs in (
+            (self.pipeline, {'attribute': 'fetch_window', 'return_value': WINDOW}),
+            (self.pipeline, {'attribute': 'predict', 'return_value': dict(RESULT)}),
+            (self.pipeline, {'attribute': 'persist'}),
+            (self.pipeline, {'attribute': 'assess', 'return_value': []}),
+            (self.pipeline, {'attribute': 'publish'}),
+            (predictor, {'attribute': '_load_model'}),
+            (predictor, {'attribute': 'get_model_version', 'return_value': 'v1'}),
+            (pipeline, {'attribute': 'connection'}),
+        ):
+            patcher = mock.patch.object(target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_identical_window_reuses_model_output_but_reassesses(self):
+        self.assertEqual(self.pipeline.run_once(force=True), RESULT)
+        self.assertEqual(self.pipeline.run_once(force=True), RESULT)
+        self.pipeline.predict.assert_called_once()
+        # No second ai_predictions row for the unchanged window
+        self.pipeline.persist.assert_called_once()
+        self.assertEqual(self.pipeline.assess.call_count, 2)
+        self.assertEqual(self.pipeline.publish.call_count, 2)
+
+    def test_memo_hit_inserts_no_prediction_row(self):
+        self.pipeline.persist.side_effect = lambda result: pipeline.PredictionPipeline.persist(self.pipeline, result)
+        execute = pipeline.connection.cursor.return_value.__enter__.return_value.execute
+        self.pipeline.run_once(force=True)
+        self.pipeline.run_once(force=True)
+        inserts = [c for c in execute.call_args_list if 'INSERT INTO ai_predictions' in c.args[0]]
+        self.assertEqual(len(inserts), 1)
+
+    def test_run_gate_skips_second_cycle_in_interval(self):
+        self.assertEqual(self.pipeline.run_once(), RESULT)
+        self.assertIsNone(self.pipeline.run_once())
+
+    def test_missing_window_aborts_cycle(self):
+        self.pipeline.fetch_window.return_value = None
+        self.assertIsNone(self.pipeline.run_once(force=True))
+        self.pipeline.persist.assert_not_called()
@@ -0,0 +1,69 @@
+"""
+Unit tests for the local inference server and its client (model replaced by a stub).
+"""
+import threading
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from weatherapp.ai.client import PredictionClient, PredictionServerError
+from weatherapp.ai.server import MicroBatcher, create_server
+
+WINDOW = [[26.0, 85.0, 2.0, 1008.0, 14.0]] * 6
+
+
+class StubModel:
+    """Records batch sizes; amount is the first window's last temperature."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, windows):
+        self.batch_sizes.append(len(windows))
+        amount = windows[:, -1, 0] / 10.0
+        return amount, np.full(len(windows), 30.0), amount * 2
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def test_concurrent_windows_share_one_model_call(self):
+        model = StubModel()
+        batcher = MicroBatcher(model, max_batch=8, max_wait=0.05)
+        pending = [batcher.submit(np.asarray(WINDOW, dtype=np.float32) + i) for i in range(5)]
+        batcher.run_batch(batcher._collect())
+
+        self.assertEqual(model.batch_sizes, [5])
+        self.assertAlmostEqual(pending[3].result(timeout=1)["amount_mm"], 2.9, places=5)
+
+    def test_unavailable_model_fails_every_request(self):
+        batcher = MicroBatcher(lambda windows: None)
+        future = batcher.submit(np.asarray(WINDOW, dtype=np.float32))
+        batcher.run_batch(batcher._collect())
+        with self.assertRaises(RuntimeError):
+            future.result(timeout=1)
+
+
+class PredictionServerTests(SimpleTestCase):
+    def setUp(self):
+        self.model = StubModel()
+        self.server = create_server("127.0.0.1", 0, predict_batch=self.model)
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        host, port = self.server.server_address[:2]
+        self.client = PredictionClient(f"http://{host}:{port}")
+
+    def test_client_round_trip(self):
+        amount_mm, duration_min, intensity, rate_mm_h = self.client.predict_rain(WINDOW)
+        self.assertAlmostEqual(amount_mm, 2.6, places=5)
+        self.assertEqual(duration_min, 30.0)
+        self.assertAlmostEqual(rate_mm_h, 5.2, places=5)
+        self.assertEqual(len(self.client.predict([WINDOW, WINDOW])), 2)
+
+    def test_malformed_window_is_rejected(self):
+        with self.assertRaises(PredictionServerError):
+            self.client.predict([[1.0, 2.0]])
+
+    def test_unreachable_server(self):
+        with self.assertRaises(PredictionServerError):
+            PredictionClient("http://127.0.0.1:9", timeout=0.5).health()
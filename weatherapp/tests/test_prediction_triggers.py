@@ -0,0 +1,64 @@
+"""
+Unit tests for event-driven prediction triggers.
+"""
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from weatherapp.ai import triggers
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHE,
+    PREDICTION_TRIGGER='event',
+    PREDICTION_SCHEDULER='celery',
+    PREDICTION_TRIGGER_DEBOUNCE_SECONDS=15,
+    PREDICTION_MIN_SPACING_SECONDS=300,
+)
+class NotifyNewSensorDataTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('weatherapp.tasks.predict_rain_task.apply_async')
+        self.apply_async = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_of_ingests_schedules_one_cycle(self):
+        self.assertTrue(triggers.notify_new_sensor_data(1))
+        self.assertFalse(triggers.notify_new_sensor_data(2))
+        self.assertFalse(triggers.notify_new_sensor_data(1))
+        self.apply_async.assert_called_once_with(kwargs={'triggered': True}, countdown=15.0)
+
+    def test_cycle_start_reopens_triggers(self):
+        triggers.notify_new_sensor_data(1)
+        triggers.record_cycle_start()
+        self.assertTrue(triggers.notify_new_sensor_data(1))
+        self.assertEqual(self.apply_async.call_count, 2)
+
+    def test_countdown_respects_min_spacing(self):
+        cache.set(triggers.LAST_RUN_CACHE_KEY, time.time() - 100)
+        triggers.notify_new_sensor_data(1)
+        countdown = self.apply_async.call_args.kwargs['countdown']
+        self.assertAlmostEqual(countdown, 200, delta=2)
+
+    def test_failed_enqueue_releases_pending_trigger(self):
+        self.apply_async.side_effect = ConnectionError("broker down")
+        self.assertFalse(triggers.notify_new_sensor_data(1))
+        self.apply_async.side_effect = None
+        self.assertTrue(triggers.notify_new_sensor_data(1))
+
+    @override_settings(PREDICTION_TRIGGER='interval')
+    def test_disabled_in_interval_mode(self):
+        self.assertFalse(triggers.notify_new_sensor_data(1))
+        self.apply_async.assert_not_called()
+
+    @override_settings(PREDICTION_SCHEDULER='loop', REDIS_URL='redis://localhost:6379/0')
+    def test_loop_mode_publishes_on_channel(self):
+        client = mock.Mock()
+        with mock.patch.object(triggers, 'get_redis_client', return_value=client):
+            self.assertTrue(triggers.notify_new_sensor_data(7))
+        client.publish.assert_called_once_with(triggers.TRIGGER_CHANNEL, '7')
+        self.apply_async.assert_not_called()
@@ -0,0 +1,73 @@
+"""
+View tests for Web Push subscription registration (sqlite stand-in for the database).
+"""
+import importlib
+import json
+import sqlite3
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from weatherapp import views
+from weatherapp.tests.test_sms_outbox import Cursor
+
+create_push_subscription = importlib.import_module(
+    "weatherapp.migrations.0004_push_subscription"
+).create_push_subscription
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+ENDPOINT = 'https://push.example.com/send/abc'
+
+
+class SqliteConnection:
+    vendor = "sqlite"
+
+    def __init__(self):
+        self.db = sqlite3.connect(":memory:", isolation_level=None)
+        self.introspection = SimpleNamespace(table_names=lambda cursor: [
+            row[0] for row in self.db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        ])
+        create_push_subscription(None, SimpleNamespace(connection=self))
+
+    def cursor(self):
+        return Cursor(self.db.cursor())
+
+    def rows(self):
+        return self.db.execute("SELECT user_id, endpoint, p256dh FROM push_subscription ORDER BY id").fetchall()
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class PushSubscriptionViewTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.connection = SqliteConnection()
+        patcher = mock.patch.object(views, 'connection', self.connection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def call(self, method, user_id, body):
+        request = getattr(self.factory, method)('/api/push-subscriptions/', json.dumps(body),
+                                                content_type='application/json')
+        request.session = {'user_id': user_id}
+        return views.push_subscriptions(request)
+
+    def subscribe(self, user_id, p256dh='key'):
+        return self.call('post', user_id, {'endpoint': ENDPOINT, 'keys': {'p256dh': p256dh, 'auth': 'auth'}})
+
+    def test_resubscribe_replaces_own_keys(self):
+        self.assertEqual(self.subscribe(1).status_code, 200)
+        self.assertEqual(self.subscribe(1, p256dh='new').status_code, 200)
+        self.assertEqual(self.connection.rows(), [(1, ENDPOINT, 'new')])
+
+    def test_other_users_subscription_cannot_be_taken_over_or_removed(self):
+        self.subscribe(1)
+        self.assertEqual(self.subscribe(2).status_code, 409)
+        self.call('delete', 2, {'endpoint': ENDPOINT})
+        self.assertEqual(self.connection.rows(), [(1, ENDPOINT, 'key')])
+
+        self.assertEqual(self.call('delete', 1, {'endpoint': ENDPOINT}).status_code, 200)
+        self.assertEqual(self.connection.rows(), [])
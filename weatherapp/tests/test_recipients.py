@@ -0,0 +1,119 @@
+"""
+Unit tests for barangay recipient resolution (sqlite stand-in for the database).
+"""
+import importlib
+import sqlite3
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from weatherapp.recipients import (
+    barangay_from_address,
+    get_users_by_affected_barangays,
+    invalidate_recipients,
+    normalize_barangay,
+    to_e164,
+)
+
+add_barangay_column = importlib.import_module("weatherapp.migrations.0002_user_barangay").add_barangay_column
+add_phone_e164_column = importlib.import_module("weatherapp.migrations.0003_user_phone_e164").add_phone_e164_column
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class SqliteConnection:
+    """Minimal stand-in for django.db.connection that counts queries."""
+
+    def __init__(self):
+        self.db = sqlite3.connect(":memory:")
+        self.db.execute("CREATE TABLE user (user_id INTEGER PRIMARY KEY, name TEXT, address TEXT, phone_num TEXT, email TEXT)")
+        self.introspection = SimpleNamespace(
+            table_names=lambda cursor: ["user"],
+            get_table_description=lambda cursor, table: [
+                SimpleNamespace(name=row[1]) for row in self.db.execute(f"PRAGMA table_info({table})")
+            ],
+        )
+        self.queries = 0
+
+    def cursor(self):
+        self.queries += 1
+        return Cursor(self.db.cursor())
+
+    def add_user(self, name, address, phone="09171234567", email=None):
+        self.db.execute(
+            "INSERT INTO user (name, address, phone_num, email) VALUES (?, ?, ?, ?)", (name, address, phone, email)
+        )
+
+
+class Cursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cursor.close()
+
+    def execute(self, sql, params=()):
+        self.cursor.execute(sql.replace("%s", "?"), params)
+
+    def executemany(self, sql, rows):
+        self.cursor.executemany(sql.replace("%s", "?"), rows)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+class NormalizeTests(SimpleTestCase):
+    def test_barangay_names(self):
+        self.assertEqual(normalize_barangay("  brgy.  Ma-ao "), "MA-AO")
+        self.assertEqual(normalize_barangay("Barangay Poblacion"), "POBLACION")
+        self.assertIsNone(normalize_barangay(""))
+        self.assertEqual(barangay_from_address("Atipuluan, Bago City, Negros Occidental"), "ATIPULUAN")
+
+    def test_phone_numbers_to_e164(self):
+        for raw in ("09171234567", "0917-123-4567", "9171234567", "+63 917 123 4567", "639171234567"):
+            self.assertEqual(to_e164(raw), "+639171234567")
+        self.assertIsNone(to_e164("12345"))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class RecipientResolutionTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.connection = SqliteConnection()
+        self.connection.add_user("Ana", "Atipuluan, Bago City, Negros Occidental")
+        self.connection.add_user("Ben", "Atipuluan")
+        self.connection.add_user("Cris", "Bagroy, Bago City, Negros Occidental", phone="")
+        self.connection.add_user("Dina", "Tangub, Bago City, Negros Occidental")
+        schema_editor = SimpleNamespace(connection=self.connection)
+        add_barangay_column(None, schema_editor)
+        add_phone_e164_column(None, schema_editor)
+        self.warnings = [{"barangay": "Atipuluan"}, {"barangay": "Bagroy"}, {"barangay": "Taloc"}]
+
+    def test_users_grouped_by_flagged_barangay(self):
+        recipients = get_users_by_affected_barangays(self.warnings, connection=self.connection)
+        self.assertEqual(list(recipients), ["Atipuluan"])
+        self.assertEqual([user["name"] for user in recipients["Atipuluan"]], ["Ana", "Ben"])
+        self.assertEqual(recipients["Atipuluan"][0]["phone_e164"], "+639171234567")
+
+    def test_email_only_users_are_recipients(self):
+        self.connection.db.execute("UPDATE user SET email = 'cris@example.com' WHERE name = 'Cris'")
+        recipients = get_users_by_affected_barangays(self.warnings, connection=self.connection)
+        self.assertEqual(recipients["Bagroy"][0]["email"], "cris@example.com")
+        self.assertIsNone(recipients["Bagroy"][0]["phone_e164"])
+
+    def test_cached_until_invalidated(self):
+        get_users_by_affected_barangays(self.warnings, connection=self.connection)
+        queries = self.connection.queries
+        get_users_by_affected_barangays(self.warnings, connection=self.connection)
+        self.assertEqual(self.connection.queries, queries)
+
+        self.connection.add_user("Eli", "Taloc, Bago City, Negros Occidental")
+        self.connection.db.execute("UPDATE user SET barangay = 'TALOC' WHERE name = 'Eli'")
+        invalidate_recipients("Taloc")
+        recipients = get_users_by_affected_barangays(self.warnings, connection=self.connection)
+        self.assertEqual(self.connection.queries, queries + 1)
+        self.assertEqual([user["name"] for user in recipients["Taloc"]], ["Eli"])
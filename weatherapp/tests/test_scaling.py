@@ -0,0 +1,68 @@
+"""
+Unit tests for the sklearn-free feature scaling used at serving time.
+"""
+import os
+import shutil
+import tempfile
+
+import joblib
+import numpy as np
+from django.test import SimpleTestCase
+from sklearn.preprocessing import StandardScaler
+
+from weatherapp.ai.registry import ModelRegistry
+from weatherapp.ai.scaling import AffineScaler, load_scaler
+
+
+class AffineScalerTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        rng = np.random.default_rng(0)
+        self.data = rng.normal([27, 80, 3, 1008, 12], [2, 8, 1, 3, 7], (200, 5))
+        self.sklearn_scaler = StandardScaler().fit(self.data)
+
+    def test_matches_standard_scaler(self):
+        scaler = AffineScaler.from_sklearn(self.sklearn_scaler)
+        windows = self.data[:12].reshape(2, 6, 5)
+        np.testing.assert_allclose(
+            scaler.transform(windows).reshape(-1, 5),
+            self.sklearn_scaler.transform(self.data[:12]),
+            rtol=1e-4, atol=1e-4,
+        )
+        outputs = np.array([[0.5, -1.0], [2.0, 0.1]])
+        y_scaler = StandardScaler().fit(np.array([[0.0, 0.0], [1.0, 20.0], [4.0, 60.0]]))
+        np.testing.assert_allclose(
+            AffineScaler.from_sklearn(y_scaler).inverse_transform(outputs),
+            y_scaler.inverse_transform(outputs),
+            rtol=1e-5,
+        )
+
+    def test_npz_export_round_trips_and_pickles_still_load(self):
+        pickle_path = os.path.join(self.tmp, "scaler_X.pkl")
+        joblib.dump(self.sklearn_scaler, pickle_path)
+        from_pickle = load_scaler(pickle_path)
+
+        npz_path = os.path.join(self.tmp, "scaler_X.npz")
+        from_pickle.save(npz_path)
+        from_npz = load_scaler(npz_path)
+        np.testing.assert_array_equal(from_npz.mean, self.sklearn_scaler.mean_)
+        np.testing.assert_array_equal(from_npz.scale, self.sklearn_scaler.scale_)
+
+    def test_registry_exports_pickled_scalers_on_publish(self):
+        paths = {"model": os.path.join(self.tmp, "model.h5"), "x": os.path.join(self.tmp, "sx.pkl"),
+                 "y": os.path.join(self.tmp, "sy.pkl")}
+        with open(paths["model"], "wb") as f:
+            f.write(b"model")
+        joblib.dump(self.sklearn_scaler, paths["x"])
+        joblib.dump(StandardScaler().fit(self.data[:, :2]), paths["y"])
+
+        registry = ModelRegistry(os.path.join(self.tmp, "registry"))
+        registry.publish(paths["model"], paths["x"], paths["y"], version="v1")
+        artifacts = registry.resolve()
+        self.assertTrue(artifacts.scaler_x_path.endswith(".npz"))
+        np.testing.assert_allclose(load_scaler(artifacts.scaler_x_path).mean, self.sklearn_scaler.mean_)
+
+    def test_rejects_zero_scale(self):
+        with self.assertRaises(ValueError):
+            AffineScaler([0.0, 1.0], [1.0, 0.0])
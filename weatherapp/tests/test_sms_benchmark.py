@@ -0,0 +1,70 @@
+"""
+Tests for the stub SMS gateway and the delivery benchmark.
+"""
+import itertools
+
+import requests
+from django.test import SimpleTestCase, override_settings
+
+from weatherapp.sms_benchmark import run, synthetic_alert_jobs
+from weatherapp.sms_stub_gateway import start_gateway_thread
+
+
+class StubGatewayTests(SimpleTestCase):
+
+    def start(self, **options):
+        gateway = start_gateway_thread(**options)
+        self.addCleanup(gateway.server_close)
+        self.addCleanup(gateway.shutdown)
+        return gateway
+
+    def post(self, gateway, **data):
+        data = data or {"mobile_number": "+639171234567", "message": "test"}
+        return requests.post(gateway.url, data=data, timeout=5)
+
+    def test_accepts_gateway_form(self):
+        gateway = self.start()
+        self.assertEqual(self.post(gateway).status_code, 200)
+        self.assertEqual(self.post(gateway, device="1").status_code, 400)
+        stats = requests.get(gateway.url.replace("/send", "/stats"), timeout=5).json()
+        self.assertEqual((stats["requests"], stats["accepted"], stats["invalid"]), (2, 1, 1))
+        self.assertEqual(stats["connections"], 3)
+
+    def test_error_rate(self):
+        gateway = self.start(error_rate=1.0)
+        self.assertEqual(self.post(gateway).status_code, 500)
+        self.assertEqual(gateway.stats.snapshot()["errors"], 1)
+
+    def test_rate_limit_rejects_burst_overflow(self):
+        gateway = self.start(rate_limit=1, burst=2)
+        codes = [self.post(gateway).status_code for _ in range(4)]
+        self.assertEqual(codes[:2], [200, 200])
+        self.assertIn(429, codes[2:])
+
+
+class SmsBenchmarkTests(SimpleTestCase):
+
+    def test_synthetic_warning_size(self):
+        jobs = synthetic_alert_jobs(3, 4)
+        self.assertEqual(len(jobs), 12)
+        self.assertEqual(len({job.phone_number for job in jobs}), 12)
+        self.assertEqual(len({job.message for job in jobs}), 3)
+
+    @override_settings(SMS_OUTBOX_MAX_ATTEMPTS=3)
+    def test_failures_are_retried_and_counted(self):
+        calls = itertools.count()
+        # Every third send fails
+        report = run(barangays=2, users=5, concurrency=2,
+                     send=lambda phone, message: next(calls) % 3 != 2)
+        self.assertEqual(report["messages"], 10)
+        self.assertEqual(report["delivered"] + report["failed"], 10)
+        self.assertGreater(report["retries"], 0)
+        self.assertEqual(report["retries"], sum(report["retries_by_attempt"].values()))
+        self.assertEqual(set(report["latency_ms"]), {"p50", "p95", "p99"})
+
+    @override_settings(SMS_API_URL=None, SMS_API_KEY="key", SMS_DEVICE_ID="device", SMS_OUTBOX_MAX_ATTEMPTS=4)
+    def test_end_to_end_against_stub_gateway(self):
+        report = run(barangays=2, users=10, concurrency=4, latency=0.0, jitter=0.0, error_rate=0.2, seed=1)
+        self.assertEqual(report["delivered"] + report["failed"], 20)
+        self.assertEqual(report["gateway_stats"]["accepted"], report["delivered"])
+        self.assertEqual(report["gateway_stats"]["requests"], 20 + report["retries"])
@@ -0,0 +1,70 @@
+"""
+Tests for the shared SMS gateway client, against the local stub gateway.
+"""
+import certifi
+from django.test import SimpleTestCase, override_settings
+
+from weatherapp.sms_client import SmsGatewayClient, get_sms_client
+from weatherapp.sms_stub_gateway import start_gateway_thread
+
+
+class SmsGatewayClientTests(SimpleTestCase):
+
+    def start(self, **options):
+        gateway = start_gateway_thread(**options)
+        self.addCleanup(gateway.server_close)
+        self.addCleanup(gateway.shutdown)
+        return gateway
+
+    def gateway_client(self, gateway, **kwargs):
+        client = SmsGatewayClient(gateway.url, "key", "device", **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def test_connections_are_reused(self):
+        gateway = self.start()
+        client = self.gateway_client(gateway, pool_size=4)
+        self.assertTrue(all(client.send("+639171234567", f"message {i}") for i in range(5)))
+        self.assertEqual(gateway.stats.snapshot()["connections"], 1)
+
+    def test_throttled_request_is_retried(self):
+        gateway = self.start(rate_limit=2, burst=1)
+        client = self.gateway_client(gateway, retries=2)
+        self.assertTrue(client.send("+639171234567", "first"))
+        self.assertTrue(client.send("+639171234567", "second"))
+        stats = gateway.stats.snapshot()
+        self.assertEqual(stats["accepted"], 2)
+        self.assertGreaterEqual(stats["throttled"], 1)
+
+    def test_server_errors_are_not_resent(self):
+        gateway = self.start(error_rate=1.0)
+        self.assertFalse(self.gateway_client(gateway, retries=2).send("+639171234567", "hello"))
+        self.assertEqual(gateway.stats.snapshot()["requests"], 1)
+
+    def test_rejection_in_body_is_a_failure(self):
+        gateway = self.start(reject_rate=1.0)
+        self.assertFalse(self.gateway_client(gateway, retries=2).send("+639171234567", "hello"))
+        self.assertEqual(gateway.stats.snapshot()["rejected"], 1)
+
+    def test_unreachable_gateway_reports_failure(self):
+        client = SmsGatewayClient("http://127.0.0.1:9/send", "key", "device", retries=0, timeout=1)
+        self.addCleanup(client.close)
+        self.assertFalse(client.send("+639171234567", "hello"))
+
+
+@override_settings(SMS_API_URL="https://sms.example.invalid/send", SMS_API_KEY="key", SMS_DEVICE_ID="device",
+                   SMS_POOL_SIZE=4, SMS_HTTP_TIMEOUT=10, SMS_HTTP_RETRIES=2, SMS_CA_BUNDLE=None)
+class GetSmsClientTests(SimpleTestCase):
+
+    def test_shared_and_verified(self):
+        client = get_sms_client()
+        self.assertIs(get_sms_client(), client)
+        self.assertEqual(client.session.verify, certifi.where())
+        self.assertEqual(client.session.headers["apikey"], "key")
+
+    def test_rebuilt_when_settings_change(self):
+        client = get_sms_client()
+        with override_settings(SMS_API_URL="http://127.0.0.1:9090/send"):
+            other = get_sms_client()
+        self.assertIsNot(other, client)
+        self.assertEqual(other.url, "http://127.0.0.1:9090/send")
@@ -0,0 +1,72 @@
+"""
+Unit tests for the concurrent SMS fan-out engine (gateway replaced by a stub sender).
+"""
+import threading
+import time
+
+from django.test import SimpleTestCase, override_settings
+
+from weatherapp.sms_fanout import SmsFanout, SmsJob, TokenBucket
+
+
+class StubGateway:
+    """Sleeps like a slow gateway and fails numbers ending in 0."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def __call__(self, phone_number, message):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self.lock:
+            self.in_flight -= 1
+        if phone_number.endswith("99"):
+            raise ConnectionError("gateway reset")
+        return not phone_number.endswith("0")
+
+
+def make_jobs(barangays, users):
+    return [
+        SmsJob(f"Barangay {b}", f"+63917{b:03d}{u:04d}", "FLOOD ALERT", f"user {u}")
+        for b in range(barangays) for u in range(users)
+    ]
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_waits_for_refill_after_burst(self):
+        now = [0.0]
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0], sleep=lambda s: now.__setitem__(0, now[0] + s))
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+        self.assertAlmostEqual(now[0], 0.5)
+
+    def test_zero_rate_is_unlimited(self):
+        self.assertEqual(TokenBucket(rate=0).acquire(), 0.0)
+
+
+@override_settings(SMS_API_URL="http://stub", SMS_FANOUT_CONCURRENCY=8,
+                   SMS_RATE_LIMIT_PER_SECOND=0, SMS_RATE_LIMIT_BURST=0)
+class SmsFanoutTests(SimpleTestCase):
+    def test_counts_per_barangay_and_total(self):
+        summary = SmsFanout(StubGateway(), rate_limiter=TokenBucket(0)).run(make_jobs(3, 100))
+        # user 0, 10, 20... fail; user 99 raises
+        self.assertEqual(summary["total_failed"], 3 * 11)
+        self.assertEqual(summary["total_sent"], 3 * 89)
+        self.assertEqual(summary["results"]["Barangay 1"], {"users_count": 100, "sent": 89, "failed": 11})
+
+    def test_sends_concurrently_up_to_the_pool_size(self):
+        gateway = StubGateway(latency=0.02)
+        summary = SmsFanout(gateway, concurrency=8, rate_limiter=TokenBucket(0)).run(make_jobs(2, 40))
+        self.assertEqual(gateway.max_in_flight, 8)
+        # 80 sends x 20 ms take 1.6 s one at a time
+        self.assertLess(summary["elapsed_seconds"], 0.8)
+
+    def test_rate_limit_caps_throughput(self):
+        summary = SmsFanout(StubGateway(), concurrency=8, rate_limiter=TokenBucket(50, 1)).run(make_jobs(1, 11))
+        self.assertGreaterEqual(summary["elapsed_seconds"], 0.18)
@@ -0,0 +1,55 @@
+"""
+Unit tests for SMS alert rendering and segment accounting.
+"""
+from django.test import SimpleTestCase
+
+from weatherapp.sms_messages import describe_message, render_alert, to_gsm7
+
+WARNING = {
+    "risk_level": "High",
+    "land_type": "lowland",
+    "message": "Flooding likely \U0001F30A – move to higher ground…",
+}
+
+
+class SegmentCountTests(SimpleTestCase):
+
+    def test_gsm7_limits(self):
+        self.assertEqual(describe_message("a" * 160).segments, 1)
+        self.assertEqual(describe_message("a" * 161).segments, 2)
+        self.assertEqual(describe_message("a" * 306).segments, 2)
+        self.assertEqual(describe_message("a" * 307).segments, 3)
+
+    def test_extension_characters_take_two_units(self):
+        message = describe_message("[" * 80)
+        self.assertEqual((message.encoding, message.units, message.segments), ("GSM-7", 160, 1))
+        self.assertEqual(describe_message("[" * 81).segments, 2)
+
+    def test_ucs2_limits(self):
+        self.assertEqual(describe_message("á" * 70).encoding, "UCS-2")
+        self.assertEqual(describe_message("á" * 70).segments, 1)
+        self.assertEqual(describe_message("á" * 71).segments, 2)
+        self.assertEqual(describe_message("á" * 135).segments, 3)
+
+    def test_emoji_counts_as_two_ucs2_units(self):
+        self.assertEqual(describe_message("\U0001F6A8").units, 2)
+
+
+class RenderAlertTests(SimpleTestCase):
+
+    def test_emoji_and_typography_are_stripped(self):
+        self.assertEqual(to_gsm7("\U0001F6A8 ALERT \U0001F6A8 – now…"), "ALERT - now...")
+
+    def test_alert_is_single_encoding_gsm7(self):
+        message = render_alert("Atipuluan", WARNING, 12.345, 45, "Heavy")
+        self.assertEqual(message.encoding, "GSM-7")
+        self.assertTrue(message.text.startswith("FLOOD ALERT - ATIPULUAN\n"))
+        self.assertIn("Predicted Rain: 12.3mm over 45min", message.text)
+        self.assertIn("Land Type: Lowland", message.text)
+        self.assertIn("Flooding likely - move to higher ground...", message.text)
+        self.assertEqual(message.segments, describe_message(message.text).segments)
+
+    def test_render_is_cached_per_input(self):
+        first = render_alert("Atipuluan", WARNING, 12.3, 45, "Heavy")
+        self.assertIs(render_alert("Atipuluan", dict(WARNING), 12.3, 45.0, "Heavy"), first)
+        self.assertIsNot(render_alert("Bagroy", WARNING, 12.3, 45, "Heavy"), first)
@@ -0,0 +1,143 @@
+"""
+Unit tests for the durable SMS outbox (sqlite stand-in for the database, stub gateway).
+"""
+import importlib
+import random
+import sqlite3
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from weatherapp import sms_outbox
+
+create_sms_outbox = importlib.import_module("weatherapp.migrations.0001_sms_outbox").create_sms_outbox
+
+
+class SqliteConnection:
+    """Minimal stand-in for django.db.connection over an in-memory sqlite database."""
+
+    vendor = "sqlite"
+
+    def __init__(self):
+        self.db = sqlite3.connect(":memory:", isolation_level=None)
+        self.introspection = SimpleNamespace(table_names=lambda cursor: [
+            row[0] for row in self.db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        ])
+        create_sms_outbox(None, SimpleNamespace(connection=self))
+
+    def cursor(self):
+        return Cursor(self.db.cursor())
+
+    def rows(self, columns="id, status, attempts"):
+        return self.db.execute(f"SELECT {columns} FROM sms_outbox ORDER BY id").fetchall()
+
+
+def _param(value):
+    return value.isoformat(sep=" ", timespec="microseconds") if isinstance(value, datetime) else value
+
+
+class Cursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cursor.close()
+
+    def execute(self, sql, params=()):
+        self.cursor.execute(sql.replace("%s", "?"), [_param(p) for p in params])
+
+    def executemany(self, sql, rows):
+        self.cursor.executemany(sql.replace("%s", "?"), [[_param(p) for p in row] for row in rows])
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+class StubGateway:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.sent = []
+
+    def __call__(self, phone_number, message):
+        if phone_number in self.failing:
+            return False
+        self.sent.append(phone_number)
+        return True
+
+
+@override_settings(SMS_API_URL="http://stub", SMS_FANOUT_CONCURRENCY=1, SMS_RATE_LIMIT_PER_SECOND=0,
+                   SMS_OUTBOX_BATCH_SIZE=50, SMS_OUTBOX_LEASE_SECONDS=300, SMS_OUTBOX_MAX_ATTEMPTS=3,
+                   SMS_OUTBOX_RETRY_BASE_SECONDS=30, SMS_OUTBOX_RETRY_MAX_SECONDS=600)
+class SmsOutboxTests(SimpleTestCase):
+    def setUp(self):
+        self.connection = SqliteConnection()
+
+    def enqueue(self, *messages):
+        return sms_outbox.enqueue_sms(
+            [{"phone_number": phone, "message": "FLOOD ALERT", "barangay": "Tangub", "priority": priority}
+             for phone, priority in messages],
+            connection=self.connection,
+        )
+
+    def test_high_priority_messages_go_first(self):
+        self.enqueue(("+63900000001", 10), ("+63900000002", 30), ("+63900000003", 20))
+        gateway = StubGateway()
+        counts = sms_outbox.drain_outbox(gateway, connection=self.connection)
+        self.assertEqual(counts, {"sent": 3, "retried": 0, "failed": 0})
+        self.assertEqual(gateway.sent, ["+63900000002", "+63900000003", "+63900000001"])
+        self.assertEqual({row[1] for row in self.connection.rows()}, {"sent"})
+
+    def test_failed_send_is_retried_later_then_given_up(self):
+        self.enqueue(("+63900000001", 30), ("+63900000002", 30))
+        gateway = StubGateway(failing={"+63900000001"})
+
+        self.assertEqual(sms_outbox.drain_outbox(gateway, connection=self.connection),
+                         {"sent": 1, "retried": 1, "failed": 0})
+        status, attempts, next_attempt_at = self.connection.rows("status, attempts, next_attempt_at")[0]
+        self.assertEqual((status, attempts), ("pending", 1))
+        self.assertGreater(next_attempt_at, _param(timezone.now() + timedelta(seconds=14)))
+        # Backoff not elapsed: nothing is due
+        self.assertEqual(sms_outbox.drain_outbox(gateway, connection=self.connection)["retried"], 0)
+
+        for expected in ({"sent": 0, "retried": 1, "failed": 0}, {"sent": 0, "retried": 0, "failed": 1}):
+            self.connection.db.execute("UPDATE sms_outbox SET next_attempt_at = '2000-01-01 00:00:00'"
+                                       " WHERE status = 'pending'")
+            self.assertEqual(sms_outbox.drain_outbox(gateway, connection=self.connection), expected)
+        self.assertEqual(self.connection.rows()[0][1:], ("failed", 3))
+
+    def test_lease_survives_worker_crash(self):
+        self.enqueue(("+63900000001", 30))
+        now = timezone.now()
+        claimed = sms_outbox.claim_due(10, connection=self.connection, now=now)
+        self.assertEqual(len(claimed), 1)
+        # Leased rows are invisible to other drains until the lease expires
+        self.assertEqual(sms_outbox.claim_due(10, connection=self.connection, now=now), [])
+        reclaimed = sms_outbox.claim_due(10, connection=self.connection, now=now + timedelta(seconds=301))
+        self.assertEqual([row[0] for row in reclaimed], [claimed[0][0]])
+        self.assertEqual(reclaimed[0][4], 2)
+
+    def test_expired_lease_cannot_overwrite_new_owner(self):
+        self.enqueue(("+63900000001", 30))
+        now = timezone.now()
+        stale = sms_outbox.claim_due(10, connection=self.connection, now=now, token="a" * 32)
+        sms_outbox.claim_due(10, connection=self.connection, now=now + timedelta(seconds=301), token="b" * 32)
+
+        # The first worker finishes late: neither outcome may touch the re-claimed row
+        self.assertEqual(sms_outbox.mark_sent([stale[0][0]], "a" * 32, connection=self.connection), 0)
+        sms_outbox.mark_failed([(stale[0][0], 1, "timeout")], "a" * 32, connection=self.connection)
+        self.assertEqual(self.connection.rows("status, attempts, lease_token"), [("sending", 2, "b" * 32)])
+
+        self.assertEqual(sms_outbox.mark_sent([stale[0][0]], "b" * 32, connection=self.connection), 1)
+        self.assertEqual(self.connection.rows()[0][1], "sent")
+
+    def test_retry_delay_grows_with_jitter(self):
+        rng = random.Random(1)
+        delays = [sms_outbox.retry_delay(attempt, rng) for attempt in range(1, 8)]
+        self.assertTrue(15 <= delays[0] <= 30)
+        self.assertTrue(60 <= delays[2] <= 120)
+        self.assertTrue(all(300 <= d <= 600 for d in delays[5:]))
@@ -0,0 +1,42 @@
+"""
+Unit tests for the repeat-alert suppression ledger.
+"""
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from weatherapp.sms_suppression import partition_recipients, record_alerted
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+USERS = {
+    "Atipuluan": [{"user_id": 1, "name": "Ana", "phone_num": "09170000001", "phone_e164": "+639170000001"},
+                  {"user_id": 2, "name": "Ben", "phone_num": "09170000002", "phone_e164": "+639170000002"}],
+    "Bagroy": [{"user_id": 3, "name": "Cris", "phone_num": "09170000003", "phone_e164": "+639170000003"}],
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, SMS_SUPPRESSION_WINDOW_SECONDS=3600)
+class SuppressionLedgerTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_same_level_is_suppressed_and_escalation_passes(self):
+        levels = {"Atipuluan": "Moderate", "Bagroy": "Moderate"}
+        record_alerted({"Atipuluan": USERS["Atipuluan"][:1]}, levels)
+
+        to_alert, suppressed = partition_recipients(USERS, levels)
+        self.assertEqual(suppressed, {"Atipuluan": 1})
+        self.assertEqual([u["user_id"] for u in to_alert["Atipuluan"]], [2])
+        self.assertIn("Bagroy", to_alert)
+
+        # Lower risk stays suppressed, higher risk escalates
+        atipuluan = {"Atipuluan": USERS["Atipuluan"]}
+        self.assertEqual(partition_recipients(atipuluan, {"Atipuluan": "Low"})[1], {"Atipuluan": 1})
+        to_alert, suppressed = partition_recipients(USERS, {"Atipuluan": "High", "Bagroy": "Low"})
+        self.assertEqual(len(to_alert["Atipuluan"]), 2)
+        self.assertEqual(suppressed, {})
+
+    @override_settings(SMS_SUPPRESSION_WINDOW_SECONDS=0)
+    def test_zero_window_disables_suppression(self):
+        record_alerted(USERS, {"Atipuluan": "High", "Bagroy": "High"})
+        self.assertEqual(partition_recipients(USERS, {"Atipuluan": "High"})[1], {})
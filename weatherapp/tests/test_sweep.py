@@ -0,0 +1,47 @@
+"""
+Unit tests for the hyperparameter sweep helpers (no model training).
+"""
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from weatherapp.ai.sweep import parameter_grid, prepare_shared_data
+from weatherapp.ai.training import ReportCache, build_training_set
+
+
+class ParameterGridTests(SimpleTestCase):
+    def test_every_combination_gets_an_id(self):
+        configs = parameter_grid([3, 6], [(32, 16), (64, 32)], [0.1, 0.2], [None])
+        self.assertEqual(len(configs), 8)
+        self.assertEqual([c["id"] for c in configs], list(range(8)))
+        self.assertEqual(configs[0], {"id": 0, "past_steps": 3, "units": [32, 16], "dropout": 0.1, "learning_rate": None})
+
+
+class SharedDataTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        directory = os.path.join(self.tmp, "cache", "sensors", "1")
+        os.makedirs(directory)
+        raw = np.zeros((40, 6))
+        raw[:, 0] = 1.7e9 + np.arange(40) * 600
+        raw[:, 1:5] = np.random.default_rng(0).normal([27, 80, 3, 1008], [2, 8, 1, 3], (40, 4))
+        raw[::3, 5] = 0.3
+        np.save(os.path.join(directory, "reports.npy"), raw)
+        with open(os.path.join(directory, "manifest.json"), "w") as f:
+            json.dump({"rows": 40}, f)
+        self.training_set = build_training_set(ReportCache(os.path.join(self.tmp, "cache")))
+
+    def test_scaled_data_is_written_once_for_all_workers(self):
+        shared = prepare_shared_data(self.training_set, self.tmp)
+        features = np.load(shared["paths"]["features"], mmap_mode="r")
+        self.assertIsInstance(features, np.memmap)
+        self.assertEqual(features.shape, self.training_set.features.shape)
+
+        finite = np.isfinite(self.training_set.targets).all(axis=1)
+        np.testing.assert_allclose(features[finite].mean(axis=0), 0.0, atol=1e-5)
+        self.assertEqual(len(shared["stats"]["targets"]["mean"]), 2)
@@ -0,0 +1,159 @@
+"""
+Unit tests for the weather_reports training data pipeline.
+"""
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from weatherapp.ai.dataset import sliding_windows
+from weatherapp.ai.training import (
+    REPORT_INTERVAL_MINUTES,
+    ReportCache,
+    build_training_set,
+    derive_features,
+    derive_targets,
+    evenly_spaced_windows,
+    valid_window_starts,
+)
+
+START = datetime(2025, 6, 1, 0, 0)
+
+
+class SqliteConnection:
+    """Minimal stand-in for django.db.connection over an in-memory sqlite database."""
+
+    vendor = "sqlite"
+
+    def __init__(self):
+        self.db = sqlite3.connect(":memory:", detect_types=sqlite3.PARSE_DECLTYPES)
+        self.db.execute("""
+            CREATE TABLE weather_reports (
+                report_id INTEGER PRIMARY KEY, sensor_id INTEGER, temperature REAL,
+                humidity REAL, wind_speed REAL, barometric_pressure REAL,
+                date_time TIMESTAMP, rain_accumulated REAL
+            )
+        """)
+
+    def cursor(self):
+        return Cursor(self.db.cursor())
+
+    def add_reports(self, sensor_id, count, start=START, rain=0.0):
+        for i in range(count):
+            self.db.execute(
+                "INSERT INTO weather_reports (sensor_id, temperature, humidity, wind_speed,"
+                " barometric_pressure, date_time, rain_accumulated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (sensor_id, 25.0 + i, 80.0, 2.0, 1008.0, start + timedelta(minutes=10 * i), rain),
+            )
+
+
+class Cursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cursor.close()
+
+    def execute(self, sql, params=()):
+        self.cursor.execute(sql.replace("%s", "?"), [str(p) if isinstance(p, datetime) else p for p in params])
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+def raw_reports(count, rain=None, start=START):
+    epoch = (start - datetime(1970, 1, 1)).total_seconds()
+    raw = np.zeros((count, 6))
+    raw[:, 0] = epoch + np.arange(count) * REPORT_INTERVAL_MINUTES * 60
+    raw[:, 1:5] = [26.0, 80.0, 2.0, 1008.0]
+    raw[:, 5] = 0.0 if rain is None else rain
+    return raw
+
+
+class DeriveTests(SimpleTestCase):
+    def test_features_use_serving_order_and_hour(self):
+        features = derive_features(raw_reports(8, start=START + timedelta(hours=13)))
+        np.testing.assert_array_equal(features[0], [26.0, 80.0, 2.0, 1008.0, 13.0])
+        self.assertEqual(features[6, 4], 14.0)
+
+    def test_targets_cover_following_reports(self):
+        rain = np.array([0, 0, 0.3, 0.6, 0, 0, 0.3, 0], dtype=np.float64)
+        targets = derive_targets(raw_reports(8, rain=rain), horizon=3)
+        np.testing.assert_allclose(targets[2], [0.9, 20.0])
+        np.testing.assert_allclose(targets[4], [0.3, 10.0])
+        self.assertTrue(np.isnan(targets[6]).all())
+
+    def test_windows_pair_with_the_hour_after_them(self):
+        rain = np.zeros(20)
+        rain[6:12] = 0.5
+        raw = raw_reports(20, rain=rain)
+        features, targets = derive_features(raw), derive_targets(raw)
+        starts = valid_window_starts(raw[:, 0], features, targets)
+        _, y_seq = sliding_windows(features, targets, 6)
+        np.testing.assert_allclose(y_seq[starts[0]], [3.0, 60.0])
+
+    def test_gaps_and_missing_readings_are_skipped(self):
+        raw = raw_reports(30)
+        raw[15:, 0] += 6 * 3600  # sensor offline for six hours
+        raw[25, 2] = np.nan
+        features, targets = derive_features(raw), derive_targets(raw)
+        starts = valid_window_starts(raw[:, 0], features, targets)
+        self.assertTrue(np.all((starts + 11 < 15) | (starts >= 15)))
+        self.assertFalse(np.any((starts <= 25) & (starts + 5 >= 25)))
+
+    def test_single_long_gap_breaks_every_window_across_it(self):
+        times = np.arange(30) * REPORT_INTERVAL_MINUTES * 60.0
+        times[15:] += 55 * 60  # one 65-minute outage, six reports missing
+        mask = evenly_spaced_windows(times)
+        starts = np.arange(len(mask))
+        # A window starting at s covers rows s .. s + 11; the gap lies between rows 14 and 15
+        np.testing.assert_array_equal(mask, (starts + 11 < 15) | (starts >= 15))
+
+
+class ReportCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.connection = SqliteConnection()
+        self.cache = ReportCache(self.tmp)
+
+    def test_sync_is_incremental(self):
+        self.connection.add_reports(1, 25)
+        self.connection.add_reports(2, 10)
+        self.assertEqual(self.cache.sync(connection=self.connection, chunk_rows=7), {1: 25, 2: 10})
+        self.assertEqual(self.cache.sync(connection=self.connection), {1: 0, 2: 0})
+
+        self.connection.add_reports(1, 5, start=START + timedelta(minutes=250))
+        self.assertEqual(self.cache.sync_sensor(1, connection=self.connection), 5)
+        raw = self.cache.load_sensor(1)
+        self.assertEqual(raw.shape, (30, 6))
+        np.testing.assert_array_equal(raw[:, 1], 25.0 + np.r_[np.arange(25), np.arange(5)])
+        self.assertTrue(np.all(np.diff(raw[:, 0]) > 0))
+
+    def test_training_set_keeps_sensors_apart(self):
+        self.connection.add_reports(1, 20)
+        self.connection.add_reports(2, 20)
+        self.cache.sync(connection=self.connection)
+        training_set = build_training_set(self.cache)
+
+        self.assertEqual(training_set.features.shape, (40, 5))
+        self.assertEqual([s["windows"] for s in training_set.manifest["sensors"]], [9, 9])
+        # No window may start in sensor 1 and run into sensor 2's rows
+        self.assertTrue(np.all((training_set.window_starts + 11 < 20) | (training_set.window_starts >= 20)))
+
+        starts, _ = training_set.windows_for(4)
+        self.assertEqual(len(starts), 22)
+        np.testing.assert_array_equal(training_set.windows_for(6)[0], training_set.window_starts)
+
+        train_pos, val_pos = training_set.split_by_time(0.2)
+        self.assertEqual(len(train_pos) + len(val_pos), 18)
+        self.assertLess(
+            training_set.window_end_times[train_pos].max(),
+            training_set.window_end_times[val_pos].min(),
+        )
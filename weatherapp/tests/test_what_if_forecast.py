@@ -0,0 +1,68 @@
+"""
+View tests for the what-if forecast endpoint (prediction server replaced by mocks).
+"""
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from weatherapp import views
+from weatherapp.ai.client import PredictionServerError
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+READINGS = {'temperature': '26', 'humidity': '90', 'wind_speed': '2', 'barometric_pressure': '1005', 'hour': '14'}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, PREDICTION_INPROCESS_FALLBACK=False)
+class WhatIfForecastViewTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.prediction_client = mock.Mock()
+        self.prediction_client.predict_rain.return_value = (2.0, 30.0, 'Moderate', 4.0)
+        patcher = mock.patch.object(views, 'get_prediction_client', return_value=self.prediction_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        grid = mock.Mock()
+        grid.flagged.return_value = []
+        patcher = mock.patch.object(views, 'get_risk_lookup_grid', return_value=grid)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, params, admin=True):
+        request = self.factory.get('/api/what-if-forecast/', params)
+        request.session = {'admin_id': 1} if admin else {}
+        return views.what_if_forecast(request)
+
+    def test_requires_admin(self):
+        self.assertEqual(self.get(READINGS, admin=False).status_code, 403)
+        self.prediction_client.predict_rain.assert_not_called()
+
+    def test_rejects_missing_and_non_finite_readings(self):
+        missing = dict(READINGS)
+        del missing['humidity']
+        for params in (missing, dict(READINGS, humidity='abc'), dict(READINGS, humidity='nan'),
+                       dict(READINGS, temperature='inf'), dict(READINGS, hour='24')):
+            self.assertEqual(self.get(params).status_code, 400, params)
+        self.prediction_client.predict_rain.assert_not_called()
+
+    def test_forecast(self):
+        response = self.get(READINGS)
+        self.assertEqual(response.status_code, 200)
+        window = self.prediction_client.predict_rain.call_args[0][0]
+        self.assertEqual(window, [[26.0, 90.0, 2.0, 1005.0, 14]] * 6)
+
+    def test_unreachable_server_is_503(self):
+        self.prediction_client.predict_rain.side_effect = PredictionServerError("unreachable")
+        self.assertEqual(self.get(READINGS).status_code, 503)
+
+    @override_settings(PREDICTION_INPROCESS_FALLBACK=True)
+    def test_unreachable_server_falls_back_to_in_process_model(self):
+        from weatherapp.ai import predictor
+
+        self.prediction_client.predict_rain.side_effect = PredictionServerError("unreachable")
+        with mock.patch.object(predictor, 'predict_rain', return_value=(1.0, 20.0, 'Moderate', 3.0)):
+            response = self.get(READINGS)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '"rate_mm_h": 3.0')
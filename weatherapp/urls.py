@@ -35,10 +35,14 @@ urlpatterns = [
     path('api/data/', views.receive_sensor_data, name='receive_sensor_data'),
     path('send-otp/<str:contact_type>/', views.send_otp, name='send_otp'),
     path('user-verify-otp/', views.userverify_otp, name='userverify_otp'),
+    path('api/otp-status/', views.otp_status, name='otp_status'),
     path('get-alerts/', views.get_alerts, name='get_alerts'),
     path("mark-alerts-read/", views.mark_alerts_read, name="mark_alerts_read"),
     path("clear-read-alerts/", views.clear_read_alerts, name="clear_read_alerts"),
     path('api/dashboard-data/', views.latest_dashboard_data, name='latest_dashboard_data'),
     path('manage-barangays/', views.barangays, name='barangays'),
-    path('update-barangay/', views.update_barangay, name='update_barangay')
+    path('update-barangay/', views.update_barangay, name='update_barangay'),
+    path('api/barangay-risk/', views.barangay_risk_lookup, name='barangay_risk_lookup'),
+    path('api/what-if-forecast/', views.what_if_forecast, name='what_if_forecast'),
+    path('api/push-subscriptions/', views.push_subscriptions, name='push_subscriptions')
 ]
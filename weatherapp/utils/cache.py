@@ -44,6 +44,50 @@ def safe_cache_set(key, value, timeout=None):
     except Exception as e:
         logger.warning("Cache set error for key %s: %s", key, e)
 
+
+def safe_cache_get_many(keys):
+    """
+    Safely get several values in one round trip; missing keys are left out.
+    
+    Args:
+        keys: Iterable of cache keys
+        
+    Returns:
+        dict: Found keys and their values ({} if the cache is unavailable)
+    """
+    try:
+        return cache.get_many(list(keys))
+    except Exception as e:
+        logger.warning("Cache get_many error: %s", e)
+        return {}
+
+
+def safe_cache_set_many(mapping, timeout=None):
+    """
+    Safely set several values in one round trip.
+    
+    Args:
+        mapping: Dict of cache key to value
+        timeout: Cache timeout in seconds
+    """
+    try:
+        cache.set_many(mapping, timeout)
+    except Exception as e:
+        logger.warning("Cache set_many error: %s", e)
+
+
+def safe_cache_delete(key):
+    """
+    Safely delete a key from cache.
+    
+    Args:
+        key: Cache key
+    """
+    try:
+        cache.delete(key)
+    except Exception as e:
+        logger.warning("Cache delete error for key %s: %s", key, e)
+
 # Cache timeouts (in seconds)
 CACHE_TIMEOUTS = {
     'weather_data': 60,  # 1 minute - weather data updates frequently
@@ -54,6 +98,7 @@ CACHE_TIMEOUTS = {
     'admin_list': 300,  # 5 minutes - admin list changes infrequently
     'reports': 180,  # 3 minutes - reports can be cached briefly
     'alerts': 30,  # 30 seconds - alerts need to be relatively fresh
+    'recipients': 3600,  # 1 hour - invalidated on registration and user changes
 }
 
 
@@ -8,12 +8,12 @@ from django.http import HttpResponseNotAllowed
 from django.views.decorators.cache import cache_control
 from django.utils.timezone import now
 import random
-from django.core.mail import send_mail
 from django.conf import settings
 import json
 from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse
 import re
+import math
 import os
 from django.core.files.storage import FileSystemStorage
 from django.http import JsonResponse
@@ -22,8 +22,6 @@ from datetime import time as time_class
 from calendar import month_name
 import pytz
 from decimal import Decimal
-import requests
-import certifi
 import time
 import jwt
 import base64
@@ -37,6 +35,12 @@ from weatherapp.utils.rate_limit import rate_limit
 from weatherapp.utils.cache import cached_result, get_cache_key, safe_cache_get, safe_cache_set
 from weatherapp.utils.pagination import paginate_sql_results
 from weatherapp.utils.monitoring import track_performance, log_database_query
+from weatherapp.ai.flood_risk import get_risk_lookup_grid, rebuild_risk_lookup_grid
+from weatherapp.ai.triggers import notify_new_sensor_data
+from weatherapp.ai.client import PredictionServerError, get_client as get_prediction_client
+from weatherapp.email_outbox import enqueue_email, kick_drain as kick_email_drain
+from weatherapp.otp_delivery import get_delivery_status, start_otp_sms
+from weatherapp.recipients import invalidate_recipients, normalize_barangay, to_e164
 from django.core.cache import cache
 
 utc_plus_8 = pytz.timezone('Asia/Manila')
@@ -194,21 +198,26 @@ def register_user(request):
                 INSERT INTO user (
                     name,
                     address,
+                    barangay,
                     email, 
                     phone_num, 
+                    phone_e164,
                     username, 
                     password, 
                     verified_with_philsys
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
             """, [
                 name,
                 address,
+                normalize_barangay(barangay_name),
                 email,
                 phone,
+                to_e164(phone),
                 username,
                 hashed_password,
                 bool(qr_data)
             ])
+        invalidate_recipients(barangay_name)
 
         return JsonResponse({
             'success': True,
@@ -404,15 +413,17 @@ def forgot_password(request):
         request.session['source_table'] = 'admin' if admin_result else 'user'
 
         try:
-            send_mail(
-                subject='WeatherAlert Password Reset OTP',
-                message=f'Your OTP for resetting your password is: {otp}',
+            # Queued; Celery sends it over a shared SMTP connection
+            enqueue_email(
+                email,
+                'WeatherAlert Password Reset OTP',
+                f'Your OTP for resetting your password is: {otp}',
                 from_email=settings.EMAIL_HOST_USER,
-                recipient_list=[email],
-                fail_silently=False,
             )
+            kick_email_drain()
             return redirect('verify_otp')
         except Exception as e:
+            logger.exception("Failed to queue password reset email")
             messages.error(request, "Failed to send email. Please try again.")
             return render(request, "forgot_password.html")
 
@@ -1476,80 +1487,33 @@ def send_otp(request, contact_type):
     request.session['otp'] = str(otp)
     request.session['otp_type'] = contact_type
     request.session['otp_value'] = email if contact_type == "email" else phone
+    request.session.pop('otp_delivery_id', None)
 
     try:
         if contact_type == "email":
-            # Send OTP via Email
-            send_mail(
-                subject="WeatherAlert Verification OTP",
-                message=f"Your OTP for verifying your email in WeatherAlert is: {otp}",
+            # Queue OTP email; Celery sends it over a shared SMTP connection
+            enqueue_email(
+                email,
+                "WeatherAlert Verification OTP",
+                f"Your OTP for verifying your email in WeatherAlert is: {otp}",
                 from_email=settings.EMAIL_HOST_USER,
-                recipient_list=[email],
-                fail_silently=False,
             )
+            kick_email_drain()
             messages.success(request, "OTP has been sent to your email.")
 
         elif contact_type == "phone":
-            # Send OTP via SMS API
-            url = settings.SMS_API_URL
-            
-            # Format phone number properly
-            formatted_phone = phone
-            if phone.startswith("0"):
-                formatted_phone = "+63" + phone[1:]
-            elif not phone.startswith("+"):
-                formatted_phone = "+63" + phone
-            
-            parameters = {
-                'message': f'Your OTP for verifying your phone in WeatherAlert is: {otp}',
-                'mobile_number': formatted_phone,
-                'device': settings.SMS_DEVICE_ID,
-                'device_sim': '1'
-            }
-            headers = {
-                'apikey': settings.SMS_API_KEY,
-                'Content-Type': 'application/x-www-form-urlencoded'
-            }
-            
-            # Try with SSL verification first
-            try:
-                session = requests.Session()
-                session.verify = certifi.where()
-                response = session.post(url, headers=headers, data=parameters, timeout=10)
-                
-                if response.status_code == 200:
-                    try:
-                        result = response.json()
-                        if result.get("success", True):
-                            messages.success(request, "OTP has been sent to your phone.")
-                        else:
-                            messages.error(request, f"SMS API Error: {result.get('message', 'Unknown error')}")
-                            return redirect("user_profile")
-                    except:
-                        # If response is not JSON, assume success for 200 status
-                        messages.success(request, "OTP has been sent to your phone.")
-                else:
-                    messages.error(request, "Failed to send SMS. Please try again later.")
-                    return redirect("user_profile")
-                    
-            except requests.exceptions.SSLError as e:
-                logger.warning("SSL error when sending OTP via SMS: %s", e)
-                # Fallback without SSL verification
-                try:
-                    response = requests.post(url, headers=headers, data=parameters, timeout=10, verify=False)
-                    if response.status_code == 200:
-                        messages.success(request, "OTP has been sent to your phone.")
-                    else:
-                        messages.error(request, "Failed to send SMS. Please try again later.")
-                        return redirect("user_profile")
-                except Exception as fallback_error:
-                    logger.exception("Fallback SMS error when sending OTP")
-                    messages.error(request, "Failed to send SMS. Please try again later.")
-                    return redirect("user_profile")
-            except Exception as e:
-                logger.exception("Unexpected SMS error when sending OTP")
-                messages.error(request, "Failed to send SMS. Please try again later.")
+            formatted_phone = to_e164(phone)
+            if not formatted_phone:
+                messages.error(request, "Your phone number is not a valid mobile number.")
                 return redirect("user_profile")
+            
+            # Sent in the background through the shared gateway client; the
+            # verification page polls otp_status for the outcome
+            request.session['otp_delivery_id'] = start_otp_sms(
+                formatted_phone,
+                f'Your OTP for verifying your phone in WeatherAlert is: {otp}',
+            )
+            messages.success(request, "Sending OTP to your phone.")
 
         else:
             messages.error(request, "Invalid contact type.")
@@ -1586,6 +1550,14 @@ def userverify_otp(request):
 
     return render(request, "userverify_otp.html")
 
+
+@rate_limit("otp_status", limit=120, window=300, methods=["GET"])
+def otp_status(request):
+    """Delivery status of the OTP SMS most recently requested in this session (polled by userverify_otp.html)."""
+    if 'user_id' not in request.session:
+        return JsonResponse({'error': 'Not authorized'}, status=403)
+    return JsonResponse(get_delivery_status(request.session.get('otp_delivery_id')))
+
     
 def admin_profile(request):
     if 'admin_id' not in request.session:
@@ -1973,7 +1945,11 @@ def delete_user(request, user_id):
 
     try:
         with connection.cursor() as cursor:
+            cursor.execute("SELECT barangay FROM user WHERE user_id = %s", [user_id])
+            row = cursor.fetchone()
             cursor.execute("DELETE FROM user WHERE user_id = %s", [user_id])
+        if row:
+            invalidate_recipients(row[0])
         
         messages.success(request, 'User deleted successfully')
         return redirect('active_user')
@@ -2848,6 +2824,9 @@ def receive_sensor_data(request):
                 dew_point, ph_time, rain_rate, rain_accumulated
             ])
 
+        # Ask for a fresh forecast now instead of waiting for the next interval
+        notify_new_sensor_data(sensor_id)
+
         return JsonResponse({"status": "success"}, status=201)
 
     except Exception:
@@ -2939,6 +2918,12 @@ def update_barangay(request):
                 SET barangay_name = %s, land_description = %s, flood_risk_multiplier = %s, flood_risk_summary = %s
                 WHERE id = %s
             """, [barangay_name, land_description, flood_risk_multiplier, flood_risk_summary, id])
+
+        # Keep the what-if lookup grid in sync with the new multiplier
+        try:
+            rebuild_risk_lookup_grid()
+        except Exception:
+            logger.exception("Failed to rebuild barangay risk lookup grid")
         
         messages.success(request, 'Barangay updated successfully')
         return redirect('barangays')
@@ -2946,4 +2931,152 @@ def update_barangay(request):
     except Exception:
         logger.exception("Failed to update barangay %s", id)
         messages.error(request, 'Failed to update barangay. Please try again later.')
-        return redirect('barangays') 
\ No newline at end of file
+        return redirect('barangays') 
+
+
+@rate_limit("barangay_risk_lookup", limit=120, window=60, methods=["GET"])
+def barangay_risk_lookup(request):
+    """
+    What-if flood risk lookup against the precomputed barangay risk grid.
+
+    With ``rain_rate`` (mm/h) and ``duration`` (minutes) query parameters, returns the
+    barangays at risk for that scenario. Without them, returns the whole grid.
+    """
+    if 'admin_id' not in request.session:
+        return JsonResponse({'error': 'Not authorized'}, status=403)
+
+    try:
+        grid = get_risk_lookup_grid()
+
+        rain_rate = request.GET.get('rain_rate')
+        duration = request.GET.get('duration')
+        if rain_rate is None and duration is None:
+            return JsonResponse(grid.to_dict())
+
+        try:
+            rain_rate = float(rain_rate or 0)
+            duration = float(duration or 0)
+            rate_index, duration_index = grid.bucket_indexes(rain_rate, duration)
+        except ValueError:
+            return JsonResponse({'error': 'rain_rate and duration must be finite numbers'}, status=400)
+
+        # A bucket is None when the query is beyond the grid and was assessed exactly
+        return JsonResponse({
+            'rain_rate': rain_rate,
+            'duration': duration,
+            'rain_rate_bucket': None if rate_index is None else float(grid.rain_rate_buckets[rate_index]),
+            'duration_bucket': None if duration_index is None else float(grid.duration_buckets[duration_index]),
+            'barangays': grid.flagged(rain_rate, duration),
+        })
+
+    except Exception:
+        logger.exception("Error in barangay_risk_lookup")
+        return JsonResponse({'error': 'Failed to look up barangay risk. Please try again later.'}, status=500)
+
+
+WHAT_IF_FIELDS = ('temperature', 'humidity', 'wind_speed', 'barometric_pressure')
+PREDICTION_UNAVAILABLE = 'Prediction service is unavailable. Please try again later.'
+
+
+@rate_limit("what_if_forecast", limit=60, window=60, methods=["GET"])
+def what_if_forecast(request):
+    """
+    On-demand forecast for hypothetical readings.
+
+    Takes ``temperature``, ``humidity``, ``wind_speed`` and ``barometric_pressure``
+    (and optionally ``hour``, default: current PH hour) as query parameters, holds
+    them steady over the model's input window and asks the local prediction
+    server for a forecast. If the server is unreachable and
+    ``PREDICTION_INPROCESS_FALLBACK`` is set, the forecast is made in this process
+    instead. The barangays at risk for that forecast come from the precomputed
+    risk grid.
+    """
+    if 'admin_id' not in request.session:
+        return JsonResponse({'error': 'Not authorized'}, status=403)
+
+    try:
+        readings = [float(request.GET[field]) for field in WHAT_IF_FIELDS]
+        hour = int(request.GET.get('hour', datetime.now(utc_plus_8).hour))
+    except KeyError as e:
+        return JsonResponse({'error': f'Missing parameter: {e.args[0]}'}, status=400)
+    except ValueError:
+        return JsonResponse({'error': 'Parameters must be numbers'}, status=400)
+    if not all(math.isfinite(value) for value in readings):
+        return JsonResponse({'error': 'Parameters must be finite numbers'}, status=400)
+    if not 0 <= hour <= 23:
+        return JsonResponse({'error': 'hour must be between 0 and 23'}, status=400)
+
+    window = [readings + [hour]] * 6
+    try:
+        amount_mm, duration_min, intensity, rate_mm_h = get_prediction_client().predict_rain(window)
+    except PredictionServerError as e:
+        if not settings.PREDICTION_INPROCESS_FALLBACK:
+            logger.warning("What-if forecast unavailable: %s", e)
+            return JsonResponse({'error': PREDICTION_UNAVAILABLE}, status=503)
+        logger.warning("Prediction server unavailable (%s); predicting in-process", e)
+        from weatherapp.ai import predictor
+        amount_mm, duration_min, intensity, rate_mm_h = predictor.predict_rain(window)
+        if amount_mm is None:
+            return JsonResponse({'error': PREDICTION_UNAVAILABLE}, status=503)
+
+    try:
+        barangays = get_risk_lookup_grid().flagged(rate_mm_h, duration_min)
+    except Exception:
+        logger.exception("Risk grid lookup failed for what-if forecast")
+        barangays = []
+
+    return JsonResponse({
+        'inputs': dict(zip(WHAT_IF_FIELDS, readings), hour=hour),
+        'amount_mm': round(amount_mm, 3),
+        'duration_min': round(duration_min, 1),
+        'rate_mm_h': round(rate_mm_h, 3),
+        'intensity': intensity,
+        'barangays': barangays,
+    })
+
+
+@rate_limit("push_subscriptions", limit=20, window=300)
+def push_subscriptions(request):
+    """
+    Register (POST) or remove (DELETE) the Web Push subscription of the logged-in
+    user's browser for flood alerts; GET returns the VAPID public key the browser
+    subscribes with.
+
+    POST body: ``PushSubscription.toJSON()``, i.e. ``{"endpoint": ..., "keys":
+    {"p256dh": ..., "auth": ...}}``. DELETE body: ``{"endpoint": ...}``. Users can
+    only replace or remove their own subscriptions.
+    """
+    if 'user_id' not in request.session:
+        return JsonResponse({'error': 'Not authorized'}, status=403)
+    if request.method == 'GET':
+        return JsonResponse({'public_key': settings.WEBPUSH_VAPID_PUBLIC_KEY or None})
+    if request.method not in ('POST', 'DELETE'):
+        return HttpResponseNotAllowed(['GET', 'POST', 'DELETE'])
+
+    try:
+        data = json.loads(request.body)
+        endpoint = data['endpoint']
+        if not isinstance(endpoint, str) or not endpoint.startswith('https://') or len(endpoint) > 500:
+            raise ValueError('endpoint')
+        if request.method == 'POST':
+            p256dh, auth = data['keys']['p256dh'], data['keys']['auth']
+            if not (isinstance(p256dh, str) and isinstance(auth, str)) or len(p256dh) > 255 or len(auth) > 64:
+                raise ValueError('keys')
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Invalid push subscription'}, status=400)
+
+    user_id = request.session['user_id']
+    with connection.cursor() as cursor:
+        if request.method == 'POST':
+            cursor.execute("SELECT 1 FROM push_subscription WHERE endpoint = %s AND user_id <> %s LIMIT 1",
+                           [endpoint, user_id])
+            if cursor.fetchone() is not None:
+                return JsonResponse({'error': 'Push subscription belongs to another account'}, status=409)
+        # Re-subscribing replaces the keys of the user's own row for this browser
+        cursor.execute("DELETE FROM push_subscription WHERE endpoint = %s AND user_id = %s", [endpoint, user_id])
+        if request.method == 'POST':
+            cursor.execute("""
+                INSERT INTO push_subscription (user_id, endpoint, p256dh, auth, created_at)
+                VALUES (%s, %s, %s, %s, %s)
+            """, [user_id, endpoint, p256dh, auth, now()])
+    return JsonResponse({'status': 'subscribed' if request.method == 'POST' else 'unsubscribed'})